@@ -0,0 +1,605 @@
+#!/usr/bin/env python3
+"""
+Batch Entry Grid
+Spreadsheet-style window for intakes: type or paste many tags, check them
+as you go, then print them all as one batch.
+
+    python batch_grid.py          # standalone, default printer settings
+
+Opened from the main GUI with the "Batch Grid" button, it prints with the
+main window's printer settings. Rows are checked as they are typed; bad
+cells are shown in red and repeated item numbers in orange. "Print All"
+streams the valid rows through one BatchPipeline on a worker thread.
+
+Only the rows on screen have canvas items; scrolling reuses them, so the
+grid stays responsive with thousands of rows.
+"""
+
+import csv
+import io
+import os
+import queue
+import sys
+import threading
+import tkinter as tk
+from collections import Counter
+from tkinter import ttk, messagebox
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from jewelry_tag_printer import (DEFAULT_PRESET, DEFAULT_USE_USB, USB_PRINTER_NAME, PRINTER_IP,
+                                 send_command)
+from batch_printer import BatchPipeline, COLUMN_ALIASES
+
+# Grid columns: (field, heading, width in pixels)
+COLUMNS = (
+    ("item_number", "Item Number", 170),
+    ("price", "Price", 90),
+    ("carat_weight", "Carat", 70),
+    ("gold_karat", "Karat", 60),
+)
+FIELDS = [field for field, _, _ in COLUMNS]
+KARATS = (10, 14, 18, 22, 24)
+
+ROW_HEIGHT = 22
+NUMBER_WIDTH = 50
+STATUS_WIDTH = 130
+FRAME_MS = 16
+POLL_MS = 50
+
+COLOR_ERROR = "#ffcdd2"
+COLOR_DUPLICATE = "#ffe0b2"
+COLOR_SELECTED = "#bbdefb"
+COLOR_DONE = "#c8e6c9"
+
+
+def check_row(values: list) -> dict:
+    """Problems with one row as {field: message}; empty rows have none."""
+    if not any(v.strip() for v in values):
+        return {}
+    item, price, carat, karat = (v.strip() for v in values)
+    errors = {}
+    if not item:
+        errors["item_number"] = "item number is required"
+    try:
+        if float(price.replace('$', '').replace(',', '')) <= 0:
+            errors["price"] = "price must be positive"
+    except ValueError:
+        errors["price"] = "price is not a number"
+    try:
+        if float(carat) < 0:
+            errors["carat_weight"] = "carat can't be negative"
+    except ValueError:
+        errors["carat_weight"] = "carat is not a number"
+    try:
+        if int(float(karat)) not in KARATS:
+            errors["gold_karat"] = f"karat must be one of {', '.join(map(str, KARATS))}"
+    except ValueError:
+        errors["gold_karat"] = "karat is not a number"
+    return errors
+
+
+def parse_pasted(text: str) -> list:
+    """
+    Rows from clipboard text - tab separated (spreadsheets) or CSV. A header
+    row is recognized by the usual column names; otherwise columns are
+    item number, price, carat, karat in that order.
+    """
+    delimiter = "\t" if "\t" in text else ","
+    lines = [row for row in csv.reader(io.StringIO(text), delimiter=delimiter)
+             if any(cell.strip() for cell in row)]
+    if not lines:
+        return []
+    order = list(range(len(FIELDS)))
+    header = [cell.strip().lower() for cell in lines[0]]
+    found = {field: next((header.index(a) for a in aliases if a in header), None)
+             for field, aliases in COLUMN_ALIASES.items()}
+    if found["item_number"] is not None:
+        order = [found[field] for field in FIELDS]
+        lines = lines[1:]
+    return [[row[i].strip() if i is not None and i < len(row) else "" for i in order]
+            for row in lines]
+
+
+class GridModel:
+    """Row data, per-row problems and duplicate item numbers."""
+
+    def __init__(self):
+        self.rows = []
+        self.errors = []
+        self.status = []
+        self.item_counts = Counter()
+
+    def __len__(self):
+        return len(self.rows)
+
+    @staticmethod
+    def _key(values: list) -> str:
+        return values[0].strip().upper()
+
+    def insert(self, index: int, rows: list):
+        for offset, values in enumerate(rows):
+            values = (list(values) + [""] * len(FIELDS))[:len(FIELDS)]
+            self.rows.insert(index + offset, values)
+            self.errors.insert(index + offset, check_row(values))
+            self.status.insert(index + offset, "")
+            if self._key(values):
+                self.item_counts[self._key(values)] += 1
+
+    def append(self, rows: list):
+        self.insert(len(self.rows), rows)
+
+    def set(self, index: int, column: int, value: str):
+        values = self.rows[index]
+        if column == 0 and self._key(values):
+            self.item_counts[self._key(values)] -= 1
+        values[column] = value
+        if column == 0 and self._key(values):
+            self.item_counts[self._key(values)] += 1
+        self.errors[index] = check_row(values)
+        self.status[index] = ""
+
+    def delete(self, index: int):
+        key = self._key(self.rows[index])
+        if key:
+            self.item_counts[key] -= 1
+        del self.rows[index], self.errors[index], self.status[index]
+
+    def clear(self):
+        self.__init__()
+
+    def is_duplicate(self, index: int) -> bool:
+        key = self._key(self.rows[index])
+        return bool(key) and self.item_counts[key] > 1
+
+    def is_blank(self, index: int) -> bool:
+        return not any(v.strip() for v in self.rows[index])
+
+    def printable(self) -> list:
+        """(index, label dict) for every complete, valid row."""
+        return [(index, dict(zip(FIELDS, values)))
+                for index, values in enumerate(self.rows)
+                if not self.errors[index] and not self.is_blank(index)]
+
+    def summary(self) -> str:
+        filled = [i for i in range(len(self.rows)) if not self.is_blank(i)]
+        bad = sum(1 for i in filled if self.errors[i])
+        duplicates = sum(1 for count in self.item_counts.values() if count > 1)
+        return (f"{len(filled)} rows · {len(filled) - bad} valid · {bad} with errors"
+                f" · {duplicates} duplicate item numbers")
+
+
+class BatchGridWindow:
+    """The grid window. settings() returns the printer options to print with."""
+
+    def __init__(self, root, settings=None, inventory=None):
+        self.root = root
+        self.root.title("Batch Entry")
+        self.root.geometry("640x600")
+        self.settings = settings or self.default_settings
+        self.inventory = inventory
+
+        self.model = GridModel()
+        self.model.append([[""] * len(FIELDS) for _ in range(20)])
+        self.top = 0                    # first row on screen
+        self.selected = (0, 0)          # (row, column)
+        self.editor = None
+        self.slots = []                 # canvas items for each visible row
+        self._redraw_id = None
+
+        self.pipeline = None
+        self.events = queue.Queue()
+
+        self.create_widgets()
+        self.root.after(POLL_MS, self.poll_events)
+
+    @staticmethod
+    def default_settings() -> dict:
+        return dict(preset=DEFAULT_PRESET, use_usb=DEFAULT_USE_USB,
+                    printer_name=USB_PRINTER_NAME, printer_ip=PRINTER_IP,
+                    use_zpl=False, dry_run=False)
+
+    # -- widgets -----------------------------------------------------------
+
+    def create_widgets(self):
+        main = ttk.Frame(self.root, padding=10)
+        main.pack(fill=tk.BOTH, expand=True)
+
+        toolbar = ttk.Frame(main)
+        toolbar.pack(fill=tk.X, pady=(0, 5))
+        ttk.Button(toolbar, text="📋 Paste", command=self.paste).pack(side=tk.LEFT, padx=2)
+        ttk.Button(toolbar, text="➕ Add Rows", command=self.add_rows).pack(side=tk.LEFT, padx=2)
+        ttk.Button(toolbar, text="➖ Delete Row", command=self.delete_row).pack(side=tk.LEFT, padx=2)
+        ttk.Button(toolbar, text="🗑️ Clear", command=self.clear).pack(side=tk.LEFT, padx=2)
+        self.cancel_btn = ttk.Button(toolbar, text="⏹️ Cancel", command=self.cancel,
+                                     state="disabled")
+        self.cancel_btn.pack(side=tk.RIGHT, padx=2)
+        self.print_btn = ttk.Button(toolbar, text="🖨️ Print All", command=self.print_all)
+        self.print_btn.pack(side=tk.RIGHT, padx=2)
+
+        # Column headings
+        header = tk.Canvas(main, height=ROW_HEIGHT, highlightthickness=0, bg="#eeeeee")
+        header.pack(fill=tk.X)
+        x = NUMBER_WIDTH
+        header.create_text(NUMBER_WIDTH - 6, ROW_HEIGHT / 2, text="#", anchor="e")
+        for _, heading, width in COLUMNS:
+            header.create_text(x + 4, ROW_HEIGHT / 2, text=heading, anchor="w",
+                               font=("Helvetica", 10, "bold"))
+            x += width
+        header.create_text(x + 4, ROW_HEIGHT / 2, text="Status", anchor="w",
+                           font=("Helvetica", 10, "bold"))
+
+        body = ttk.Frame(main)
+        body.pack(fill=tk.BOTH, expand=True)
+        self.canvas = tk.Canvas(body, bg="white", highlightthickness=1,
+                                highlightbackground="gray", takefocus=True)
+        self.scrollbar = ttk.Scrollbar(body, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.canvas.bind("<Configure>", lambda e: self.schedule_redraw())
+        self.canvas.bind("<Button-1>", self.on_click)
+        self.canvas.bind("<Double-Button-1>", lambda e: self.start_edit())
+        self.canvas.bind("<MouseWheel>", lambda e: self.scroll(-1 if e.delta > 0 else 1, "units"))
+        self.canvas.bind("<Button-4>", lambda e: self.scroll(-1, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.scroll(1, "units"))
+        self.canvas.bind("<Key>", self.on_key)
+        self.canvas.bind("<Control-v>", lambda e: self.paste())
+        self.canvas.bind("<Control-V>", lambda e: self.paste())
+
+        self.message_var = tk.StringVar()
+        ttk.Label(main, textvariable=self.message_var, foreground="#c62828").pack(fill=tk.X)
+        self.summary_var = tk.StringVar()
+        ttk.Label(main, textvariable=self.summary_var, relief="sunken",
+                  anchor="w").pack(fill=tk.X, pady=(5, 0))
+        self.canvas.focus_set()
+
+    # -- virtualized drawing ------------------------------------------------
+
+    def visible_rows(self) -> int:
+        return max(1, self.canvas.winfo_height() // ROW_HEIGHT)
+
+    def _make_slot(self, y: int) -> dict:
+        """Canvas items for one on-screen row: background + a text per cell."""
+        c = self.canvas
+        slot = {"number": c.create_text(NUMBER_WIDTH - 6, y + ROW_HEIGHT / 2, anchor="e",
+                                        fill="gray"),
+                "cells": [], "backgrounds": []}
+        x = NUMBER_WIDTH
+        for _, _, width in COLUMNS:
+            slot["backgrounds"].append(c.create_rectangle(x, y, x + width, y + ROW_HEIGHT,
+                                                          outline="#dddddd"))
+            slot["cells"].append(c.create_text(x + 4, y + ROW_HEIGHT / 2, anchor="w"))
+            x += width
+        slot["status"] = c.create_text(x + 4, y + ROW_HEIGHT / 2, anchor="w")
+        return slot
+
+    def schedule_redraw(self):
+        if self._redraw_id is None:
+            self._redraw_id = self.root.after(FRAME_MS, self.redraw)
+
+    def redraw(self):
+        """Refresh the on-screen rows only; items are reused, never recreated."""
+        self._redraw_id = None
+        count = self.visible_rows()
+        while len(self.slots) < count:
+            self.slots.append(self._make_slot(len(self.slots) * ROW_HEIGHT))
+        c = self.canvas
+        model = self.model
+        self.top = max(0, min(self.top, len(model) - count))
+        for offset, slot in enumerate(self.slots):
+            index = self.top + offset
+            visible = offset < count and index < len(model)
+            state = "normal" if visible else "hidden"
+            for item in [slot["number"], slot["status"]] + slot["cells"] + slot["backgrounds"]:
+                c.itemconfigure(item, state=state)
+            if not visible:
+                continue
+            c.itemconfigure(slot["number"], text=str(index + 1))
+            errors = model.errors[index]
+            duplicate = model.is_duplicate(index)
+            done = model.status[index].startswith("✓")
+            for column, field in enumerate(FIELDS):
+                if (index, column) == self.selected:
+                    fill = COLOR_SELECTED
+                elif field in errors:
+                    fill = COLOR_ERROR
+                elif column == 0 and duplicate:
+                    fill = COLOR_DUPLICATE
+                elif done:
+                    fill = COLOR_DONE
+                else:
+                    fill = "white"
+                c.itemconfigure(slot["backgrounds"][column], fill=fill)
+                c.itemconfigure(slot["cells"][column], text=model.rows[index][column])
+            status = model.status[index]
+            if not status and errors:
+                status = "✗ " + next(iter(errors.values()))
+            elif not status and duplicate:
+                status = "⚠ duplicate item"
+            c.itemconfigure(slot["status"], text=status)
+        total = max(1, len(model))
+        self.scrollbar.set(self.top / total, min(1.0, (self.top + count) / total))
+        self.summary_var.set(self.model.summary())
+        self.place_editor()
+
+    # -- navigation --------------------------------------------------------
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.top = int(float(amount) * len(self.model))
+            self.schedule_redraw()
+        else:
+            self.scroll(int(amount), unit)
+
+    def scroll(self, amount: int, unit: str = "units"):
+        step = self.visible_rows() - 1 if unit == "pages" else 1
+        self.top += amount * step
+        self.schedule_redraw()
+
+    def cell_at(self, x: int, y: int) -> Optional[tuple]:
+        row = self.top + y // ROW_HEIGHT
+        left = NUMBER_WIDTH
+        for column, (_, _, width) in enumerate(COLUMNS):
+            if left <= x < left + width and row < len(self.model):
+                return row, column
+            left += width
+        return None
+
+    def select(self, row: int, column: int):
+        row = max(0, min(row, len(self.model) - 1))
+        column = max(0, min(column, len(FIELDS) - 1))
+        self.selected = (row, column)
+        count = self.visible_rows()
+        if row < self.top:
+            self.top = row
+        elif row >= self.top + count:
+            self.top = row - count + 1
+        self.schedule_redraw()
+
+    def on_click(self, event):
+        self.finish_edit()
+        self.canvas.focus_set()
+        cell = self.cell_at(event.x, event.y)
+        if cell:
+            self.select(*cell)
+
+    def on_key(self, event):
+        row, column = self.selected
+        moves = {"Up": (-1, 0), "Down": (1, 0), "Left": (0, -1), "Right": (0, 1),
+                 "Tab": (0, 1), "Return": (1, 0), "Prior": (-self.visible_rows(), 0),
+                 "Next": (self.visible_rows(), 0)}
+        if event.keysym in moves:
+            dr, dc = moves[event.keysym]
+            if event.keysym == "Return" and row == len(self.model) - 1:
+                self.model.append([[""] * len(FIELDS)])
+            self.select(row + dr, column + dc)
+            return "break"
+        if event.keysym == "F2":
+            self.start_edit()
+        elif event.keysym in ("Delete", "BackSpace"):
+            self.model.set(row, column, "")
+            self.schedule_redraw()
+        elif event.char and event.char.isprintable() and not event.state & 0x4:
+            self.start_edit(initial=event.char)
+        return None
+
+    # -- editing -----------------------------------------------------------
+
+    def start_edit(self, initial: Optional[str] = None):
+        """Put an Entry over the selected cell; it checks the row as you type."""
+        self.finish_edit()
+        row, column = self.selected
+        var = tk.StringVar(value=self.model.rows[row][column] if initial is None else initial)
+        entry = ttk.Entry(self.canvas, textvariable=var)
+        var.trace('w', lambda *a: self.on_edit(row, column, var.get()))
+        entry.bind("<Return>", lambda e: self.commit_and_move(1, 0))
+        entry.bind("<Tab>", lambda e: self.commit_and_move(0, 1))
+        entry.bind("<Escape>", lambda e: self.finish_edit())
+        self.editor = (row, column, entry, self.canvas.create_window(0, 0, anchor="nw",
+                                                                     window=entry))
+        if initial is not None:
+            self.on_edit(row, column, initial)
+        self.place_editor()
+        entry.focus_set()
+        entry.icursor(tk.END)
+
+    def on_edit(self, row: int, column: int, value: str):
+        self.model.set(row, column, value)
+        self.schedule_redraw()
+
+    def place_editor(self):
+        if not self.editor:
+            return
+        row, column, entry, window = self.editor
+        offset = row - self.top
+        if not 0 <= offset < self.visible_rows():
+            self.canvas.itemconfigure(window, state="hidden")
+            return
+        x = NUMBER_WIDTH + sum(width for _, _, width in COLUMNS[:column])
+        self.canvas.coords(window, x, offset * ROW_HEIGHT)
+        self.canvas.itemconfigure(window, state="normal", width=COLUMNS[column][2],
+                                  height=ROW_HEIGHT)
+
+    def finish_edit(self):
+        if not self.editor:
+            return
+        row, column, entry, window = self.editor
+        self.editor = None
+        self.canvas.delete(window)
+        entry.destroy()
+        if column == 0:
+            self.autofill(row)
+        self.canvas.focus_set()
+        self.schedule_redraw()
+
+    def commit_and_move(self, dr: int, dc: int):
+        row, column = self.selected
+        self.finish_edit()
+        if dr and row == len(self.model) - 1:
+            self.model.append([[""] * len(FIELDS)])
+        self.select(row + dr, column + dc)
+        return "break"
+
+    def autofill(self, row: int):
+        """Fill empty price/carat/karat from the inventory index."""
+        values = self.model.rows[row]
+        if not self.inventory or not values[0].strip() or all(values[1:]):
+            return
+        found = self.inventory.lookup(values[0].strip())
+        if not found:
+            return
+        formats = {"price": "{:g}", "carat_weight": "{:.2f}", "gold_karat": "{}"}
+        for column, field in enumerate(FIELDS[1:], 1):
+            if not values[column].strip() and found.get(field):
+                self.model.set(row, column, formats[field].format(found[field]))
+
+    # -- rows --------------------------------------------------------------
+
+    def printing(self) -> bool:
+        """True while a batch runs; rows can't move then (statuses go by index)."""
+        if self.pipeline:
+            self.message_var.set("Wait for the batch to finish (or cancel it) first")
+            return True
+        return False
+
+    def paste(self):
+        """Paste rows from the clipboard at the selected row (blank rows are reused)."""
+        self.finish_edit()
+        if self.printing():
+            return "break"
+        try:
+            rows = parse_pasted(self.root.clipboard_get())
+        except tk.TclError:
+            rows = []
+        if not rows:
+            self.message_var.set("Clipboard has no rows to paste")
+            return "break"
+        start = self.selected[0]
+        # Overwrite trailing blank rows rather than pushing them down
+        while start < len(self.model) and self.model.is_blank(start) and \
+                all(self.model.is_blank(i) for i in range(start, len(self.model))):
+            self.model.delete(start)
+        self.model.insert(start, rows)
+        self.message_var.set(f"Pasted {len(rows)} rows")
+        self.select(start, 0)
+        return "break"
+
+    def add_rows(self):
+        self.model.append([[""] * len(FIELDS) for _ in range(10)])
+        self.schedule_redraw()
+
+    def delete_row(self):
+        self.finish_edit()
+        if self.printing():
+            return
+        if len(self.model) > 1:
+            self.model.delete(self.selected[0])
+            self.select(*self.selected)
+
+    def clear(self):
+        self.finish_edit()
+        if self.pipeline or not messagebox.askyesno("Clear", "Remove all rows?", parent=self.root):
+            return
+        self.model.clear()
+        self.model.append([[""] * len(FIELDS) for _ in range(20)])
+        self.top = 0
+        self.select(0, 0)
+
+    # -- printing ----------------------------------------------------------
+
+    def print_all(self):
+        """Send every valid row as one batch on a worker thread."""
+        self.finish_edit()
+        jobs = self.model.printable()
+        if not jobs:
+            self.message_var.set("Nothing to print")
+            return
+        bad = sum(1 for i in range(len(self.model))
+                  if self.model.errors[i] and not self.model.is_blank(i))
+        if bad and not messagebox.askyesno(
+                "Print All", f"{bad} rows have errors and will be skipped.\n"
+                             f"Print the {len(jobs)} valid rows?", parent=self.root):
+            return
+        settings = self.settings()
+        rows = [index for index, _ in jobs]
+        for index in rows:
+            self.model.status[index] = "Queued"
+
+        def sender(command: bytes, job: Optional[dict]) -> bool:
+            ok = send_command(command, settings["use_usb"], settings["printer_name"],
+                              settings["printer_ip"])
+            if job:
+                self.events.put((rows[job["row"] - 1], "✓ Printed" if ok else "✗ Send failed"))
+            return ok
+
+        self.pipeline = BatchPipeline(
+            preset=settings["preset"], use_zpl=settings["use_zpl"],
+            use_epl=settings.get("use_epl", False), dry_run=settings["dry_run"],
+            sender=sender)
+        labels = [label for _, label in jobs]
+        threading.Thread(target=self.run_pipeline, args=(self.pipeline, labels, rows),
+                         name="grid-print", daemon=True).start()
+        self.print_btn.config(state="disabled")
+        self.cancel_btn.config(state="normal")
+        self.message_var.set(f"Printing {len(labels)} tags...")
+        self.schedule_redraw()
+
+    def run_pipeline(self, pipeline: BatchPipeline, labels: list, rows: list):
+        summary = pipeline.run(labels)
+        if pipeline.dry_run:
+            for index in rows:
+                self.events.put((index, "✓ Dry run"))
+        self.events.put((None, summary))
+
+    def cancel(self):
+        if self.pipeline:
+            self.pipeline.cancel()
+            self.message_var.set("Cancelling - clearing printer buffer...")
+
+    def poll_events(self):
+        """Apply print results from the worker (on the Tk thread)."""
+        try:
+            self.apply_events()
+        finally:
+            self.root.after(POLL_MS, self.poll_events)
+
+    def apply_events(self):
+        changed = False
+        try:
+            while True:
+                index, result = self.events.get_nowait()
+                changed = True
+                if index is not None:
+                    self.model.status[index] = result
+                    continue
+                summary = result
+                self.pipeline = None
+                for i, status in enumerate(self.model.status):
+                    if status == "Queued":
+                        self.model.status[i] = "Cancelled" if summary["cancelled"] else ""
+                self.print_btn.config(state="normal")
+                self.cancel_btn.config(state="disabled")
+                state = "cancelled" if summary["cancelled"] else "done"
+                self.message_var.set(f"Batch {state}: {summary['printed']} printed, "
+                                     f"{summary['failed']} failed")
+        except queue.Empty:
+            pass
+        if changed:
+            self.schedule_redraw()
+
+
+def open_batch_grid(parent, settings=None, inventory=None) -> BatchGridWindow:
+    """Open the grid in its own window on top of an existing Tk app."""
+    return BatchGridWindow(tk.Toplevel(parent), settings, inventory)
+
+
+def main():
+    root = tk.Tk()
+    BatchGridWindow(root)
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,507 @@
+#!/usr/bin/env python3
+"""
+Batch Tag Printer
+Prints a CSV of tags through a pipelined executor:
+
+    parse --> render --> send --> record
+
+Each stage runs in its own worker thread with a bounded queue in between.
+The send stage is the slowest (the printer), so once its input queue is
+full the render and parse stages block - the printer sets the pace and
+memory stays flat no matter how big the batch is. Rendering can optionally
+run in a process pool for very large batches.
+
+CSV columns (header row required, any order):
+    item_number, price, carat, karat
+The print history format (Item Number, Price, Carat Weight, Gold Karat)
+is also accepted, so a history file can be fed back in for reprints.
+
+A running batch can be paused, resumed and cancelled from another thread
+(Ctrl+C cancels a CLI batch). Cancel stops the send stage after the current
+label and sends the printer's cancel / clear-buffer command; the summary's
+next_row says where to pick the batch up again. next_row follows the last
+label sent, and labels still in the printer's buffer when it was cleared
+didn't print - check the last tags that came out and start from the first
+missing one if it's earlier.
+"""
+
+import csv
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Optional, Union
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from jewelry_tag_printer import (
+    render_command, send_command, create_cancel_command, HistoryWriter,
+    CSV_FILE, DEFAULT_PRESET
+)
+import memprofile
+import profiling
+import tag_log
+
+
+# Accepted header names for each field (lowercase)
+COLUMN_ALIASES = {
+    "item_number": ("item_number", "item number", "item", "sku", "item#"),
+    "price": ("price",),
+    "carat_weight": ("carat", "carat_weight", "carat weight", "d"),
+    "gold_karat": ("karat", "gold_karat", "gold karat"),
+}
+
+# Marks the end of the stream on each queue
+_END = object()
+
+
+class StageStats:
+    """Busy/idle accounting for one pipeline stage."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0        # seconds spent doing work
+        self.wait_in = 0.0     # seconds waiting for input (starved)
+        self.wait_out = 0.0    # seconds blocked on a full output queue
+        self.workers = 1       # busy time can add up across this many workers
+
+    def add_busy(self, seconds: float, items: int = 1):
+        """Count work time; with --profile, also per label as stage batch.<name>."""
+        self.busy += seconds
+        if profiling.ENABLED:
+            for _ in range(items):
+                profiling.record(f"batch.{self.name}", seconds / items)
+
+    def utilization(self, wall: float) -> float:
+        return self.busy / (wall * self.workers) if wall > 0 else 0.0
+
+    def as_dict(self, wall: float) -> dict:
+        return {
+            "stage": self.name,
+            "items": self.items,
+            "busy_s": round(self.busy, 4),
+            "starved_s": round(self.wait_in, 4),
+            "blocked_s": round(self.wait_out, 4),
+            "utilization": round(self.utilization(wall), 4),
+        }
+
+
+def _column_map(header: list) -> dict:
+    """Map our field names to column indexes in a CSV header."""
+    lowered = [h.strip().lower() for h in header]
+    mapping = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in lowered:
+                mapping[field] = lowered.index(alias)
+                break
+    missing = [f for f in COLUMN_ALIASES if f not in mapping]
+    if missing:
+        raise ValueError(f"CSV is missing columns: {', '.join(missing)}")
+    return mapping
+
+
+def parse_row(row: Union[list, dict], mapping: Optional[dict] = None) -> dict:
+    """Turn one CSV row (list + column map, or dict) into a tag job."""
+    if isinstance(row, dict):
+        lowered = {str(k).strip().lower(): v for k, v in row.items()}
+        get = lambda field: next((lowered[alias] for alias in COLUMN_ALIASES[field]
+                                  if alias in lowered), None)
+    else:
+        get = lambda field: row[mapping[field]]
+    item_number = str(get("item_number") or "").strip()
+    if not item_number:
+        raise ValueError("item number is required")
+    price = float(str(get("price")).replace('$', '').replace(',', ''))
+    return {
+        "item_number": item_number,
+        "price": price,
+        "carat_weight": float(get("carat_weight")),
+        "gold_karat": int(float(get("gold_karat"))),
+    }
+
+
+def read_batch_rows(source: Union[str, Iterable]) -> Iterable:
+    """Yield (row_number, row, column_map) from a CSV path or an iterable of dicts."""
+    if isinstance(source, str):
+        with open(source, newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            mapping = _column_map(next(reader))
+            for line_no, row in enumerate(reader, 2):
+                if any(cell.strip() for cell in row):
+                    yield line_no, row, mapping
+    else:
+        for index, row in enumerate(source, 1):
+            yield index, row, None
+
+
+def _render_one(job: dict, preset: str, use_zpl: bool, use_epl: bool) -> bytes:
+    return render_command(job["item_number"], job["price"], job["carat_weight"],
+                          job["gold_karat"], preset, use_zpl=use_zpl, use_epl=use_epl)
+
+
+def _render_chunk(jobs: list, preset: str, use_zpl: bool, use_epl: bool) -> tuple:
+    """
+    Process-pool entry point: render a list of jobs (the exception for any
+    that fail). Returns (commands, seconds spent rendering in the worker).
+    """
+    start = time.perf_counter()
+    commands = []
+    for job in jobs:
+        try:
+            commands.append(_render_one(job, preset, use_zpl, use_epl))
+        except Exception as e:
+            commands.append(e)
+    return commands, time.perf_counter() - start
+
+
+class BatchPipeline:
+    """
+    Staged batch executor with bounded queues.
+
+    Args:
+        preset: Label preset for every tag in the batch
+        use_usb / printer_name / printer_ip: Transport, as for print_tag
+        use_zpl / use_epl: Printer language, as for print_tag
+        dry_run: Render and record, but don't send
+        csv_path: Print history file (None = don't record)
+        queue_size: Capacity of each inter-stage queue
+        render_processes: 0 renders on a thread; N > 0 uses N processes
+        render_chunk: Jobs per process-pool task (up to two tasks per process
+            are in flight; results are passed on in submission order)
+        sender: Optional callable(command, job) -> bool replacing the transport
+        skip_rows: Row numbers to leave out (e.g. already printed before a restart)
+    """
+
+    def __init__(self, preset: str = DEFAULT_PRESET,
+                 use_usb: bool = None,
+                 printer_name: Optional[str] = None,
+                 printer_ip: Optional[str] = None,
+                 use_zpl: bool = False,
+                 use_epl: bool = False,
+                 dry_run: bool = False,
+                 csv_path: Optional[str] = CSV_FILE,
+                 queue_size: int = 16,
+                 render_processes: int = 0,
+                 render_chunk: int = 32,
+                 sender=None,
+                 skip_rows: Optional[set] = None):
+        self.preset = preset
+        self.use_usb = use_usb
+        self.printer_name = printer_name
+        self.printer_ip = printer_ip
+        self.use_zpl = use_zpl
+        self.use_epl = use_epl
+        self.dry_run = dry_run
+        self.csv_path = csv_path
+        self.queue_size = max(1, queue_size)
+        self.render_processes = render_processes
+        self.render_chunk = max(1, render_chunk)
+        self.sender = sender
+        self.skip_rows = skip_rows or set()
+
+        self.stats = {name: StageStats(name) for name in ("parse", "render", "send", "record")}
+        self.errors = []
+        self.rows = 0
+        self.sent = 0
+        self.confirmed = 0
+        self.last_sent_row = None
+        self._abort = threading.Event()
+        self._cancelled = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+
+    # -- control -----------------------------------------------------------
+
+    def pause(self):
+        """Hold the send stage before its next label."""
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def cancel(self):
+        """Stop after the current label and clear the printer's buffer."""
+        self._cancelled.set()
+        self._abort.set()
+        self._running.set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
+
+    def progress(self) -> dict:
+        """Labels read so far, sent to the printer and confirmed by the transport."""
+        return {"read": self.rows, "sent": self.sent, "confirmed": self.confirmed,
+                "paused": self.paused, "cancelled": self._cancelled.is_set()}
+
+    def _send(self, command: bytes, job: Optional[dict]) -> bool:
+        if self.sender:
+            return bool(self.sender(command, job))
+        return send_command(command, self.use_usb, self.printer_name, self.printer_ip)
+
+    # -- queue helpers -----------------------------------------------------
+
+    def _get(self, q: queue.Queue, stats: StageStats):
+        start = time.perf_counter()
+        item = q.get()
+        stats.wait_in += time.perf_counter() - start
+        return item
+
+    def _put(self, q: queue.Queue, item, stats: StageStats):
+        start = time.perf_counter()
+        q.put(item)
+        stats.wait_out += time.perf_counter() - start
+
+    @staticmethod
+    def _drain(q: queue.Queue):
+        """Consume a queue to its end marker so upstream stages never block."""
+        while q.get() is not _END:
+            pass
+
+    # -- stages ------------------------------------------------------------
+
+    def _parse_stage(self, source, out_q: queue.Queue):
+        stats = self.stats["parse"]
+        try:
+            for row_number, row, mapping in read_batch_rows(source):
+                if self._abort.is_set():
+                    break
+                if row_number in self.skip_rows:
+                    continue
+                self.rows += 1
+                start = time.perf_counter()
+                try:
+                    job = parse_row(row, mapping)
+                except (ValueError, TypeError, KeyError, IndexError) as e:
+                    stats.add_busy(time.perf_counter() - start)
+                    self.errors.append((row_number, f"parse: {e}"))
+                    continue
+                job["row"] = row_number
+                stats.add_busy(time.perf_counter() - start)
+                stats.items += 1
+                self._put(out_q, job, stats)
+        except Exception as e:
+            self.errors.append((0, f"parse: {e}"))
+            self._abort.set()
+        finally:
+            out_q.put(_END)
+
+    def _render_stage(self, in_q: queue.Queue, out_q: queue.Queue):
+        stats = self.stats["render"]
+        pool = ProcessPoolExecutor(self.render_processes) if self.render_processes > 0 else None
+        chunk = []
+        # (jobs, future) in submission order; two per process keeps every worker fed
+        in_flight = deque()
+        window = 2 * self.render_processes
+        ended = False
+        if pool:
+            stats.workers = self.render_processes
+
+        def submit():
+            nonlocal chunk
+            in_flight.append((chunk, pool.submit(_render_chunk, chunk, self.preset,
+                                                  self.use_zpl, self.use_epl)))
+            chunk = []
+
+        def collect():
+            jobs, future = in_flight.popleft()
+            commands, seconds = future.result()
+            stats.add_busy(seconds, len(jobs))
+            for job, command in zip(jobs, commands):
+                if isinstance(command, Exception):
+                    self.errors.append((job["row"], f"render: {command}"))
+                    continue
+                job["command"] = command
+                stats.items += 1
+                self._put(out_q, job, stats)
+
+        try:
+            while True:
+                job = self._get(in_q, stats)
+                if job is _END:
+                    ended = True
+                    break
+                if self._abort.is_set():
+                    continue
+                if pool:
+                    chunk.append(job)
+                    if len(chunk) >= self.render_chunk:
+                        submit()
+                        while len(in_flight) >= window:
+                            collect()
+                    continue
+                start = time.perf_counter()
+                try:
+                    job["command"] = _render_one(job, self.preset, self.use_zpl, self.use_epl)
+                except Exception as e:
+                    stats.add_busy(time.perf_counter() - start)
+                    self.errors.append((job["row"], f"render: {e}"))
+                    continue
+                stats.add_busy(time.perf_counter() - start)
+                stats.items += 1
+                self._put(out_q, job, stats)
+            if pool and chunk:
+                submit()
+            while in_flight:
+                collect()
+        except Exception as e:
+            self.errors.append((0, f"render: {e}"))
+            self._abort.set()
+            if not ended:
+                self._drain(in_q)
+        finally:
+            if pool:
+                pool.shutdown()
+            out_q.put(_END)
+
+    def _send_stage(self, in_q: queue.Queue, out_q: queue.Queue):
+        stats = self.stats["send"]
+        ended = False
+        try:
+            while True:
+                job = self._get(in_q, stats)
+                if job is _END:
+                    ended = True
+                    break
+                self._running.wait()
+                if self._abort.is_set():
+                    continue
+                start = time.perf_counter()
+                self.sent += 1
+                job["success"] = True if self.dry_run else self._send(job["command"], job)
+                self.confirmed += job["success"]
+                self.last_sent_row = job["row"]
+                stats.add_busy(time.perf_counter() - start)
+                stats.items += 1
+                self._put(out_q, job, stats)
+        except Exception as e:
+            self.errors.append((0, f"send: {e}"))
+            self._abort.set()
+            if not ended:
+                self._drain(in_q)
+        finally:
+            if self._cancelled.is_set() and not self.dry_run:
+                self._send(create_cancel_command(), None)
+            out_q.put(_END)
+
+    def _record_stage(self, in_q: queue.Queue, counts: dict):
+        stats = self.stats["record"]
+        writer = None
+        ended = False
+        try:
+            if self.csv_path:
+                writer = HistoryWriter(self.csv_path)
+            while True:
+                job = self._get(in_q, stats)
+                if job is _END:
+                    ended = True
+                    break
+                start = time.perf_counter()
+                if writer:
+                    writer.write(job["item_number"], job["price"], job["carat_weight"],
+                                 job["gold_karat"], job["success"])
+                if not job["success"]:
+                    self.errors.append((job["row"], "send: printer rejected or unreachable"))
+                # Only the outcome is kept, so memory doesn't grow with the batch
+                counts["printed" if job["success"] else "failed"] += 1
+                stats.add_busy(time.perf_counter() - start)
+                stats.items += 1
+                memprofile.count_labels()
+        except Exception as e:
+            self.errors.append((0, f"record: {e}"))
+            self._abort.set()
+            if not ended:
+                self._drain(in_q)
+        finally:
+            if writer:
+                writer.close()
+
+    # -- driver ------------------------------------------------------------
+
+    def run(self, source: Union[str, Iterable]) -> dict:
+        """Run the batch to completion and return a summary dict."""
+        parse_q = queue.Queue(self.queue_size)
+        send_q = queue.Queue(self.queue_size)
+        record_q = queue.Queue(self.queue_size)
+        counts = {"printed": 0, "failed": 0}
+
+        threads = [
+            threading.Thread(target=self._parse_stage, args=(source, parse_q),
+                             name="batch-parse", daemon=True),
+            threading.Thread(target=self._render_stage, args=(parse_q, send_q),
+                             name="batch-render", daemon=True),
+            threading.Thread(target=self._send_stage, args=(send_q, record_q),
+                             name="batch-send", daemon=True),
+            threading.Thread(target=self._record_stage, args=(record_q, counts),
+                             name="batch-record", daemon=True),
+        ]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        try:
+            for t in threads:
+                t.join()
+        except KeyboardInterrupt:
+            print("\n⚠ Cancelling batch - clearing printer buffer...")
+            self.cancel()
+            for t in threads:
+                t.join()
+        wall = time.perf_counter() - start
+
+        stages = [s.as_dict(wall) for s in self.stats.values()]
+        recorded = counts["printed"] + counts["failed"]
+        bottleneck = max(stages, key=lambda s: s["utilization"])["stage"] if recorded else None
+        return {
+            "total": self.rows,
+            "printed": counts["printed"],
+            "failed": counts["failed"],
+            "errors": sorted(self.errors),
+            "wall_s": round(wall, 4),
+            "labels_per_min": round(recorded / wall * 60, 1) if wall > 0 else 0.0,
+            "stages": stages,
+            "bottleneck": bottleneck,
+            "cancelled": self._cancelled.is_set(),
+            "sent": self.sent,
+            "confirmed": self.confirmed,
+            "next_row": (self.last_sent_row + 1 if self._cancelled.is_set()
+                         and self.last_sent_row is not None else None),
+        }
+
+
+def run_batch(source: Union[str, Iterable], **kwargs) -> dict:
+    """Print a batch of tags (CSV path or iterable of dicts) through the pipeline."""
+    return BatchPipeline(**kwargs).run(source)
+
+
+def print_batch_report(summary: dict):
+    """Print a batch summary with per-stage utilization."""
+    tag_log.flush()
+    print("\n" + "="*50)
+    print("BATCH SUMMARY")
+    print("="*50)
+    print(f"Printed:      {summary['printed']}")
+    print(f"Failed:       {summary['failed']}")
+    print(f"Time:         {summary['wall_s']:.2f}s ({summary['labels_per_min']} labels/min)")
+    if summary.get("cancelled"):
+        print(f"⚠ Cancelled after {summary['sent']} labels - printer buffer cleared")
+        if summary["next_row"]:
+            print(f"ℹ Resume with --resume-from {summary['next_row']} - start earlier if "
+                  f"the last tags sent before the cancel didn't come out")
+    print("-"*50)
+    print(f"{'Stage':8} {'Items':>7} {'Busy s':>8} {'Starved':>8} {'Blocked':>8} {'Util':>6}")
+    for s in summary["stages"]:
+        marker = "  <-- bottleneck" if s["stage"] == summary["bottleneck"] else ""
+        print(f"{s['stage']:8} {s['items']:7} {s['busy_s']:8.3f} {s['starved_s']:8.3f} "
+              f"{s['blocked_s']:8.3f} {s['utilization']:6.0%}{marker}")
+    if summary["errors"]:
+        print("-"*50)
+        for row, message in summary["errors"][:20]:
+            print(f"✗ Row {row}: {message}")
+        if len(summary["errors"]) > 20:
+            print(f"  ... and {len(summary['errors']) - 20} more")
+    print("="*50)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Fake Printers
+Local stand-ins for a printer, for benchmarks and replay tests: a TCP
+server on 127.0.0.1 that reads and discards (counting bytes), and a FIFO
+drained by a thread, standing in for a raw device node like /dev/usb/lp0.
+
+    python benchmarks/fake_printer.py --port 9100     # run one until Ctrl+C
+"""
+
+import argparse
+import os
+import selectors
+import socket
+import tempfile
+import threading
+
+
+class FakeTcpPrinter:
+    """Accepts any number of connections and discards what they send."""
+
+    def __init__(self, port: int = 0):
+        self.sock = socket.socket()
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(("127.0.0.1", port))
+        self.sock.listen(1024)
+        self.sock.setblocking(False)
+        self.port = self.sock.getsockname()[1]
+        self.received = 0
+        self.connections = 0
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.sock, selectors.EVENT_READ)
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="fake-printer", daemon=True)
+
+    def start(self) -> "FakeTcpPrinter":
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stopping:
+            for key, _ in self._selector.select(timeout=0.1):
+                if key.fileobj is self.sock:
+                    try:
+                        conn, _ = self.sock.accept()
+                    except BlockingIOError:
+                        continue
+                    conn.setblocking(False)
+                    self.connections += 1
+                    self._selector.register(conn, selectors.EVENT_READ)
+                    continue
+                try:
+                    data = key.fileobj.recv(65536)
+                except OSError:
+                    data = b""
+                if data:
+                    self.received += len(data)
+                else:
+                    self._selector.unregister(key.fileobj)
+                    key.fileobj.close()
+
+    def stop(self):
+        self._stopping = True
+        self._thread.join()
+        for key in list(self._selector.get_map().values()):
+            key.fileobj.close()
+        self._selector.close()
+
+
+class FakeFifoPrinter:
+    """A named pipe with a reader thread (POSIX only)."""
+
+    def __init__(self):
+        self.directory = tempfile.mkdtemp(prefix="fake-printer-")
+        self.path = os.path.join(self.directory, "lp0")
+        os.mkfifo(self.path)
+        self.received = 0
+        self._thread = threading.Thread(target=self._run, name="fake-fifo", daemon=True)
+
+    def start(self) -> "FakeFifoPrinter":
+        self._thread.start()
+        return self
+
+    def _run(self):
+        with open(self.path, 'rb', buffering=0) as f:
+            while True:
+                data = f.read(65536)
+                if not data:
+                    return
+                self.received += len(data)
+
+    def stop(self):
+        # The reader ends when the last writer closes
+        self._thread.join(timeout=5)
+        os.remove(self.path)
+        os.rmdir(self.directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a fake TCP printer')
+    parser.add_argument('--port', type=int, default=9100)
+    args = parser.parse_args()
+    printer = FakeTcpPrinter(args.port).start()
+    print(f"🖨️ Fake printer on 127.0.0.1:{printer.port} - Ctrl+C to stop")
+    try:
+        printer._thread.join()
+    except KeyboardInterrupt:
+        print(f"\n{printer.connections} connections, {printer.received:,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite
+Repeatable timings for the paths a print takes, with results as JSON and
+a comparison against a saved baseline.
+
+    python benchmarks/run_benchmarks.py                 # run, compare to baseline.json
+    python benchmarks/run_benchmarks.py --quick         # 1/10th the work
+    python benchmarks/run_benchmarks.py --only render   # scenarios matching 'render'
+    python benchmarks/run_benchmarks.py --save-baseline # accept these numbers
+    python benchmarks/run_benchmarks.py --output results.json
+
+Scenarios:
+    render/<preset>/<language>   100k labels through render_command
+    transport/tcp_pooled         100k sends on one PrinterConnection socket
+    transport/tcp_connect        2k send_to_printer calls (a connection each)
+    transport/fifo               100k writes to a FIFO standing in for a
+                                 raw device node (POSIX only)
+    history/writer               100k rows through HistoryWriter
+    history/save_to_csv          10k save_to_csv calls (open/append/close)
+    preview/barcode              1k generate_barcode_preview images
+                                 (skipped without python-barcode/Pillow)
+    memory/batch                 100k-row dry-run batch under tracemalloc,
+                                 checked against the per-label memory
+                                 budget (--mem-budget, KB)
+
+Printers are the local fakes in fake_printer.py. Logging is set to
+warnings only so console speed doesn't skew the numbers. Each scenario is
+run --repeat times and the best is kept. A scenario slower than the
+baseline by more than --tolerance (ops/s), a memory scenario over its
+budget, or a scenario that raises is a regression and the run exits 1.
+Baselines are machine-specific - save one per machine.
+"""
+
+import argparse
+import fnmatch
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import memprofile
+import tag_log
+from batch_printer import run_batch
+from jewelry_tag_printer import (
+    render_command, send_to_printer, save_to_csv, generate_barcode_preview,
+    HistoryWriter, BARCODE_PREVIEW_AVAILABLE
+)
+from transport import PrinterConnection
+from label_geometry import PRESET_LAYOUTS
+from fake_printer import FakeTcpPrinter, FakeFifoPrinter
+
+BASELINE_FILE = os.path.join(HERE, "baseline.json")
+
+# A scenario this much slower than its baseline fails
+TOLERANCE = 0.25
+
+LANGUAGES = {"dpl": {}, "zpl": {"use_zpl": True}, "epl": {"use_epl": True}}
+
+
+def sample_labels(count: int, seed: int = 1) -> list:
+    """Deterministic, varied tag data (item, price, carat, karat)."""
+    rng = random.Random(seed)
+    labels = []
+    for _ in range(count):
+        item = f"{rng.choice(['MSD', 'R', 'BND', 'PND'])}{rng.randint(1000, 999999)}"
+        price = rng.choice([rng.randint(50, 50000), round(rng.uniform(50, 9999), 2)])
+        labels.append((item, price, round(rng.uniform(0, 8), 2), rng.choice([10, 14, 18, 22, 24])))
+    return labels
+
+
+# -- scenarios --------------------------------------------------------------
+# Each returns (operations, bytes or None); the runner times the call.
+
+def render_scenario(preset: str, language: str, count: int):
+    labels = sample_labels(count)
+    options = LANGUAGES[language]
+
+    def run():
+        total = 0
+        for item, price, carat, karat in labels:
+            total += len(render_command(item, price, carat, karat, preset, **options))
+        return count, total
+    return run
+
+
+def command_bytes(count: int) -> list:
+    return [render_command(*label) for label in sample_labels(count)]
+
+
+def tcp_pooled_scenario(count: int):
+    commands = command_bytes(count)
+
+    def run():
+        printer = FakeTcpPrinter().start()
+        conn = PrinterConnection("bench", {"connection": "network", "ip": "127.0.0.1",
+                                           "port": printer.port, "printer_name": None,
+                                           "dpi": 203})
+        try:
+            for command in commands:
+                if not conn.send(command):
+                    raise RuntimeError(conn.last_error)
+        finally:
+            conn.close()
+            printer.stop()
+        return count, sum(map(len, commands))
+    return run
+
+
+def tcp_connect_scenario(count: int):
+    commands = command_bytes(count)
+
+    def run():
+        printer = FakeTcpPrinter().start()
+        try:
+            for command in commands:
+                if not send_to_printer(command, "127.0.0.1", printer.port):
+                    raise RuntimeError("send_to_printer failed")
+        finally:
+            printer.stop()
+        return count, sum(map(len, commands))
+    return run
+
+
+def fifo_scenario(count: int):
+    commands = command_bytes(count)
+
+    def run():
+        printer = FakeFifoPrinter().start()
+        try:
+            # Unbuffered, one write per label - like a spooler writing a device node
+            with open(printer.path, 'wb', buffering=0) as device:
+                for command in commands:
+                    device.write(command)
+        finally:
+            printer.stop()
+        return count, sum(map(len, commands))
+    return run
+
+
+def history_writer_scenario(count: int):
+    labels = sample_labels(count)
+
+    def run():
+        directory = tempfile.mkdtemp(prefix="bench-history-")
+        try:
+            writer = HistoryWriter(os.path.join(directory, "history.csv"))
+            for index, (item, price, carat, karat) in enumerate(labels):
+                writer.write(item, price, carat, karat, index % 50 != 0)
+            writer.close()
+        finally:
+            shutil.rmtree(directory)
+        return count, None
+    return run
+
+
+def save_to_csv_scenario(count: int):
+    labels = sample_labels(count)
+
+    def run():
+        directory = tempfile.mkdtemp(prefix="bench-history-")
+        path = os.path.join(directory, "history.csv")
+        try:
+            for item, price, carat, karat in labels:
+                save_to_csv(item, price, carat, karat, True, csv_path=path)
+        finally:
+            shutil.rmtree(directory)
+        return count, None
+    return run
+
+
+def barcode_preview_scenario(count: int):
+    items = [label[0] for label in sample_labels(count)]
+
+    def run():
+        directory = tempfile.mkdtemp(prefix="bench-barcodes-")
+        try:
+            for item in items:
+                if generate_barcode_preview(item, output_dir=directory) is None:
+                    raise RuntimeError("preview failed")
+        finally:
+            shutil.rmtree(directory)
+        return count, None
+    return run
+
+
+def scenarios(scale: float) -> dict:
+    """Scenario name -> (factory, skip reason or None)."""
+    def n(count):
+        return max(1, int(count * scale))
+
+    table = {}
+    for preset in PRESET_LAYOUTS:
+        table[f"render/{preset}/dpl"] = (render_scenario(preset, "dpl", n(100_000)), None)
+    for language in ("zpl", "epl"):
+        # ZPL/EPL have one layout, whatever the preset
+        table[f"render/standard/{language}"] = (render_scenario("standard", language,
+                                                                n(100_000)), None)
+    table["transport/tcp_pooled"] = (tcp_pooled_scenario(n(100_000)), None)
+    table["transport/tcp_connect"] = (tcp_connect_scenario(n(2_000)), None)
+    table["transport/fifo"] = (fifo_scenario(n(100_000)),
+                               None if hasattr(os, "mkfifo") else "no FIFOs on this platform")
+    table["history/writer"] = (history_writer_scenario(n(100_000)), None)
+    table["history/save_to_csv"] = (save_to_csv_scenario(n(10_000)), None)
+    table["preview/barcode"] = (barcode_preview_scenario(n(1_000)),
+                                None if BARCODE_PREVIEW_AVAILABLE
+                                else "python-barcode not installed")
+    return table
+
+
+def memory_batch_scenario(count: int, budget_kb: float):
+    rows = [{"item_number": item, "price": price, "carat": carat, "karat": karat}
+            for item, price, carat, karat in sample_labels(count)]
+
+    def run():
+        # Imports and the first render happen before the baseline
+        run_batch(rows[:1], dry_run=True, csv_path=None)
+        with memprofile.MemoryProfiler(budget_kb=budget_kb, warmup_labels=0) as mem:
+            summary = run_batch(rows, dry_run=True, csv_path=None)
+            mem.count_labels(summary["printed"])
+        report = mem.report()
+        return {key: report[key] for key in ("labels", "bytes_per_label", "peak_traced_kb",
+                                             "budget_kb", "judged", "within_budget")}
+    return run
+
+
+def memory_scenarios(scale: float, budget_kb: float) -> dict:
+    """Scenario name -> runner returning a memprofile report (run once, not timed)."""
+    return {"memory/batch": memory_batch_scenario(max(1, int(100_000 * scale)), budget_kb)}
+
+
+# -- runner -----------------------------------------------------------------
+
+def run_scenario(run, repeat: int) -> dict:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ops, nbytes = run()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best[0]:
+            best = (elapsed, ops, nbytes)
+    elapsed, ops, nbytes = best
+    result = {"ops": ops, "seconds": round(elapsed, 4),
+              "ops_per_s": round(ops / elapsed, 1),
+              "us_per_op": round(elapsed / ops * 1e6, 3)}
+    if nbytes is not None:
+        result["mb_per_s"] = round(nbytes / elapsed / 1e6, 2)
+    return result
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {"python": platform.python_version(), "platform": platform.platform(),
+            "machine": platform.machine(), "commit": commit or None}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> int:
+    """
+    Print each scenario against its baseline; returns the number of
+    regressions (scenarios that failed to run count as regressions).
+    """
+    regressions = 0
+    base = baseline.get("scenarios", {})
+    for name, result in results.items():
+        if "failed" in result:
+            regressions += 1
+            print(f"✗ {name:24} failed: {result['failed']}")
+            continue
+        if "skipped" in result:
+            print(f"ℹ {name:24} skipped ({result['skipped']})")
+            continue
+        if "bytes_per_label" in result:
+            line = f"{name:24} {result['bytes_per_label']:>12,.1f} bytes/label"
+            if not result["judged"]:
+                print(f"ℹ {line}  (budget not checked)")
+            elif result["within_budget"]:
+                print(f"✓ {line}  (budget {result['budget_kb']} KB)")
+            else:
+                regressions += 1
+                print(f"✗ {line}  over budget of {result['budget_kb']} KB")
+            continue
+        line = f"{name:24} {result['ops_per_s']:>12,.0f} ops/s {result['us_per_op']:>10.2f} us/op"
+        previous = base.get(name, {}).get("ops_per_s")
+        if not previous:
+            print(f"ℹ {line}  (no baseline)")
+            continue
+        change = result["ops_per_s"] / previous - 1
+        if change < -tolerance:
+            regressions += 1
+            print(f"✗ {line}  {change:+.0%} vs baseline")
+        else:
+            print(f"✓ {line}  {change:+.0%} vs baseline")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the benchmark suite')
+    parser.add_argument('--only', action='append', metavar='PATTERN',
+                        help='Scenarios containing PATTERN or matching the glob (repeatable)')
+    parser.add_argument('--quick', action='store_true', help='Run 1/10th of the work')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per scenario (default: 3)')
+    parser.add_argument('--baseline', default=BASELINE_FILE,
+                        help='Baseline JSON (default: benchmarks/baseline.json)')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Write the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help=f'Allowed slowdown before failing, as a fraction (default: {TOLERANCE})')
+    parser.add_argument('--mem-budget', type=float, default=memprofile.MEMPROFILE_BUDGET_KB,
+                        metavar='KB', help=f'Memory budget per label for memory/* '
+                                           f'(default: {memprofile.MEMPROFILE_BUDGET_KB})')
+    parser.add_argument('--output', metavar='JSON', help='Also write the results here')
+    parser.add_argument('--list', action='store_true', help='List scenarios and exit')
+    args = parser.parse_args()
+
+    scale = 0.1 if args.quick else 1.0
+    table = scenarios(scale)
+    memory = memory_scenarios(scale, args.mem_budget)
+    if args.list:
+        for name, (_, skip) in table.items():
+            print(f"  {name}{f'  (skipped: {skip})' if skip else ''}")
+        for name in memory:
+            print(f"  {name}")
+        return
+    if args.only:
+        def wanted(name):
+            return any(p in name or fnmatch.fnmatch(name, p) for p in args.only)
+        table = {name: entry for name, entry in table.items() if wanted(name)}
+        memory = {name: run for name, run in memory.items() if wanted(name)}
+
+    # Console speed is not what we are measuring
+    tag_log.configure(level=logging.WARNING, lean_records=True)
+
+    print("="*50)
+    print(f"BENCHMARKS - {len(table) + len(memory)} scenarios{' (quick)' if args.quick else ''}")
+    print("="*50)
+    results = {}
+    for name, (run, skip) in table.items():
+        if skip:
+            results[name] = {"skipped": skip}
+            continue
+        try:
+            results[name] = run_scenario(run, max(1, args.repeat))
+        except Exception as e:
+            results[name] = {"failed": str(e) or type(e).__name__}
+    for name, run in memory.items():
+        try:
+            results[name] = run()
+        except Exception as e:
+            results[name] = {"failed": str(e) or type(e).__name__}
+
+    report = {"created": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+              "quick": args.quick, "repeat": args.repeat,
+              "environment": environment(), "scenarios": results}
+    try:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    except (OSError, ValueError):
+        baseline = {}
+    if baseline and baseline.get("quick") != args.quick:
+        print("⚠ Baseline was recorded with a different --quick setting")
+    regressions = compare(results, baseline, args.tolerance)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Results saved to {args.output}")
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Baseline saved to {args.baseline}")
+    failed = sum(1 for result in results.values() if "failed" in result)
+    if failed:
+        print(f"✗ {failed} scenario(s) failed to run")
+        sys.exit(1)
+    if regressions and not args.save_baseline:
+        print(f"✗ {regressions} scenario(s) slower than baseline by more than "
+              f"{args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
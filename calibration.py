@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Print Calibration
+Measures where the printer really puts things from a scan or photo of a
+printed fiducial grid, instead of eyeballing position_tool.py markers.
+
+    python calibration.py --print-grid -l standard          # 1. print the grid
+    python calibration.py --analyze scan.png -l standard    # 2. measure it
+    python calibration.py --analyze scan.png --save         # ...and apply it
+    python calibration.py --synthesize sample.pgm --offset-x 1.5 --rotate 0.8
+
+Crop the image to the label's edges and orient it like the preview
+(python dpl_raster.py): the label edges are the reference for the offset.
+The grid's squares are located with NumPy, matched to where they were sent,
+and a least-squares fit gives the X/Y offset (mm, at the label centre),
+scale and rotation. --save writes them to the calibration file, which
+label_geometry applies to every field position of the preset at every DPI.
+Rotation can't be corrected by moving fields; it is reported so the media
+guide can be fixed.
+
+Requires NumPy (pip install numpy). PGM images are read directly; PNG/JPEG
+need Pillow. --synthesize makes sample images with a known error, for
+checking the analysis without a printer or scanner.
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from jewelry_tag_printer import send_command, DEFAULT_PRESET, USB_PRINTER_NAME, PRINTER_IP, DPI
+from label_geometry import (PRESET_LAYOUTS, CALIBRATION_FILE, dots_per_mm, to_dots,
+                            load_calibration)
+from dpl_raster import render_label
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+# Fiducial squares (mm) and their distance from the label edges
+FIDUCIAL_MM = 2.5
+MARGIN_MM = 2.5
+
+# Matching assumes the print is no more than this far off square
+MAX_ROTATION_DEG = 30
+
+
+def fiducial_centers(preset: str) -> list:
+    """Where the grid's square centres are meant to be, (x, y) in mm."""
+    layout = PRESET_LAYOUTS[preset]
+    width, height = layout["width_mm"], layout["height_mm"]
+    nx = 4 if width >= 40 else 2
+    ny = 3 if height >= 20 else 2
+    xs = [MARGIN_MM + i * (width - 2 * MARGIN_MM) / (nx - 1) for i in range(nx)]
+    ys = [MARGIN_MM + j * (height - 2 * MARGIN_MM) / (ny - 1) for j in range(ny)]
+    return [(x, y) for y in ys for x in xs]
+
+
+def create_grid_command(preset: str, dpi: int = DPI) -> bytes:
+    """DPL for the fiducial grid: a filled square at each centre."""
+    layout = PRESET_LAYOUTS[preset]
+    size = to_dots(FIDUCIAL_MM, dpi)
+    dpl = ["\x02n", "\x02L", "D11", f"PW{to_dots(layout['height_mm'], dpi)}"]
+    for x, y in fiducial_centers(preset):
+        column = to_dots(x, dpi) - size // 2
+        row = to_dots(y, dpi) - size // 2
+        dpl.append(f"1X11000{row:04d}{column:04d}l{size:04d}{size:04d}")
+    dpl += ["Q0001", "E"]
+    return "\r\n".join(dpl).encode('ascii')
+
+
+# -- images -----------------------------------------------------------------
+
+def load_image(path: str) -> "np.ndarray":
+    """Grayscale image as a 2-D uint8 array (PGM natively, others via Pillow)."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:2] in (b"P5", b"P2"):
+        fields, pos = [], 2
+        while len(fields) < 3:
+            while data[pos:pos + 1].isspace():
+                pos += 1
+            if data[pos:pos + 1] == b"#":
+                pos = data.index(b"\n", pos)
+                continue
+            end = pos
+            while not data[end:end + 1].isspace():
+                end += 1
+            fields.append(int(data[pos:end]))
+            pos = end
+        width, height, maxval = fields
+        if data[:2] == b"P2":
+            pixels = np.array(data[pos:].split()[:width * height], dtype=np.float64)
+        else:
+            pixels = np.frombuffer(data, dtype=np.uint8, count=width * height, offset=pos + 1)
+        return (pixels.reshape(height, width) * (255 / maxval)).astype(np.uint8)
+    if not PIL_AVAILABLE:
+        raise ValueError("only PGM images can be read without Pillow (pip install Pillow)")
+    return np.asarray(Image.open(path).convert("L"))
+
+
+def otsu_threshold(gray: "np.ndarray") -> int:
+    """Gray level that best splits ink from paper."""
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256)
+    weight = np.cumsum(hist)
+    mean = np.cumsum(hist * levels)
+    total = weight[-1]
+    between = (mean[-1] * weight - mean * total) ** 2 / np.maximum(weight * (total - weight), 1)
+    return int(np.argmax(between))
+
+
+def find_blobs(mask: "np.ndarray") -> list:
+    """
+    Connected dark regions as dicts (area, cx, cy, bbox). Works on row runs
+    with a union-find, so only the run boundaries are visited in Python.
+    """
+    padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    start_rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+
+    parent = list(range(len(starts)))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    previous = []               # (start, end, run index) on the row above
+    current, row = [], -1
+    for index, (y, x0, x1) in enumerate(zip(start_rows, starts, ends)):
+        if y != row:
+            previous = current if y == row + 1 else []
+            current, row = [], y
+        for p0, p1, other in previous:
+            if p0 < x1 and x0 < p1:
+                a, b = root(index), root(other)
+                if a != b:
+                    parent[a] = b
+        current.append((x0, x1, index))
+
+    blobs = {}
+    for index, (y, x0, x1) in enumerate(zip(start_rows, starts, ends)):
+        length = int(x1 - x0)
+        blob = blobs.setdefault(root(index), {"area": 0, "sx": 0.0, "sy": 0.0,
+                                              "bbox": [x0, y, x1, y + 1]})
+        blob["area"] += length
+        blob["sx"] += (x0 + x1 - 1) / 2 * length
+        blob["sy"] += y * length
+        box = blob["bbox"]
+        box[0], box[1] = min(box[0], x0), min(box[1], y)
+        box[2], box[3] = max(box[2], x1), max(box[3], y + 1)
+    return [{"area": b["area"], "cx": b["sx"] / b["area"], "cy": b["sy"] / b["area"],
+             "bbox": [int(v) for v in b["bbox"]]} for b in blobs.values()]
+
+
+def fit_similarity(sent: "np.ndarray", found: "np.ndarray") -> tuple:
+    """Least-squares found = scale * R(angle) @ sent + t (Umeyama). Returns (scale, angle, t)."""
+    mean_s, mean_f = sent.mean(axis=0), found.mean(axis=0)
+    a, b = sent - mean_s, found - mean_f
+    u, sv, vt = np.linalg.svd(b.T @ a / len(sent))
+    d = np.diag([1.0, np.sign(np.linalg.det(u @ vt)) or 1.0])
+    rotation = u @ d @ vt
+    scale = np.trace(np.diag(sv) @ d) / (a ** 2).sum(axis=1).mean()
+    t = mean_f - scale * rotation @ mean_s
+    return scale, math.atan2(rotation[1, 0], rotation[0, 0]), t
+
+
+def match_points(sent: "np.ndarray", found: "np.ndarray") -> "np.ndarray":
+    """Order found points to correspond to sent ones (rotation up to MAX_ROTATION_DEG)."""
+    a = sent - sent.mean(axis=0)
+    b = found - found.mean(axis=0)
+    a = a * math.sqrt((b ** 2).sum() / (a ** 2).sum())
+    best = None
+    for step in range(-MAX_ROTATION_DEG * 4, MAX_ROTATION_DEG * 4 + 1):
+        angle = math.radians(step / 4)
+        c, s = math.cos(angle), math.sin(angle)
+        turned = a @ np.array([[c, s], [-s, c]])
+        distance = ((turned[:, None, :] - b[None, :, :]) ** 2).sum(axis=2)
+        order = distance.argmin(axis=1)
+        cost = distance[np.arange(len(a)), order].sum()
+        if len(set(order.tolist())) == len(a) and (best is None or cost < best[0]):
+            best = (cost, order)
+    if best is None:
+        raise ValueError("could not match the squares to the grid")
+    return found[best[1]]
+
+
+def analyze_image(path: str, preset: str) -> dict:
+    """Measure offset, scale and rotation from an image of the printed grid."""
+    gray = load_image(path)
+    layout = PRESET_LAYOUTS[preset]
+    px_per_mm_x = gray.shape[1] / layout["width_mm"]
+    px_per_mm_y = gray.shape[0] / layout["height_mm"]
+    expected_area = FIDUCIAL_MM ** 2 * px_per_mm_x * px_per_mm_y
+
+    mask = gray < otsu_threshold(gray)
+    squares = []
+    for blob in find_blobs(mask):
+        x0, y0, x1, y1 = blob["bbox"]
+        fill = blob["area"] / ((x1 - x0) * (y1 - y0))
+        if 0.4 * expected_area <= blob["area"] <= 2.5 * expected_area and fill >= 0.45:
+            squares.append(blob)
+    sent = np.array(fiducial_centers(preset))
+    if len(squares) < len(sent):
+        raise ValueError(f"found {len(squares)} of {len(sent)} squares - check the image "
+                         f"is cropped to the label")
+    squares = sorted(squares, key=lambda b: -b["area"])[:len(sent)]
+    found = np.array([(b["cx"] / px_per_mm_x, b["cy"] / px_per_mm_y) for b in squares])
+    found = match_points(sent, found)
+
+    scale, angle, t = fit_similarity(sent, found)
+    center = np.array([layout["width_mm"] / 2, layout["height_mm"] / 2])
+    # Offset of the label centre, so it doesn't depend on the rotation
+    c, s = math.cos(angle), math.sin(angle)
+    offset = scale * np.array([[c, -s], [s, c]]) @ center + t - center
+    predicted = scale * (sent @ np.array([[c, s], [-s, c]])) + t
+    residual = float(np.sqrt(((predicted - found) ** 2).sum(axis=1).mean()))
+    return {
+        "offset_x_mm": round(float(offset[0]), 3),
+        "offset_y_mm": round(float(offset[1]), 3),
+        "scale": round(float(scale), 5),
+        "rotation_deg": round(math.degrees(angle), 3),
+        "residual_mm": round(residual, 3),
+        "image": os.path.abspath(path),
+        "measured": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def save_calibration(preset: str, result: dict, path: str = CALIBRATION_FILE):
+    calibration = load_calibration(path)
+    calibration[preset] = result
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(calibration, f, indent=2)
+    print(f"✓ Calibration for '{preset}' saved to {path}")
+
+
+def synthesize_image(path: str, preset: str, image_dpi: int = 300, offset_x: float = 0.0,
+                     offset_y: float = 0.0, rotate: float = 0.0, scale: float = 1.0,
+                     noise: float = 0.05, seed: int = 1):
+    """Write a PGM of the grid as a misaligned printer would print it."""
+    layout = PRESET_LAYOUTS[preset]
+    raster = render_label(create_grid_command(preset, DPI), to_dots(layout["width_mm"], DPI),
+                          to_dots(layout["height_mm"], DPI), DPI)
+    dots = np.array([[row >> x & 1 for x in range(raster.width)] for row in raster.rows],
+                    dtype=bool)
+    px_per_mm = image_dpi / 25.4
+    height = round(layout["height_mm"] * px_per_mm)
+    width = round(layout["width_mm"] * px_per_mm)
+    v, u = np.mgrid[0:height, 0:width]
+    # Image point (mm) back to where it was sent, about the label centre
+    cx, cy = layout["width_mm"] / 2, layout["height_mm"] / 2
+    mx, my = (u + 0.5) / px_per_mm - cx - offset_x, (v + 0.5) / px_per_mm - cy - offset_y
+    angle = math.radians(rotate)
+    sx = (math.cos(angle) * mx + math.sin(angle) * my) / scale + cx
+    sy = (-math.sin(angle) * mx + math.cos(angle) * my) / scale + cy
+    col = np.clip((sx * dots_per_mm(DPI)).astype(int), 0, raster.width - 1)
+    row = np.clip((sy * dots_per_mm(DPI)).astype(int), 0, raster.height - 1)
+    inside = (sx >= 0) & (sy >= 0) & (sx < layout["width_mm"]) & (sy < layout["height_mm"])
+    ink = dots[row, col] & inside
+    rng = np.random.default_rng(seed)
+    gray = np.where(ink, 40, 220) + rng.normal(0, noise * 255, ink.shape)
+    gray = np.clip(gray, 0, 255).astype(np.uint8)
+    with open(path, 'wb') as f:
+        f.write(b"P5\n%d %d\n255\n" % (width, height) + gray.tobytes())
+    print(f"✓ Wrote {path} ({width}x{height} px at {image_dpi} dpi)")
+
+
+def print_result(result: dict):
+    print(f"Offset:   X {result['offset_x_mm']:+.2f} mm, Y {result['offset_y_mm']:+.2f} mm")
+    print(f"Scale:    {result['scale']:.4f}")
+    print(f"Rotation: {result['rotation_deg']:+.2f}°")
+    print(f"Fit:      {result['residual_mm']:.3f} mm RMS")
+    if abs(result["rotation_deg"]) > 0.5:
+        print("⚠ Label is skewed - check the media guide (rotation isn't corrected)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Calibrate print position from an image')
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--print-grid', action='store_true', help='Print the fiducial grid')
+    mode.add_argument('--analyze', metavar='IMAGE', help='Measure a scan/photo of the grid')
+    mode.add_argument('--synthesize', metavar='PGM', help='Write a sample image')
+    mode.add_argument('--show', action='store_true', help='Show saved calibrations')
+    parser.add_argument('-l', '--label', default=DEFAULT_PRESET, choices=list(PRESET_LAYOUTS))
+    parser.add_argument('--save', action='store_true', help='Apply the measured calibration')
+    parser.add_argument('--printer', default=USB_PRINTER_NAME)
+    parser.add_argument('--network', action='store_true')
+    parser.add_argument('--ip', default=PRINTER_IP)
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument('--image-dpi', type=int, default=300)
+    parser.add_argument('--offset-x', type=float, default=0.0)
+    parser.add_argument('--offset-y', type=float, default=0.0)
+    parser.add_argument('--rotate', type=float, default=0.0)
+    parser.add_argument('--scale', type=float, default=1.0)
+    args = parser.parse_args()
+
+    if args.show:
+        calibration = load_calibration()
+        if not calibration:
+            print("No calibration saved")
+        for preset, result in calibration.items():
+            print(f"\n{preset} (measured {result.get('measured', '?')})")
+            print_result(result)
+        return
+
+    if args.print_grid:
+        command = create_grid_command(args.label)
+        if args.dry_run:
+            print(command.decode('ascii'))
+        elif send_command(command, use_usb=not args.network, printer_name=args.printer,
+                          printer_ip=args.ip):
+            print("✓ Grid sent - scan or photograph it, crop to the label, then --analyze")
+        return
+
+    if not NUMPY_AVAILABLE:
+        print("✗ Image analysis needs NumPy. Install: pip install numpy")
+        sys.exit(1)
+
+    if args.synthesize:
+        synthesize_image(args.synthesize, args.label, args.image_dpi, args.offset_x,
+                         args.offset_y, args.rotate, args.scale)
+        return
+
+    try:
+        result = analyze_image(args.analyze, args.label)
+    except (OSError, ValueError) as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+    print_result(result)
+    if args.save:
+        save_calibration(args.label, result)
+    else:
+        print("ℹ Run again with --save to apply it")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,38 +16,29 @@ Tag Layout (Back):
 # =============================================================================
 # Preset 1: Standard jewelry tag (42mm x 26mm body, 68mm with tail)
 # Preset 2: Narrow barbell tag (7/16" x 3.5" overall, 7/16" x 1.75" printable)
+#
+# Sizes are in mm, as the label feeds through the printer. The dot counts
+# (width_dots, height_dots, body_width_dots, ...) are worked out from these
+# for each print head resolution by label_geometry.py.
 
 LABEL_PRESETS = {
     "standard": {
         "name": "Standard RFID Tag (68x26mm)",
         "description": "Jewelry tag: 42mm body + 26mm tail, 26mm tall",
-        # Total label dimensions (as it feeds through printer)
-        "total_width_mm": 68,       # Full width with tail
-        "body_width_mm": 42,        # Main body width
+        "width_mm": 68,             # Full width with tail
         "height_mm": 26,            # Label height
+        "body_width_mm": 42,        # Main body width (printed)
         "tail_width_mm": 26,        # Tail portion (68-42)
         "tail_height_mm": 11,       # Tail is narrower (11mm)
-        # Dots at 203 DPI (8 dots per mm)
-        "width_dots": 544,          # 68mm total width
-        "height_dots": 208,         # 26mm height
-        "body_width_dots": 336,     # 42mm body
-        "printable_width_dots": 336, # Print on 42mm body
-        "printable_height_dots": 208,
     },
     "barbell": {
         "name": "Barbell Tag (7/16\" x 3.5\")",
         "description": "Folding tag: front(0.875\") + back(0.875\") + loop(1.75\")",
-        "width_inches": 0.4375,     # 7/16" = 11mm
-        "total_length_inches": 3.5, # 3.5" total
-        "printable_length_inches": 1.75,  # 1.75" printable (both halves)
-        "front_length_inches": 0.875,     # First half - product info
-        "back_length_inches": 0.875,      # Second half - barcode (folds behind)
-        "loop_length_inches": 1.75,       # Thin loop - NO printing
-        "width_dots": 89,           # 7/16" at 203 DPI
-        "height_dots": 355,         # 1.75" printable at 203 DPI
-        "front_dots": 177,          # First half for product info
-        "back_dots": 178,           # Second half for barcode
-        "loop_dots": 355,           # Loop - don't print here
+        "width_mm": 11.125,         # 7/16"
+        "height_mm": 44.375,        # 1.75" printable (both halves); 3.5" total
+        "front_mm": 22.125,         # First half - product info
+        "back_mm": 22.25,           # Second half - barcode (folds behind)
+        "loop_mm": 44.375,          # Thin loop after the printable part - NO printing
     }
 }
 
@@ -71,17 +62,94 @@ USB_PORT = "USB003"
 PRINTER_IP = "192.168.1.100"
 PRINTER_PORT = 9100
 
+# =============================================================================
+# PRINTER REGISTRY (for the print service / daemon printer farm)
+# =============================================================================
+# Each entry is one physical printer. "connection" is "usb" or "network".
+# "dpi" (203/300/600) picks the tag geometry table built by label_geometry.py.
+# Jobs that don't name a printer go to whichever printer is free first.
+PRINTERS = {
+    "counter": {
+        "name": "Counter E-4205A",
+        "connection": "usb",
+        "printer_name": "Datamax-O'Neil E-4205A Mark III",
+        "dpi": 203,
+    },
+    # "backroom": {
+    #     "name": "Back Room E-4305A",
+    #     "connection": "network",
+    #     "ip": "192.168.1.101",
+    #     "port": 9100,
+    #     "dpi": 300,
+    # },
+}
+DEFAULT_PRINTER = "counter"
+
 # =============================================================================
 # PRINTER SPECIFICATIONS
 # =============================================================================
-PRINTER_DPI = 203  # E-4205A = 203 DPI
+PRINTER_DPI = 203  # E-4205A = 203 DPI (used when no printer is named)
 
 # =============================================================================
 # FILE SETTINGS
 # =============================================================================
 CSV_FILE = "print_history.csv"
+
+# Log line format: "text" (console), "kv" (key=value) or "json" (JSON lines)
+LOG_FORMAT = "text"
+
+# Print offset/scale measured by calibration.py, applied to the presets
+CALIBRATION_FILE = "preset_calibration.json"
 BARCODE_PREVIEW_DIR = "barcodes"
 
+# Wire journal: every byte sent to a printer, for wire_journal.py to list,
+# rasterize or replay (None = off). Segments rotate at WIRE_JOURNAL_MAX_MB
+# and are gzipped; only the newest WIRE_JOURNAL_KEEP are kept.
+WIRE_JOURNAL_DIR = None
+WIRE_JOURNAL_MAX_MB = 16
+WIRE_JOURNAL_KEEP = 50
+
+# Printer-resident graphics (printer_graphics.py): images in GRAPHICS_DIR,
+# named after the graphic (LOGO.png, K14.png), are downloaded to a printer
+# once and referenced by name on each label. GRAPHICS_REGISTRY records what
+# each printer holds. LABEL_GRAPHICS places them per preset as
+# (name, row mm, column mm); "{karat}" in a name is the tag's gold karat.
+# The ZPL layout uses the "standard" entries. Example:
+#     LABEL_GRAPHICS = {"standard": [("LOGO", 2.0, 44.0), ("K{karat}", 14.0, 44.0)]}
+GRAPHICS_DIR = "graphics"
+GRAPHICS_REGISTRY = "printer_graphics.json"
+LABEL_GRAPHICS = {}
+# Printer memory the graphics are stored in (DPL module / ZPL device)
+GRAPHICS_DPL_MODULE = "D"
+GRAPHICS_ZPL_DEVICE = "R"
+
+# --memprofile fails a batch whose peak memory grows more than this many KB
+# per label (None = report only)
+MEMPROFILE_BUDGET_KB = 0.25
+# Labels printed before the baseline is taken (imports, first render),
+# and the fewest labels after it for the budget to be judged
+MEMPROFILE_WARMUP_LABELS = 1
+MEMPROFILE_MIN_LABELS = 20
+
+# Inventory export (CSV) and its lookup index - used to auto-fill
+# price, carat and karat from the item number
+INVENTORY_CSV = "inventory.csv"
+INVENTORY_INDEX = "inventory.idx"
+
+# =============================================================================
+# PRINT SERVICE SETTINGS
+# =============================================================================
+# Use "0.0.0.0" to accept jobs from other POS terminals on the network
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8631
+
+# Unix socket for print_daemon.py (None = default in the temp folder)
+DAEMON_SOCKET = None
+
+# Local port for the daemon's Prometheus /metrics (None = off). The print
+# service always serves /metrics on SERVICE_PORT.
+DAEMON_METRICS_PORT = None
+
 # =============================================================================
 # PRINT FORMAT SETTINGS
 # =============================================================================
@@ -0,0 +1,195 @@
+"""
+Print Daemon Client
+Forwards simple CLI print requests to a running print_daemon.py over its
+Unix domain socket, skipping the imports and config load of a full run.
+
+Kept to a handful of standard library imports on purpose - this runs on
+every CLI call before anything else is imported.
+"""
+
+import os
+import sys
+import time
+
+# The low-level socket module: `socket` itself pulls in enum and selectors,
+# which costs more than the whole round trip to the daemon
+import _socket
+
+try:
+    from config import DAEMON_SOCKET
+except ImportError:
+    DAEMON_SOCKET = None
+if not DAEMON_SOCKET:
+    DAEMON_SOCKET = os.path.join(os.environ.get("TMPDIR", "/tmp"), "jewelry_tag_printer.sock")
+try:
+    from config import USB_PRINTER_NAME
+except ImportError:
+    USB_PRINTER_NAME = "Datamax-O'Neil E-4205A Mark III"
+
+# Seconds to wait for a reply - longer than the daemon's WAIT_TIMEOUT (60 s),
+# so a slow print comes back as the job's state rather than a client timeout
+REPLY_TIMEOUT = 90.0
+
+# CLI options that can be forwarded, and the request field they fill
+VALUE_OPTIONS = {
+    "-n": "item_number", "--item-number": "item_number",
+    "-p": "price", "--price": "price",
+    "-c": "carat", "--carat": "carat",
+    "-k": "karat", "--karat": "karat",
+    "-l": "preset", "--label": "preset",
+    "--printer": "printer_name",
+    "--ip": "ip",
+}
+FLAG_OPTIONS = {"--network": "network", "--zpl": "zpl", "--epl": "epl"}
+KARAT_CHOICES = (10, 14, 18, 22, 24)
+
+
+class NoReply(Exception):
+    """The request was sent but no reply came back - it may still be acted on."""
+
+
+def daemon_available() -> bool:
+    return hasattr(_socket, "AF_UNIX") and os.path.exists(DAEMON_SOCKET)
+
+
+def _exchange(data: bytes, timeout: float, socket_path: str) -> "bytes | None":
+    """
+    Send one request line and read one reply line. None if no daemon could
+    be reached; NoReply once anything was sent, since the daemon may already
+    be printing it.
+    """
+    if not hasattr(_socket, "AF_UNIX"):
+        return None
+    sock = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+    try:
+        try:
+            sock.settimeout(0.5)
+            sock.connect(socket_path)
+        except OSError:
+            return None
+        try:
+            sock.settimeout(timeout)
+            sock.sendall(data)
+            reply = b""
+            while not reply.endswith(b"\n"):
+                chunk = sock.recv(65536)
+                if not chunk:
+                    raise NoReply("connection closed")
+                reply += chunk
+        except OSError as e:
+            raise NoReply(str(e) or type(e).__name__) from e
+    finally:
+        sock.close()
+    return reply
+
+
+def request(payload: dict, timeout: float = REPLY_TIMEOUT,
+            socket_path: str = DAEMON_SOCKET) -> "dict | None":
+    """Send one JSON request to the daemon; None if it isn't running."""
+    import json
+    try:
+        reply = _exchange(json.dumps(payload).encode('utf-8') + b"\n", timeout, socket_path)
+    except NoReply as e:
+        return {"error": f"no reply from print daemon ({e})"}
+    try:
+        return json.loads(reply) if reply else None
+    except ValueError:
+        return None
+
+
+def request_text(fields: dict, timeout: float = REPLY_TIMEOUT,
+                 socket_path: str = DAEMON_SOCKET) -> "list | None":
+    """
+    Fast path used by forward_cli: tab-separated request and reply lines,
+    so the client doesn't pay for importing json (and re). Raises NoReply
+    like _exchange.
+    """
+    parts = ["PRINT"]
+    for key, value in fields.items():
+        text = str(value)
+        if "\t" in text or "\n" in text or "\r" in text:
+            return None
+        parts.append(f"{key}={text}")
+    reply = _exchange(("\t".join(parts) + "\n").encode('utf-8'), timeout, socket_path)
+    return reply.decode('utf-8').rstrip("\n").split("\t") if reply else None
+
+
+def parse_forwardable(argv: list) -> "dict | None":
+    """
+    Parse argv if it is a plain single-tag print; None for anything else
+    (interactive, batch, test, dry run...), which then runs locally.
+    """
+    options = {}
+    args = list(argv)
+    while args:
+        arg = args.pop(0)
+        name, eq, value = arg.partition("=")
+        if name in VALUE_OPTIONS:
+            if not eq:
+                if not args:
+                    return None
+                value = args.pop(0)
+            options[VALUE_OPTIONS[name]] = value
+        elif arg in FLAG_OPTIONS:
+            options[FLAG_OPTIONS[arg]] = True
+        else:
+            return None
+    if not options.get("item_number"):
+        return None
+    try:
+        for field in ("price", "carat"):
+            if field in options:
+                options[field] = float(options[field])
+        if "karat" in options:
+            options["karat"] = int(options["karat"])
+            if options["karat"] not in KARAT_CHOICES:
+                return None
+    except ValueError:
+        return None
+    return options
+
+
+def forward_cli(argv: list) -> "int | None":
+    """
+    Try to print through the daemon. Returns an exit code, or None if the
+    request should run locally (no daemon, or not a plain print).
+    """
+    if not daemon_available():
+        return None
+    options = parse_forwardable(argv)
+    if options is None:
+        return None
+    if not options.get("network") and not options.get("printer_name"):
+        # Same default as the local path, not "any printer"
+        options["printer_name"] = USB_PRINTER_NAME
+    start = time.perf_counter()
+    try:
+        reply = request_text(options)
+    except NoReply as e:
+        # Printing locally now could print the tag twice
+        print(f"✗ No reply from print daemon ({e}) - the tag may still print; "
+              f"check --jobs before reprinting")
+        return 2
+    if not reply or reply[0] == "FALLBACK":
+        return None
+    elapsed = (time.perf_counter() - start) * 1000
+    status, detail = reply[0], reply[1:]
+    if status == "OK":
+        printer, job_id = detail
+        print(f"✓ {options['item_number']} sent to {printer} "
+              f"via print daemon (job {job_id}, {elapsed:.1f} ms)")
+        return 0
+    if status == "FAIL":
+        printer, errors = detail
+        print(f"✗ Print failed on {printer}: {errors}")
+        return 1
+    print(f"✗ {' '.join(detail) or 'print daemon error'}")
+    return 2
+
+
+if __name__ == "__main__":
+    code = forward_cli(sys.argv[1:])
+    if code is None:
+        print("✗ Print daemon not running or request not forwardable")
+        code = 2
+    sys.exit(code)
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+DPL Raster Preview
+Renders DPL label command bytes into a 1-bit dot image the size of the
+label preset (width_dots x height_dots), so previews show what the printer
+is actually sent rather than an approximation.
+
+    python dpl_raster.py -n MSD958009 -p 17600 -c 5.26 -k 14 [-l barbell]
+    python dpl_raster.py --pgm tag.pgm ...     # write an image instead
+
+Each record line is decoded by the DPL field layout (numbers are read
+the way the printer reads them: leading digits, so the old label
+software's font 9 records "1911001008001 20..." put the field at row 80,
+column 1):
+
+    a b c d eee ffff gggg data
+    | | | |  |    |    |
+    | | | |  |    |    column (x, dots)
+    | | | |  |    row (y, dots)
+    | | | |  font size (font 9, points) / bar height (barcodes, dots)
+    | | | height multiplier / narrow bar width
+    | | width multiplier / wide bar width
+    | font 0-9, barcode id (e/E = Code 128), X (graphics) or Y (stored image)
+    rotation 1-4 (0, 90, 180, 270 degrees)
+
+Graphics records draw a filled line lwwwwhhhh or an outlined box
+bwwwwhhhhttttssss (width, height, top/bottom and side thickness, dots).
+Image records are drawn from the local copy of the printer-resident
+graphic (printer_graphics.py), scaled by the multipliers.
+
+Resident fonts are drawn as fixed cells with a built-in 5x7 glyph set, so
+text extents are right even though letter shapes are simplified. Fields
+are rasterized one at a time and cached on their record line - changing
+one value re-renders only that field.
+"""
+
+import argparse
+import os
+import sys
+from functools import lru_cache
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from jewelry_tag_printer import render_command, LABEL_PRESETS, DEFAULT_PRESET, DPI
+from label_geometry import get_geometry
+from font_metrics import FONT_CELLS
+from printer_graphics import load_image, GRAPHICS_DIR
+
+
+# Label-format lines that aren't fields (ignored by the preview)
+FORMAT_COMMANDS = ("D", "H", "S", "P", "Q", "E", "L", "A", "M", "z", "Z", "U", "W", "G")
+
+# 5x7 glyphs, one string per row ("#" = dot); lowercase is drawn as uppercase
+GLYPHS = {
+    " ": ".....|.....|.....|.....|.....|.....|.....",
+    "0": ".###.|#...#|#..##|#.#.#|##..#|#...#|.###.",
+    "1": "..#..|.##..|..#..|..#..|..#..|..#..|.###.",
+    "2": ".###.|#...#|....#|...#.|..#..|.#...|#####",
+    "3": "####.|....#|....#|.###.|....#|....#|####.",
+    "4": "...#.|..##.|.#.#.|#..#.|#####|...#.|...#.",
+    "5": "#####|#....|####.|....#|....#|#...#|.###.",
+    "6": "..##.|.#...|#....|####.|#...#|#...#|.###.",
+    "7": "#####|....#|...#.|..#..|.#...|.#...|.#...",
+    "8": ".###.|#...#|#...#|.###.|#...#|#...#|.###.",
+    "9": ".###.|#...#|#...#|.####|....#|...#.|.##..",
+    "A": ".###.|#...#|#...#|#####|#...#|#...#|#...#",
+    "B": "####.|#...#|#...#|####.|#...#|#...#|####.",
+    "C": ".###.|#...#|#....|#....|#....|#...#|.###.",
+    "D": "###..|#..#.|#...#|#...#|#...#|#..#.|###..",
+    "E": "#####|#....|#....|####.|#....|#....|#####",
+    "F": "#####|#....|#....|####.|#....|#....|#....",
+    "G": ".###.|#...#|#....|#.###|#...#|#...#|.####",
+    "H": "#...#|#...#|#...#|#####|#...#|#...#|#...#",
+    "I": ".###.|..#..|..#..|..#..|..#..|..#..|.###.",
+    "J": "..###|...#.|...#.|...#.|...#.|#..#.|.##..",
+    "K": "#...#|#..#.|#.#..|##...|#.#..|#..#.|#...#",
+    "L": "#....|#....|#....|#....|#....|#....|#####",
+    "M": "#...#|##.##|#.#.#|#.#.#|#...#|#...#|#...#",
+    "N": "#...#|#...#|##..#|#.#.#|#..##|#...#|#...#",
+    "O": ".###.|#...#|#...#|#...#|#...#|#...#|.###.",
+    "P": "####.|#...#|#...#|####.|#....|#....|#....",
+    "Q": ".###.|#...#|#...#|#...#|#.#.#|#..#.|.##.#",
+    "R": "####.|#...#|#...#|####.|#.#..|#..#.|#...#",
+    "S": ".####|#....|#....|.###.|....#|....#|####.",
+    "T": "#####|..#..|..#..|..#..|..#..|..#..|..#..",
+    "U": "#...#|#...#|#...#|#...#|#...#|#...#|.###.",
+    "V": "#...#|#...#|#...#|#...#|#...#|.#.#.|..#..",
+    "W": "#...#|#...#|#...#|#.#.#|#.#.#|#.#.#|.#.#.",
+    "X": "#...#|#...#|.#.#.|..#..|.#.#.|#...#|#...#",
+    "Y": "#...#|#...#|.#.#.|..#..|..#..|..#..|..#..",
+    "Z": "#####|....#|...#.|..#..|.#...|#....|#####",
+    "=": ".....|.....|#####|.....|#####|.....|.....",
+    ".": ".....|.....|.....|.....|.....|.##..|.##..",
+    ",": ".....|.....|.....|.....|.##..|..#..|.#...",
+    "-": ".....|.....|.....|#####|.....|.....|.....",
+    "+": ".....|..#..|..#..|#####|..#..|..#..|.....",
+    "$": "..#..|.####|#.#..|.###.|..#.#|####.|..#..",
+    "#": ".#.#.|.#.#.|#####|.#.#.|#####|.#.#.|.#.#.",
+    "/": ".....|....#|...#.|..#..|.#...|#....|.....",
+    ":": ".....|.##..|.##..|.....|.##..|.##..|.....",
+    "'": ".##..|..#..|.#...|.....|.....|.....|.....",
+    '"': ".#.#.|.#.#.|.#.#.|.....|.....|.....|.....",
+    "(": "...#.|..#..|.#...|.#...|.#...|..#..|...#.",
+    ")": ".#...|..#..|...#.|...#.|...#.|..#..|.#...",
+    "%": "##...|##..#|...#.|..#..|.#...|#..##|...##",
+    "&": ".##..|#..#.|#.#..|.#...|#.#.#|#..#.|.##.#",
+    "*": ".....|..#..|#.#.#|.###.|#.#.#|..#..|.....",
+    "?": ".###.|#...#|....#|...#.|..#..|.....|..#..",
+    "!": "..#..|..#..|..#..|..#..|..#..|.....|..#..",
+    "_": ".....|.....|.....|.....|.....|.....|#####",
+    "@": ".###.|#...#|....#|.##.#|#.#.#|#.#.#|.###.",
+}
+_UNKNOWN_GLYPH = "#####|#...#|#...#|#...#|#...#|#...#|#####"
+
+# Code 128 bar/space widths for values 0-106 (106 = stop)
+CODE128_PATTERNS = (
+    "212222 222122 222221 121223 121322 131222 122213 122312 132212 221213 "
+    "221312 231212 112232 122132 122231 113222 123122 123221 223211 221132 "
+    "221231 213212 223112 312131 311222 321122 321221 312212 322112 322211 "
+    "212123 212321 232121 111323 131123 131321 112313 132113 132311 211313 "
+    "231113 231311 112133 112331 132131 113123 113321 133121 313121 211331 "
+    "231131 213113 213311 213131 311123 311321 331121 312113 312311 332111 "
+    "314111 221411 431111 111224 111422 121124 121421 141122 141221 112214 "
+    "112412 122114 122411 142112 142211 241211 221114 413111 241112 134111 "
+    "111242 121142 121241 114212 124112 124211 411212 421112 421211 212141 "
+    "214121 412121 111143 111341 131141 114113 114311 411113 411311 113141 "
+    "114131 311141 411131 211412 211214 211232 2331112"
+).split()
+CODE128_START_B = 104
+CODE128_STOP = 106
+
+
+class Bitmap:
+    """A 1-bit image: one int per row, bit x set = black dot at column x."""
+
+    __slots__ = ("width", "height", "rows")
+
+    def __init__(self, width: int, height: int, rows: Optional[list] = None):
+        self.width = width
+        self.height = height
+        self.rows = rows if rows is not None else [0] * height
+
+    def rotated(self, quarter_turns: int) -> "Bitmap":
+        """Rotate clockwise by 90 degrees per quarter turn."""
+        bitmap = self
+        for _ in range(quarter_turns % 4):
+            w, h, rows = bitmap.width, bitmap.height, bitmap.rows
+            turned = [0] * w
+            for y, row in enumerate(rows):
+                bit = 1 << (h - 1 - y)
+                x = 0
+                while row:
+                    if row & 1:
+                        turned[x] |= bit
+                    row >>= 1
+                    x += 1
+            bitmap = Bitmap(h, w, turned)
+        return bitmap
+
+
+def _glyph_rows(char: str) -> list:
+    pattern = GLYPHS.get(char.upper(), _UNKNOWN_GLYPH)
+    return [sum(1 << x for x, dot in enumerate(line) if dot == "#")
+            for line in pattern.split("|")]
+
+
+def _field_number(text: str, default: int = 0) -> int:
+    """A numeric field's leading digits ("01 2" -> 1); default if there are none."""
+    digits = len(text) - len(text.lstrip("0123456789"))
+    return int(text[:digits]) if digits else default
+
+
+def _multiplier(char: str) -> int:
+    """DPL multipliers are base 36 (1-9, then A-Z for 10-35)."""
+    try:
+        return max(1, int(char, 36))
+    except ValueError:
+        return 1
+
+
+def _text_bitmap(text: str, cell_w: int, cell_h: int) -> Bitmap:
+    """Lay out text in fixed cells, each 5x7 glyph scaled to the cell."""
+    glyph_w = max(1, cell_w - max(1, cell_w // 6))
+    xs = [x * 5 // glyph_w for x in range(glyph_w)]
+    ys = [y * 7 // cell_h for y in range(cell_h)]
+    rows = [0] * cell_h
+    for index, char in enumerate(text):
+        glyph = _glyph_rows(char)
+        offset = index * cell_w
+        for y, src_y in enumerate(ys):
+            src = glyph[src_y]
+            if src:
+                rows[y] |= sum(1 << (offset + x) for x, src_x in enumerate(xs)
+                               if src >> src_x & 1)
+    return Bitmap(cell_w * len(text), cell_h, rows)
+
+
+def _graphic_bitmap(data: str) -> Bitmap:
+    """A filled line (lwwwwhhhh) or outlined box (bwwwwhhhhttttssss)."""
+    kind, width, height = data[0], int(data[1:5]), int(data[5:9])
+    if width < 1 or height < 1 or kind not in "lb":
+        raise ValueError(data)
+    full = (1 << width) - 1
+    if kind == "l":
+        return Bitmap(width, height, [full] * height)
+    top, side = int(data[9:13]), int(data[13:17])
+    sides = full & ~(((1 << max(0, width - 2 * side)) - 1) << side)
+    return Bitmap(width, height, [full if y < top or y >= height - top else sides
+                                  for y in range(height)])
+
+
+def _scaled(bitmap: Bitmap, wide: int, high: int) -> Bitmap:
+    """Repeat each dot wide times across and each row high times down."""
+    if wide == high == 1:
+        return bitmap
+    block = (1 << wide) - 1
+    rows = []
+    for row in bitmap.rows:
+        scaled = 0
+        for x in range(bitmap.width):
+            if row >> x & 1:
+                scaled |= block << (x * wide)
+        rows.extend([scaled] * high)
+    return Bitmap(bitmap.width * wide, bitmap.height * high, rows)
+
+
+def code128_modules(data: str) -> list:
+    """Bar/space widths (in modules) for data encoded as Code 128 set B."""
+    values = [CODE128_START_B]
+    for char in data:
+        code = ord(char) - 32
+        if not 0 <= code <= 95:
+            raise ValueError(f"'{char}' can't be encoded in Code 128 set B")
+        values.append(code)
+    checksum = (values[0] + sum(i * v for i, v in enumerate(values[1:], 1))) % 103
+    values += [checksum, CODE128_STOP]
+    return [int(width) for value in values for width in CODE128_PATTERNS[value]]
+
+
+def _barcode_bitmap(data: str, module: int, height: int) -> Bitmap:
+    row = 0
+    x = 0
+    for index, width in enumerate(code128_modules(data)):
+        if index % 2 == 0:       # bars on even elements, spaces on odd
+            row |= ((1 << (width * module)) - 1) << x
+        x += width * module
+    return Bitmap(x, height, [row] * height)
+
+
+@lru_cache(maxsize=2048)
+def rasterize_record(record: str, dpi: int = DPI):
+    """
+    Decode one DPL field record into (column, row, Bitmap, warning).
+    Bitmap is None (with a warning) for records we can't draw.
+    """
+    if len(record) < 15 or record[0] not in "1234":
+        return 0, 0, None, f"not a field record: {record!r}"
+    rotation, font, wide, high = record[0], record[1], record[2], record[3]
+    size = record[4:7]
+    if not record[7].isdigit() or not record[11].isdigit():
+        return 0, 0, None, f"bad row/column in {record!r}"
+    row = _field_number(record[7:11])
+    column = _field_number(record[11:15])
+    data = record[15:]
+    warning = None
+
+    if font in FONT_CELLS or font == "9":
+        if font == "9":
+            points = _field_number(size, 10)
+            cell_h = max(3, round(points * dpi / 72))
+            cell_w = max(2, cell_h * 6 // 7)
+        else:
+            cell_w, cell_h = (round(v * dpi / 203) for v in FONT_CELLS[font])
+        bitmap = _text_bitmap(data, cell_w * _multiplier(wide), cell_h * _multiplier(high))
+    elif font in "eE":
+        module = _multiplier(high) if high != "0" else _multiplier(wide)
+        height = _field_number(size, 50)
+        try:
+            bitmap = _barcode_bitmap(data, module, max(1, height))
+        except ValueError as e:
+            return column, row, None, str(e)
+        if font == "E":
+            # Human-readable text under the bars
+            text = _text_bitmap(data, *FONT_CELLS["1"])
+            rows = bitmap.rows + [0] * 2 + [r << max(0, (bitmap.width - text.width) // 2)
+                                             for r in text.rows]
+            bitmap = Bitmap(max(bitmap.width, text.width), len(rows), rows)
+    elif font == "X":
+        try:
+            bitmap = _graphic_bitmap(data)
+        except ValueError:
+            return column, row, None, f"bad graphic in {record!r}"
+    elif font == "Y":
+        try:
+            image = load_image(data)
+        except (OSError, ValueError) as e:
+            return column, row, None, f"image '{data}': {e}"
+        if image is None:
+            return column, row, None, f"image '{data}' not found in {GRAPHICS_DIR}"
+        bitmap = _scaled(Bitmap(image.width, image.height, image.rows),
+                         _multiplier(wide), _multiplier(high))
+    else:
+        return column, row, None, f"barcode/font '{font}' not emulated: {record!r}"
+
+    if rotation != "1":
+        bitmap = bitmap.rotated({"2": 3, "3": 2, "4": 1}[rotation])
+    return column, row, bitmap, warning
+
+
+class Raster:
+    """Rendered label: a width x height dot image plus what didn't fit."""
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.rows = [0] * height
+        self.warnings = []
+        self.fields = 0
+        self.column_offset = 0
+        self.row_offset = 0
+
+    def draw(self, column: int, row: int, bitmap: Bitmap):
+        x = column + self.column_offset
+        y = row + self.row_offset
+        mask = (1 << self.width) - 1
+        clipped = (x < 0 or y < 0 or x + bitmap.width > self.width
+                   or y + bitmap.height > self.height)
+        for index, bits in enumerate(bitmap.rows):
+            target = y + index
+            if 0 <= target < self.height:
+                shifted = bits << x if x >= 0 else bits >> -x
+                self.rows[target] |= shifted & mask
+        return clipped
+
+    def black_dots(self) -> int:
+        return sum(bin(row).count("1") for row in self.rows)
+
+    def pixel(self, x: int, y: int) -> bool:
+        return bool(self.rows[y] >> x & 1)
+
+    def to_pgm(self, zoom: int = 1, shrink: int = 1) -> bytes:
+        """
+        Binary PGM (for tk.PhotoImage(data=...) or saving). zoom repeats
+        each dot; shrink merges blocks of dots, keeping a block black if
+        any dot in it is, so hairlines survive.
+        """
+        width, rows = self.width, self.rows
+        if shrink > 1:
+            width = (self.width + shrink - 1) // shrink
+            merged = []
+            for start in range(0, self.height, shrink):
+                combined = 0
+                for row in rows[start:start + shrink]:
+                    combined |= row
+                shrunk = 0
+                for x in range(width):
+                    if combined >> (x * shrink) & ((1 << shrink) - 1):
+                        shrunk |= 1 << x
+                merged.append(shrunk)
+            rows = merged
+        table = bytes.maketrans(b"01", b"\xff\x00")
+        lines = []
+        for row in rows:
+            bits = format(row, f"0{width}b")[::-1]
+            if zoom > 1:
+                bits = bits.replace("1", "x" * zoom).replace("0", "0" * zoom).replace("x", "1")
+            line = bits.encode("ascii").translate(table)
+            lines.extend([line] * zoom)
+        header = f"P5 {width * zoom} {len(rows) * zoom} 255\n".encode("ascii")
+        return header + b"".join(lines)
+
+    def to_text(self, shrink: int = 1) -> str:
+        """ASCII-art rendering for terminals ('#' = dot)."""
+        lines = []
+        for start in range(0, self.height, shrink):
+            combined = 0
+            for row in self.rows[start:start + shrink]:
+                combined |= row
+            lines.append("".join(
+                "#" if combined >> x & ((1 << shrink) - 1) else "."
+                for x in range(0, self.width, shrink)).rstrip("."))
+        return "\n".join(lines)
+
+
+def render_label(command: bytes, width: int, height: int, dpi: int = DPI) -> Raster:
+    """Rasterize DPL command bytes onto a width x height dot label."""
+    raster = Raster(width, height)
+    text = command.decode("ascii", errors="replace")
+    for line in text.replace("\r", "\n").split("\n"):
+        line = line.lstrip("\x01\x02\x18")
+        if not line:
+            continue
+        if line[0] in "1234" and len(line) >= 15:
+            column, row, bitmap, warning = rasterize_record(line, dpi)
+            if warning:
+                raster.warnings.append(warning)
+            if bitmap is None:
+                continue
+            raster.fields += 1
+            if raster.draw(column, row, bitmap):
+                raster.warnings.append(f"field runs off the label: {line!r}")
+        elif line[0] == "C" and line[1:].isdigit():
+            raster.column_offset = int(line[1:])
+        elif line[0] == "R" and line[1:].isdigit():
+            raster.row_offset = int(line[1:])
+        elif not line.startswith(FORMAT_COMMANDS) and line not in ("n", "m", "L"):
+            raster.warnings.append(f"ignored: {line!r}")
+    return raster
+
+
+def render_preset(command: bytes, preset: str = DEFAULT_PRESET, dpi: int = DPI) -> Raster:
+    """Rasterize command bytes at the preset's size in dots at that resolution."""
+    geometry = get_geometry(preset, dpi)
+    return render_label(command, geometry.width_dots, geometry.height_dots, dpi)
+
+
+def fit_scale(raster: Raster, max_width: int, max_height: int) -> tuple:
+    """(zoom, shrink) that best fits the raster into a max_width x max_height box."""
+    zoom = min(max_width // raster.width, max_height // raster.height)
+    if zoom >= 1:
+        return zoom, 1
+    shrink = max(-(-raster.width // max_width), -(-raster.height // max_height))
+    return 1, shrink
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render a tag the way the printer will see it')
+    parser.add_argument('-n', '--item-number', default='MSD958009')
+    parser.add_argument('-p', '--price', type=float, default=17600)
+    parser.add_argument('-c', '--carat', type=float, default=5.26)
+    parser.add_argument('-k', '--karat', type=int, default=14)
+    parser.add_argument('-l', '--label', default=DEFAULT_PRESET, choices=list(LABEL_PRESETS))
+    parser.add_argument('--dpi', type=int, default=DPI,
+                        help=f'Printer resolution (default: {DPI})')
+    parser.add_argument('--shrink', type=int, default=2,
+                        help='Merge NxN dots per character in the text view (default: 2)')
+    parser.add_argument('--pgm', metavar='FILE', help='Write a PGM image instead')
+    args = parser.parse_args()
+
+    command = render_command(args.item_number, args.price, args.carat, args.karat, args.label,
+                             dpi=args.dpi)
+    raster = render_preset(command, args.label, args.dpi)
+    if args.pgm:
+        with open(args.pgm, 'wb') as f:
+            f.write(raster.to_pgm())
+        print(f"✓ Wrote {args.pgm} ({raster.width}x{raster.height} dots)")
+    else:
+        print(raster.to_text(args.shrink))
+    print(f"ℹ {raster.fields} fields, {raster.black_dots()} dots")
+    for warning in raster.warnings:
+        print(f"⚠ {warning}")
+
+
+if __name__ == "__main__":
+    main()
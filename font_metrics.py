@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Font Metrics
+Text sizes for the printer's resident fonts, and fitting a field's text
+into its box on the tag - instead of finding positions by trial prints.
+
+    python font_metrics.py "MSD958009-LONG-SKU" --box 168
+
+Fonts 0-8 are fixed-pitch bitmap fonts (every glyph is one cell wide).
+Font 9 is the scalable CG Triumvirate, measured with Helvetica advance
+widths (it is metric-compatible). Bitmap widths are one multiplication;
+font 9 widths are cached per (text, points, dpi), so batches that repeat
+values cost a dict lookup.
+"""
+
+import argparse
+from functools import lru_cache
+
+# Resident font cells (width incl. spacing, height) in dots at 203 dpi
+FONT_CELLS = {
+    "0": (6, 7), "1": (8, 13), "2": (11, 18), "3": (15, 27), "4": (19, 36),
+    "5": (31, 52), "6": (33, 64), "7": (16, 27), "8": (16, 27),
+}
+
+# Fonts tried when fitting (7 and 8 are OCR-A/B - not for tag text)
+FIT_FONTS = ("0", "1", "2", "3", "4", "5", "6")
+
+# Largest multiplier tried when fitting
+MAX_MULTIPLIER = 4
+
+# CG Triumvirate / Helvetica advance widths, 1/1000 em
+SCALABLE_WIDTHS = {
+    " ": 278, "!": 278, '"': 355, "#": 556, "$": 556, "%": 889, "&": 667, "'": 191,
+    "(": 333, ")": 333, "*": 389, "+": 584, ",": 278, "-": 333, ".": 278, "/": 278,
+    "0": 556, "1": 556, "2": 556, "3": 556, "4": 556, "5": 556, "6": 556, "7": 556,
+    "8": 556, "9": 556, ":": 278, ";": 278, "<": 584, "=": 584, ">": 584, "?": 556,
+    "@": 1015, "A": 667, "B": 667, "C": 722, "D": 722, "E": 667, "F": 611, "G": 778,
+    "H": 722, "I": 278, "J": 500, "K": 667, "L": 556, "M": 833, "N": 722, "O": 778,
+    "P": 667, "Q": 778, "R": 722, "S": 667, "T": 611, "U": 722, "V": 667, "W": 944,
+    "X": 667, "Y": 667, "Z": 611, "[": 278, "\\": 278, "]": 278, "^": 469, "_": 556,
+    "`": 333, "a": 556, "b": 556, "c": 500, "d": 556, "e": 556, "f": 278, "g": 556,
+    "h": 556, "i": 222, "j": 222, "k": 500, "l": 222, "m": 833, "n": 556, "o": 556,
+    "p": 556, "q": 556, "r": 333, "s": 500, "t": 278, "u": 556, "v": 500, "w": 722,
+    "x": 500, "y": 500, "z": 500, "{": 334, "|": 260, "}": 334, "~": 584,
+}
+SCALABLE_CAP_HEIGHT = 718
+
+
+def cell_size(font: str, dpi: int = 203) -> tuple:
+    """(width, height) of one bitmap-font cell in dots at multiplier 1."""
+    width, height = FONT_CELLS[font]
+    return round(width * dpi / 203), round(height * dpi / 203)
+
+
+def text_width(font: str, text: str, points: int = 10, dpi: int = 203) -> int:
+    """Width of text in dots at multiplier 1 (points only matter for font 9)."""
+    if font == "9":
+        return _scalable_width(text, points, dpi)
+    # Bitmap fonts are fixed-pitch; not cached, so labels don't fill a cache
+    return cell_size(font, dpi)[0] * len(text)
+
+
+@lru_cache(maxsize=8192)
+def _scalable_width(text: str, points: int, dpi: int) -> int:
+    em = points * dpi / 72
+    return round(sum(SCALABLE_WIDTHS.get(c, 556) for c in text) * em / 1000)
+
+
+def text_height(font: str, points: int = 10, dpi: int = 203) -> int:
+    """Height of a line in dots at multiplier 1."""
+    if font == "9":
+        return round(points * dpi / 72 * SCALABLE_CAP_HEIGHT / 1000)
+    return cell_size(font, dpi)[1]
+
+
+def fit_candidates(font: str, multiplier: int, dpi: int = 203) -> list:
+    """
+    (font, multiplier) choices no taller or wider than the designed one,
+    largest first. Fitting only ever shrinks a field, so text that fits as
+    designed prints exactly as before.
+    """
+    designed_w, designed_h = (v * multiplier for v in cell_size(font, dpi))
+    sizes = {(f, m) for f in FIT_FONTS for m in range(1, MAX_MULTIPLIER + 1)
+             if cell_size(f, dpi)[0] * m <= designed_w and cell_size(f, dpi)[1] * m <= designed_h}
+    sizes.add((font, multiplier))
+    return sorted(sizes, key=lambda s: (cell_size(s[0], dpi)[1] * s[1],
+                                        cell_size(s[0], dpi)[0] * s[1],
+                                        s == (font, multiplier)), reverse=True)
+
+
+def fit_text(text: str, box_width: int, candidates: list, dpi: int = 203) -> tuple:
+    """The first (largest) candidate whose width fits the box; else the smallest."""
+    for font, multiplier in candidates:
+        if text_width(font, text, dpi=dpi) * multiplier <= box_width:
+            return font, multiplier
+    return candidates[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure text in the printer fonts')
+    parser.add_argument('text')
+    parser.add_argument('--box', type=int, default=168,
+                        help='Box width in dots to fit (default: 168, the front panel)')
+    parser.add_argument('--font', default="1", choices=sorted(FONT_CELLS) + ["9"])
+    parser.add_argument('--multiplier', type=int, default=1)
+    parser.add_argument('--dpi', type=int, default=203)
+    args = parser.parse_args()
+
+    width = text_width(args.font, args.text, dpi=args.dpi) * args.multiplier
+    print(f"Font {args.font} x{args.multiplier}: {width} dots wide "
+          f"({'fits' if width <= args.box else 'too wide for'} {args.box})")
+    if args.font != "9":
+        font, multiplier = fit_text(args.text, args.box,
+                                    fit_candidates(args.font, args.multiplier, args.dpi),
+                                    args.dpi)
+        print(f"✓ Fitted: font {font} x{multiplier} "
+              f"({text_width(font, args.text, dpi=args.dpi) * multiplier} dots)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+DPL Format Harness
+Tries many DPL record variants at once instead of one test tag per variant.
+
+    python format_harness.py --emulate                  # score offline, no printer
+    python format_harness.py --strip variants.json      # print a calibration strip
+    python format_harness.py --strip --dry-run          # show the strip command
+
+Variants are declared in a JSON list (the built-in set is the old
+format_finder.py list). Each entry is either a literal record or a template
+expanded over every combination of its "vary" values:
+
+    [
+      {"id": "A", "description": "Original", "record": "121100010010001001TEST",
+       "expect": "TEST"},
+      {"description": "Fonts", "template": "1{font}1100000100010TEST",
+       "vary": {"font": ["0", "1", "2"]}, "expect": "TEST"}
+    ]
+
+--emulate renders each variant with dpl_raster and scores it: 0 if the
+record can't be decoded, lower if it runs off the label or the printed
+text isn't "expect". --strip tiles the variants onto as few tags as
+possible, each under its printed ID, then asks once which IDs came out
+right. Both modes write a JSON report.
+
+A strip cell is small, so each variant is printed at row/column 0000 of
+its cell. Variants that still don't fit (or that dpl_raster can't decode,
+so their size is unknown) are left off the strip and marked "skipped" -
+print those one at a time with format_finder.py.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from jewelry_tag_printer import send_command, DEFAULT_PRESET, USB_PRINTER_NAME, PRINTER_IP, DPI
+from dpl_raster import render_label
+from label_geometry import get_geometry
+
+REPORT_FILE = "format_report.json"
+
+# Calibration strip cell (dots): the ID on top, the variant below it
+CELL_WIDTH = 136
+CELL_HEIGHT = 52
+ID_HEIGHT = 16
+
+# format_finder.py's variants: X=10, Y=10, text "TEST"
+DEFAULT_VARIANTS = [
+    {"description": "Original that showed 00", "record": "121100010010001001TEST"},
+    {"description": "With 100 only", "record": "12110001001001001TEST"},
+    {"description": "With just font", "record": "121100010010100TEST"},
+    {"description": "Shorter params", "record": "1211000100101TEST"},
+    {"description": "Even shorter", "record": "12110001001TEST"},
+    {"description": "Minimal", "record": "121100010010TEST"},
+    {"description": "With spaces", "record": "12110 0010 010 1 TEST"},
+    {"description": "Quoted text", "record": '121100010010100"TEST"'},
+    {"description": "Different rotation", "record": "111100010010100TEST"},
+    {"description": "Rotation 0", "record": "101100010010100TEST"},
+    {"description": "No rotation prefix", "record": "11100010010100TEST"},
+    {"description": "Font sizes", "template": "1{font}1100000100010TEST",
+     "vary": {"font": ["0", "1", "2", "3"]}},
+]
+
+
+def expand_variants(specs: list) -> list:
+    """Flatten literal and templated entries into records with unique IDs."""
+    variants = []
+    for spec in specs:
+        if "template" in spec:
+            names = list(spec.get("vary", {}))
+            combos = itertools.product(*(spec["vary"][n] for n in names)) if names else [()]
+            for combo in combos:
+                values = dict(spec.get("values", {}), **dict(zip(names, combo)))
+                label = ", ".join(f"{n}={v}" for n, v in zip(names, combo))
+                variants.append({"id": spec.get("id"), "description":
+                                 f"{spec.get('description', '')} ({label})".strip(),
+                                 "record": spec["template"].format(**values),
+                                 "expect": spec.get("expect", "TEST")})
+        else:
+            variants.append({"id": spec.get("id"), "description": spec.get("description", ""),
+                             "record": spec["record"], "expect": spec.get("expect", "TEST")})
+    # Number anything without an ID; templated groups share a prefix
+    seen = set()
+    for number, variant in enumerate(variants, 1):
+        base = variant["id"] or f"V{number:02d}"
+        variant_id, suffix = base, 1
+        while variant_id in seen:
+            suffix += 1
+            variant_id = f"{base}.{suffix}"
+        variant["id"] = variant_id
+        seen.add(variant_id)
+    return variants
+
+
+def load_variants(path: str = None) -> list:
+    if not path:
+        return expand_variants(DEFAULT_VARIANTS)
+    with open(path, encoding='utf-8') as f:
+        return expand_variants(json.load(f))
+
+
+def score_variant(variant: dict, width: int, height: int, dpi: int = DPI) -> dict:
+    """Render one variant alone and rate it 0-1 with the reasons."""
+    record = variant["record"]
+    command = f"\x02L\r\nD11\r\n{record}\r\nE".encode('ascii', errors='replace')
+    raster = render_label(command, width, height, dpi)
+    notes = list(raster.warnings)
+    if not raster.fields:
+        return {"score": 0.0, "dots": 0, "notes": notes or ["nothing drawn"]}
+    score = 1.0
+    if any("runs off" in n for n in notes):
+        score -= 0.5
+    printed = record[15:]
+    expect = variant.get("expect")
+    if expect and printed != expect:
+        score -= 0.25
+        notes.append(f"prints {printed!r}, expected {expect!r}")
+    return {"score": round(max(score, 0.0), 2), "dots": raster.black_dots(), "notes": notes}
+
+
+def cell_record(variant: dict, dpi: int = DPI) -> tuple:
+    """
+    The variant's record moved to row/column 0000, and None - or None and
+    the reason it can't share a strip.
+    """
+    record = variant["record"]
+    if len(record) > 15 and record[7:15].isdigit():
+        record = record[:7] + "0" * 8 + record[15:]
+    command = f"\x02L\r\nD11\r\n{record}\r\nE".encode('ascii', errors='replace')
+    raster = render_label(command, CELL_WIDTH, CELL_HEIGHT - ID_HEIGHT, dpi)
+    if not raster.fields:
+        return None, "can't be decoded, so its size is unknown"
+    if any("runs off" in n for n in raster.warnings):
+        return None, f"larger than a {CELL_WIDTH}x{CELL_HEIGHT - ID_HEIGHT} dot cell"
+    return record, None
+
+
+def build_strips(variants: list, width: int, height: int, dpi: int = DPI) -> list:
+    """
+    DPL commands tiling the variants into cells, each under its ID.
+    Variants that can't be placed in a cell get a "skipped" reason instead.
+    """
+    placed = []
+    for variant in variants:
+        record, reason = cell_record(variant, dpi)
+        if record is None:
+            variant["skipped"] = reason
+        else:
+            placed.append((variant, record))
+    columns = max(1, width // CELL_WIDTH)
+    per_tag = columns * max(1, height // CELL_HEIGHT)
+    commands = []
+    for start in range(0, len(placed), per_tag):
+        dpl = ["\x02n", "\x02L", "D11", f"PW{height}"]
+        for index, (variant, record) in enumerate(placed[start:start + per_tag]):
+            x = index % columns * CELL_WIDTH
+            y = index // columns * CELL_HEIGHT
+            dpl += [f"C{x:04d}", f"R{y:04d}", f"111100000000000{variant['id']}",
+                    f"R{y + ID_HEIGHT:04d}", record]
+        dpl += ["C0000", "R0000", "Q0001", "E"]
+        commands.append("\r\n".join(dpl).encode('ascii', errors='replace'))
+    return commands
+
+
+def write_report(path: str, mode: str, preset: str, dpi: int, variants: list):
+    report = {
+        "created": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "mode": mode,
+        "preset": preset,
+        "dpi": dpi,
+        "variants": variants,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"✓ Report saved to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Try many DPL format variants at once')
+    parser.add_argument('variants', nargs='?', help='Variants JSON (default: built-in set)')
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--emulate', action='store_true', help='Score variants offline')
+    mode.add_argument('--strip', action='store_true', help='Print a calibration strip')
+    parser.add_argument('-l', '--label', default=DEFAULT_PRESET, help='Label preset')
+    parser.add_argument('--dpi', type=int, default=DPI)
+    parser.add_argument('--printer', default=USB_PRINTER_NAME)
+    parser.add_argument('--network', action='store_true')
+    parser.add_argument('--ip', default=PRINTER_IP)
+    parser.add_argument('--dry-run', action='store_true', help='Show the strip, don\'t print')
+    parser.add_argument('--report', default=REPORT_FILE,
+                        help=f'Report file (default: {REPORT_FILE})')
+    args = parser.parse_args()
+
+    variants = load_variants(args.variants)
+    geometry = get_geometry(args.label, args.dpi)
+    width, height = geometry.width_dots, geometry.height_dots
+
+    print("="*50)
+    print(f"FORMAT HARNESS - {len(variants)} variants, {args.label} @ {args.dpi} dpi")
+    print("="*50)
+
+    if args.emulate:
+        for variant in variants:
+            variant.update(score_variant(variant, width, height, args.dpi))
+        for variant in sorted(variants, key=lambda v: -v["score"]):
+            mark = "✓" if variant["score"] == 1 else "⚠" if variant["score"] > 0 else "✗"
+            print(f"{mark} {variant['id']:6} {variant['score']:.2f}  {variant['description']}")
+            for note in variant["notes"][:2]:
+                print(f"         {note}")
+        write_report(args.report, "emulate", args.label, args.dpi, variants)
+        return
+
+    strips = build_strips(variants, width, height, args.dpi)
+    print(f"{len(strips)} tag(s), {CELL_WIDTH}x{CELL_HEIGHT} dot cells")
+    for variant in variants:
+        if "skipped" in variant:
+            print(f"⚠ {variant['id']:6} left off the strip: {variant['skipped']}")
+    for index, command in enumerate(strips, 1):
+        if args.dry_run:
+            print(f"\n[DRY RUN] Tag {index}:")
+            print(command.decode('ascii', errors='replace'))
+        elif not send_command(command, use_usb=not args.network,
+                              printer_name=args.printer, printer_ip=args.ip):
+            print("✗ Could not send the strip")
+            return
+
+    if not args.dry_run:
+        answer = input("\nIDs that printed correctly (space separated, Enter for none): ")
+        good = {token.strip().upper() for token in answer.split()}
+        printed = [v for v in variants if "skipped" not in v]
+        for variant in printed:
+            variant["printed_ok"] = variant["id"].upper() in good
+        print(f"✓ {sum(v['printed_ok'] for v in printed)} of {len(printed)} marked good")
+    write_report(args.report, "strip", args.label, args.dpi, variants)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Golden Command Check
+Pins the exact bytes of every command generator, so render-path changes
+can't move a field or drop a byte without anyone noticing.
+
+    python golden_check.py              # compare against goldens/commands.json
+    python golden_check.py --update     # accept the current output
+    python golden_check.py --fuzz 5000  # random tags against invariants
+    python golden_check.py --bench      # render throughput vs goldens/bench.json
+
+Cases cover both presets, DPL/ZPL/EPL, the 300/600 dpi tables and edge
+data (long SKUs, decimal prices, spaces, lowercase). Goldens are
+stored as JSON strings holding the bytes one-to-one (latin-1), so a
+mismatch shows as a readable diff. Exits 1 on any failure.
+"""
+
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from jewelry_tag_printer import (
+    create_dpl_command, create_test_label, create_zpl_command, create_zpl_test_label,
+    create_epl_command, create_calibrate_command, create_cancel_command,
+    create_setup_command, generate_item_barcode
+)
+from font_metrics import FONT_CELLS
+import label_geometry
+from label_geometry import PRESET_LAYOUTS, RECORD_HEADER, get_geometry
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "goldens")
+GOLDEN_FILE = os.path.join(GOLDEN_DIR, "commands.json")
+BENCH_FILE = os.path.join(GOLDEN_DIR, "bench.json")
+
+# A benchmark this much slower than the baseline fails
+BENCH_TOLERANCE = 0.30
+
+GENERATORS = {
+    "dpl": create_dpl_command,
+    "test_label": create_test_label,
+    "zpl": create_zpl_command,
+    "zpl_test_label": create_zpl_test_label,
+    "epl": create_epl_command,
+    "calibrate": create_calibrate_command,
+    "cancel": create_cancel_command,
+    "setup": create_setup_command,
+}
+
+# Tag data: (item number, price, carat, karat)
+TAGS = {
+    "typical": ("MSD958009", 17600, 5.26, 14),
+    "decimal_price": ("R1002", 1249.5, 0.75, 18),
+    "zero_carat": ("BAND-22", 350, 0, 10),
+    "long_sku": ("LONG-ITEM-NUMBER-0123456789", 999999.99, 12.345, 24),
+    "spaces_lowercase": ("ab 12 cd", 0.5, 0.01, 22),
+    # No non-ASCII case: the printer fonts and Code 128 are ASCII only, and
+    # the generators reject such item numbers (UnicodeEncodeError) rather
+    # than print a tag whose barcode doesn't match the item.
+}
+
+
+def golden_cases() -> dict:
+    """Case id -> (generator, args)."""
+    cases = {}
+    for tag, args in TAGS.items():
+        for preset in PRESET_LAYOUTS:
+            cases[f"dpl/{preset}/{tag}"] = ("dpl", list(args) + [preset])
+        for dpi in (300, 600):
+            cases[f"dpl/standard@{dpi}/{tag}"] = ("dpl", list(args) + ["standard", dpi])
+        cases[f"zpl/{tag}"] = ("zpl", list(args))
+        cases[f"epl/{tag}"] = ("epl", list(args))
+    for preset in PRESET_LAYOUTS:
+        cases[f"test_label/{preset}"] = ("test_label", [preset])
+    for name in ("zpl_test_label", "calibrate", "cancel", "setup"):
+        cases[name] = (name, [])
+    return cases
+
+
+def run_case(generator: str, args: list) -> dict:
+    """Output as a JSON-safe string, or the exception it raised."""
+    try:
+        return {"output": GENERATORS[generator](*args).decode('latin-1')}
+    except Exception as e:
+        return {"error": type(e).__name__}
+
+
+def check_goldens(update: bool = False) -> bool:
+    results = {case: dict(generator=generator, args=args, **run_case(generator, args))
+               for case, (generator, args) in golden_cases().items()}
+    if update:
+        os.makedirs(GOLDEN_DIR, exist_ok=True)
+        with open(GOLDEN_FILE, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+        print(f"✓ Wrote {len(results)} goldens to {GOLDEN_FILE}")
+        return True
+
+    try:
+        with open(GOLDEN_FILE, encoding='utf-8') as f:
+            goldens = json.load(f)
+    except OSError:
+        print(f"✗ No goldens at {GOLDEN_FILE} - run with --update first")
+        return False
+
+    failures = 0
+    for case in sorted(set(goldens) | set(results)):
+        want, got = goldens.get(case), results.get(case)
+        if want is None or got is None:
+            print(f"✗ {case}: {'new case' if want is None else 'case removed'} (run --update)")
+            failures += 1
+        elif want.get("output") != got.get("output") or want.get("error") != got.get("error"):
+            failures += 1
+            print(f"✗ {case}")
+            want_lines = (want.get("output") or want.get("error", "")).split("\r\n")
+            got_lines = (got.get("output") or got.get("error", "")).split("\r\n")
+            for index in range(max(len(want_lines), len(got_lines))):
+                a = want_lines[index] if index < len(want_lines) else None
+                b = got_lines[index] if index < len(got_lines) else None
+                if a != b:
+                    print(f"    line {index + 1}: expected {a!r}")
+                    print(f"    {' ' * len(str(index + 1))}       got      {b!r}")
+                    break
+    if failures:
+        print(f"✗ {failures} of {len(results)} goldens differ")
+        return False
+    print(f"✓ {len(results)} goldens match")
+    return True
+
+
+# -- fuzzing ----------------------------------------------------------------
+
+def random_tag(rng: random.Random) -> tuple:
+    alphabet = string.ascii_uppercase + string.digits + string.ascii_lowercase + " -"
+    item = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 32))).strip() or "X"
+    price = rng.choice([rng.randint(0, 10 ** rng.randint(1, 7)),
+                        round(rng.uniform(0, 100000), 2)])
+    return item, price, round(rng.uniform(0, 30), rng.randint(0, 3)), rng.choice([10, 14, 18, 22, 24])
+
+
+def check_dpl_invariants(tag: tuple, preset: str, dpi: int) -> list:
+    """Problems with one generated DPL command (empty = all invariants hold)."""
+    item, price, carat, karat = tag
+    command = create_dpl_command(item, price, carat, karat, preset, dpi)
+    problems = []
+    if command != create_dpl_command(item, price, carat, karat, preset, dpi):
+        problems.append("output is not deterministic")
+    lines = command.decode('ascii').split("\r\n")
+    if lines[:2] != ["\x02n", "\x02L"] or lines[-2:] != ["Q0001", "E"]:
+        problems.append("not framed by <STX>n <STX>L ... Q0001 E")
+    records = [line for line in lines if line[:1] in "1234" and len(line) >= RECORD_HEADER]
+    geometry = get_geometry(preset, dpi)
+    if len(records) != len(geometry.fields) + len(geometry.graphics):
+        problems.append(f"{len(records)} field records")
+    if not any(line.endswith(item) for line in records):
+        problems.append("item number missing")
+    if preset == "standard" and not any(line.endswith(generate_item_barcode(item))
+                                        for line in records):
+        problems.append("barcode data missing")
+    for line in records:
+        if (line[1] not in FONT_CELLS and line[1] not in "9eEY"
+                or not line[7:RECORD_HEADER].replace(" ", "0").isdigit()):
+            problems.append(f"record doesn't decode: {line!r}")
+    return problems
+
+
+def fuzz(count: int, seed: int) -> bool:
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    failures = 0
+    for _ in range(count):
+        tag = random_tag(rng)
+        preset = rng.choice(list(PRESET_LAYOUTS))
+        dpi = rng.choice([203, 300, 600])
+        problems = check_dpl_invariants(tag, preset, dpi)
+        for language, generator in (("zpl", create_zpl_command), ("epl", create_epl_command)):
+            if generator(*tag) != generator(*tag):
+                problems.append(f"{language} output is not deterministic")
+        if problems:
+            failures += 1
+            if failures <= 10:
+                print(f"✗ {tag} {preset}@{dpi}: {'; '.join(problems)}")
+    elapsed = time.perf_counter() - start
+    if failures:
+        print(f"✗ {failures} of {count} fuzzed tags broke an invariant (seed {seed})")
+        return False
+    print(f"✓ {count} fuzzed tags OK in {elapsed:.2f}s (seed {seed})")
+    return True
+
+
+# -- benchmark --------------------------------------------------------------
+
+def bench(update: bool = False, rounds: int = 5, labels: int = 5000) -> bool:
+    """Best-of-N DPL renders per second, per preset, against the saved baseline."""
+    rng = random.Random(1)
+    tags = [random_tag(rng) for _ in range(labels)]
+    results = {}
+    for preset in PRESET_LAYOUTS:
+        best = None
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for item, price, carat, karat in tags:
+                create_dpl_command(item, price, carat, karat, preset)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[f"dpl/{preset}"] = round(labels / best)
+
+    if update:
+        os.makedirs(GOLDEN_DIR, exist_ok=True)
+        with open(BENCH_FILE, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+        print(f"✓ Saved render baseline to {BENCH_FILE}")
+    try:
+        with open(BENCH_FILE, encoding='utf-8') as f:
+            baseline = json.load(f)
+    except OSError:
+        baseline = {}
+
+    ok = True
+    for name, rate in results.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"ℹ {name}: {rate:,} labels/s (no baseline)")
+        elif rate < base * (1 - BENCH_TOLERANCE):
+            print(f"✗ {name}: {rate:,} labels/s, baseline {base:,} ({rate / base - 1:+.0%})")
+            ok = False
+        else:
+            print(f"✓ {name}: {rate:,} labels/s, baseline {base:,} ({rate / base - 1:+.0%})")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check command generators against goldens')
+    parser.add_argument('--update', action='store_true',
+                        help='Rewrite the goldens (and the bench baseline with --bench)')
+    parser.add_argument('--fuzz', type=int, nargs='?', const=2000, metavar='N',
+                        help='Also fuzz N random tags (default: 2000)')
+    parser.add_argument('--seed', type=int, default=None, help='Fuzz seed (default: random)')
+    parser.add_argument('--bench', action='store_true', help='Also check render throughput')
+    args = parser.parse_args()
+
+    # Goldens are the uncalibrated layout
+    if label_geometry.CALIBRATION:
+        print(f"ℹ Ignoring {label_geometry.CALIBRATION_FILE} for the check")
+        label_geometry.CALIBRATION.clear()
+        label_geometry.GEOMETRY.clear()
+
+    ok = check_goldens(update=args.update)
+    if args.fuzz:
+        seed = args.seed if args.seed is not None else random.randrange(1 << 30)
+        ok = fuzz(args.fuzz, seed) and ok
+    if args.bench:
+        ok = bench(update=args.update) and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
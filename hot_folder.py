@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Hot Folder Watcher
+Prints CSV order files dropped into a folder by the POS system.
+
+    python jewelry_tag_printer.py --watch \\\\server\\tags
+
+Folder layout (subfolders are created automatically):
+    DIR/             POS drops *.csv here
+    DIR/processing/  file claimed (atomic rename) while it prints
+    DIR/done/        fully printed, with a .summary.txt next to it
+    DIR/failed/      some rows failed, with a .summary.txt listing them
+
+New files are picked up from inotify events on Linux, so a burst of
+hundreds of files never rescans the folder. Elsewhere the folder is polled,
+but only rescanned when its modification time changes.
+
+Every label sent is appended to a .progress ledger in processing/ before
+moving on. After a crash or restart, files left in processing/ are resumed
+and rows already in the ledger are skipped, so nothing prints twice.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from jewelry_tag_printer import send_command, DEFAULT_PRESET
+from batch_printer import BatchPipeline
+
+
+PROCESSING_DIR = "processing"
+DONE_DIR = "done"
+FAILED_DIR = "failed"
+
+# Seconds a polled file's size must stay unchanged before it is claimed
+SETTLE_SECONDS = 1.0
+
+# inotify constants (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")
+
+
+def is_order_file(name: str) -> bool:
+    """Only plain CSVs count - skip hidden and temp files the POS may write first."""
+    return name.lower().endswith(".csv") and not name.startswith(('.', '~'))
+
+
+class InotifySource:
+    """Yields names of files closed-after-write or moved into a folder (Linux)."""
+
+    def __init__(self, folder: str):
+        libc_name = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or not libc_name:
+            raise OSError("inotify not available")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(folder),
+                                          IN_CLOSE_WRITE | IN_MOVED_TO)
+        if wd < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {folder}")
+        self.overflowed = False
+
+    def wait(self, timeout: float) -> list:
+        """Block up to `timeout` seconds; return new file names."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        names = []
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                self.overflowed = True
+            elif name:
+                names.append(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingSource:
+    """Fallback: rescan the folder only when its mtime changes."""
+
+    def __init__(self, folder: str, interval: float = 1.0):
+        self.folder = folder
+        self.interval = interval
+        self._dir_mtime = None
+        self._pending = {}      # name -> (size, first seen at that size)
+        self.overflowed = False
+
+    def wait(self, timeout: float) -> list:
+        time.sleep(min(timeout, self.interval))
+        mtime = os.stat(self.folder).st_mtime
+        if mtime != self._dir_mtime:
+            self._dir_mtime = mtime
+            with os.scandir(self.folder) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.name not in self._pending:
+                        self._pending[entry.name] = (-1, 0.0)
+
+        # Only files whose size has settled are handed out
+        ready = []
+        now = time.monotonic()
+        for name, (size, since) in list(self._pending.items()):
+            try:
+                current = os.stat(os.path.join(self.folder, name)).st_size
+            except FileNotFoundError:
+                del self._pending[name]
+                continue
+            if current != size:
+                self._pending[name] = (current, now)
+            elif now - since >= SETTLE_SECONDS:
+                ready.append(name)
+                del self._pending[name]
+        return ready
+
+    def close(self):
+        pass
+
+
+class HotFolder:
+    """Claims, prints and files away order CSVs from a watched folder."""
+
+    def __init__(self, folder: str, poll_interval: float = 1.0, **print_options):
+        self.folder = os.path.abspath(folder)
+        self.poll_interval = poll_interval
+        self.print_options = print_options
+        self.processing = os.path.join(self.folder, PROCESSING_DIR)
+        self.done = os.path.join(self.folder, DONE_DIR)
+        self.failed = os.path.join(self.folder, FAILED_DIR)
+        for path in (self.processing, self.done, self.failed):
+            os.makedirs(path, exist_ok=True)
+        self.files_done = 0
+        self.files_failed = 0
+        # Files that couldn't be moved yet: name -> when to try again
+        self.retry = {}
+
+    # -- claiming ----------------------------------------------------------
+
+    def claim(self, name: str) -> Optional[str]:
+        """
+        Atomically move a dropped file into processing/. None if someone else
+        got it, or if it can't be moved yet (queued in self.retry).
+        """
+        if not is_order_file(name):
+            return None
+        source = os.path.join(self.folder, name)
+        target = os.path.join(self.processing, name)
+        if os.path.exists(target):
+            # Same name still in flight - keep both
+            stem, ext = os.path.splitext(name)
+            target = os.path.join(self.processing, f"{stem}-{datetime.now():%Y%m%d%H%M%S%f}{ext}")
+        try:
+            os.replace(source, target)
+        except FileNotFoundError:
+            self.retry.pop(name, None)
+            return None
+        except OSError as e:
+            # Windows: the POS still has the file open (PermissionError)
+            if name not in self.retry:
+                print(f"⚠ {name} can't be moved yet ({e}) - retrying")
+            self.retry[name] = time.monotonic() + self.poll_interval
+            return None
+        self.retry.pop(name, None)
+        return target
+
+    # -- printing ----------------------------------------------------------
+
+    @staticmethod
+    def _read_progress(progress_path: str) -> set:
+        try:
+            with open(progress_path, encoding='utf-8') as f:
+                return {int(line) for line in f if line.strip().isdigit()}
+        except FileNotFoundError:
+            return set()
+
+    def process(self, path: str) -> dict:
+        """Print one claimed file and move it to done/ or failed/."""
+        name = os.path.basename(path)
+        progress_path = path + ".progress"
+        already_sent = self._read_progress(progress_path)
+        options = dict(self.print_options)
+        use_usb = options.get("use_usb")
+        printer_name = options.get("printer_name")
+        printer_ip = options.get("printer_ip")
+
+        with open(progress_path, 'a', encoding='utf-8') as ledger:
+            def send_and_log(command: bytes, job: dict) -> bool:
+                ok = send_command(command, use_usb, printer_name, printer_ip)
+                if ok and job:
+                    ledger.write(f"{job['row']}\n")
+                    ledger.flush()
+                    os.fsync(ledger.fileno())
+                return ok
+
+            pipeline = BatchPipeline(sender=send_and_log, skip_rows=already_sent, **options)
+            summary = pipeline.run(path)
+        if summary["cancelled"]:
+            # Ctrl+C - leave the file and its ledger in processing/ for recover()
+            raise KeyboardInterrupt
+
+        summary["resumed_rows"] = len(already_sent)
+        ok = not summary["errors"]
+        dest_dir = self.done if ok else self.failed
+        dest = os.path.join(dest_dir, name)
+        if os.path.exists(dest):
+            stem, ext = os.path.splitext(name)
+            dest = os.path.join(dest_dir, f"{stem}-{datetime.now():%Y%m%d%H%M%S}{ext}")
+        self._write_summary(dest + ".summary.txt", name, summary)
+        os.replace(path, dest)
+        os.remove(progress_path)
+
+        if ok:
+            self.files_done += 1
+        else:
+            self.files_failed += 1
+        status = "✓" if ok else "✗"
+        print(f"{status} {name}: {summary['printed']} printed, {summary['failed']} failed, "
+              f"{len(summary['errors'])} errors -> {os.path.basename(dest_dir)}/")
+        return summary
+
+    @staticmethod
+    def _write_summary(path: str, name: str, summary: dict):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"File:      {name}\n")
+            f.write(f"Finished:  {datetime.now():%Y-%m-%d %H:%M:%S}\n")
+            f.write(f"Printed:   {summary['printed']}\n")
+            f.write(f"Failed:    {summary['failed']}\n")
+            if summary["resumed_rows"]:
+                f.write(f"Resumed:   {summary['resumed_rows']} rows were already printed before a restart\n")
+            f.write(f"Time:      {summary['wall_s']:.2f}s\n")
+            for row, message in summary["errors"]:
+                f.write(f"Row {row}: {message}\n")
+
+    # -- main loop ---------------------------------------------------------
+
+    def recover(self):
+        """Resume files left in processing/ by a previous run."""
+        for name in sorted(os.listdir(self.processing)):
+            if is_order_file(name):
+                print(f"↻ Resuming {name}")
+                self.process(os.path.join(self.processing, name))
+
+    def run(self, stop_after: Optional[float] = None):
+        """Watch forever (or for `stop_after` seconds)."""
+        self.recover()
+        try:
+            source = InotifySource(self.folder)
+            mode = "inotify"
+        except OSError:
+            source = PollingSource(self.folder, self.poll_interval)
+            mode = f"polling every {self.poll_interval:g}s"
+        print(f"👀 Watching {self.folder} ({mode}) - Ctrl+C to stop")
+
+        # Files dropped while we were down; after this, only events are used
+        queue = OrderedDict((name, None) for name in sorted(os.listdir(self.folder)))
+        deadline = time.monotonic() + stop_after if stop_after else None
+        try:
+            while deadline is None or time.monotonic() < deadline:
+                while queue:
+                    name, _ = queue.popitem(last=False)
+                    path = self.claim(name)
+                    if path:
+                        self.process(path)
+                for name in source.wait(self.poll_interval):
+                    queue[name] = None
+                now = time.monotonic()
+                for name, when in list(self.retry.items()):
+                    if when <= now:
+                        queue[name] = None
+                if source.overflowed:
+                    # Kernel dropped events - fall back to one full listing
+                    source.overflowed = False
+                    for name in sorted(os.listdir(self.folder)):
+                        queue[name] = None
+        except KeyboardInterrupt:
+            print("\nStopped.")
+        finally:
+            source.close()
+        print(f"Files printed: {self.files_done}, failed: {self.files_failed}")
+
+
+def watch_folder(folder: str, preset: str = DEFAULT_PRESET, **print_options):
+    """Run the hot-folder daemon (blocks until Ctrl+C)."""
+    HotFolder(folder, preset=preset, **print_options).run()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Inventory Index
+Looks up price, carat and karat for an item number from the inventory export.
+
+The CSV export is compiled into a sorted file of fixed-size records keyed by
+the normalized item number (same normalization as the barcode). The file is
+memory-mapped and binary searched, so a lookup touches ~20 records even at a
+million SKUs and never loads the whole export into memory.
+
+Rebuilds are incremental: if the export only grew (new rows appended), just
+the new rows are parsed and merged into the existing index. An unchanged
+export is a no-op.
+
+Usage:
+    python inventory_index.py [inventory.csv]        # Build / refresh index
+    python inventory_index.py --lookup MSD958009     # Look up one item
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import mmap
+import os
+import struct
+import sys
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from jewelry_tag_printer import generate_item_barcode
+from batch_printer import COLUMN_ALIASES
+import tag_log
+from tag_log import get_logger, fields
+
+log = get_logger("inventory")
+
+try:
+    from config import INVENTORY_CSV, INVENTORY_INDEX
+except ImportError:
+    INVENTORY_CSV = "inventory.csv"
+    INVENTORY_INDEX = "inventory.idx"
+
+
+# File layout:
+#   header: magic, version, record count, source size, source mtime, source prefix hash
+#   records: key (normalized item number, NUL padded), price, carat, karat
+MAGIC = b"JTIX"
+VERSION = 2
+HEADER = struct.Struct("<4sHxxQQd20s")
+KEY_SIZE = 32
+RECORD = struct.Struct(f"<{KEY_SIZE}sddB7x")
+
+# Karat byte for a row whose export had no karat (0 is stored as 0)
+NO_KARAT = 255
+
+
+def normalize_key(item_number: str) -> bytes:
+    """Index key for an item number (barcode normalization, padded)."""
+    key = generate_item_barcode(item_number.strip()).encode('utf-8')
+    if len(key) > KEY_SIZE:
+        raise ValueError(f"item number longer than {KEY_SIZE} bytes: {item_number}")
+    return key.ljust(KEY_SIZE, b"\0")
+
+
+def _source_hash(path: str, size: int) -> bytes:
+    """SHA-1 of the first `size` bytes of the export."""
+    digest = hashlib.sha1()
+    remaining = size
+    with open(path, 'rb') as f:
+        while remaining > 0:
+            block = f.read(min(1 << 20, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.digest()
+
+
+def _parse_export(path: str, start: int = 0) -> dict:
+    """Parse export rows from byte offset `start` into {key: (price, carat, karat)}."""
+    with open(path, 'rb') as f:
+        header_line = f.readline().decode('utf-8-sig')
+        if start:
+            f.seek(start)
+        data = f.read().decode('utf-8')
+
+    header = [h.strip().lower() for h in next(csv.reader([header_line]))]
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in header:
+                columns[field] = header.index(alias)
+                break
+    if "item_number" not in columns:
+        raise ValueError("inventory export has no item number column")
+
+    def number(row, field, default=0.0):
+        index = columns.get(field)
+        if index is None or index >= len(row) or not row[index].strip():
+            return default
+        return float(row[index].replace('$', '').replace(',', ''))
+
+    records = {}
+    reader = csv.reader(io.StringIO(data))
+    skipped = 0
+    for row in reader:
+        if len(row) <= columns["item_number"] or not row[columns["item_number"]].strip():
+            continue
+        try:
+            key = normalize_key(row[columns["item_number"]])
+            karat = number(row, "gold_karat", default=None)
+            if karat is None:
+                karat = NO_KARAT
+            elif not 0 <= int(karat) < NO_KARAT:
+                # Stored in one byte (RECORD), NO_KARAT reserved
+                raise ValueError(f"karat {karat} out of range")
+            else:
+                karat = int(karat)
+            records[key] = (number(row, "price"), number(row, "carat_weight"), karat)
+        except (ValueError, OverflowError):
+            skipped += 1
+    if skipped:
+        log.warning("Skipped inventory rows with bad values",
+                    extra=fields(path=path, rows=skipped))
+    return records
+
+
+def _read_header(path: str) -> Optional[tuple]:
+    try:
+        with open(path, 'rb') as f:
+            raw = f.read(HEADER.size)
+    except OSError:
+        return None
+    if len(raw) < HEADER.size:
+        return None
+    magic, version, count, size, mtime, prefix = HEADER.unpack(raw)
+    if magic != MAGIC or version != VERSION:
+        return None
+    return count, size, mtime, prefix
+
+
+def _iter_index(path: str, count: int):
+    """Yield (key, price, carat, karat) records from an existing index file."""
+    with open(path, 'rb') as f:
+        f.seek(HEADER.size)
+        for _ in range(count):
+            yield RECORD.unpack(f.read(RECORD.size))
+
+
+def build_index(csv_path: str = INVENTORY_CSV, index_path: str = INVENTORY_INDEX,
+                force: bool = False) -> str:
+    """
+    Build or refresh the index from the inventory export.
+
+    Returns "unchanged", "incremental" or "full" describing what was done.
+    """
+    stat = os.stat(csv_path)
+    existing = None if force else _read_header(index_path)
+
+    if existing:
+        count, old_size, old_mtime, old_prefix = existing
+        if old_size == stat.st_size and old_mtime == stat.st_mtime:
+            return "unchanged"
+        if stat.st_size >= old_size and _source_hash(csv_path, old_size) == old_prefix:
+            if stat.st_size == old_size:
+                mode = "unchanged"
+                new_records = {}
+            else:
+                mode = "incremental"
+                new_records = _parse_export(csv_path, start=old_size)
+            merged = _merge(_iter_index(index_path, count), new_records)
+        else:
+            existing = None
+
+    if not existing:
+        mode = "full"
+        merged = sorted((key,) + value for key, value in _parse_export(csv_path).items())
+
+    prefix = _source_hash(csv_path, stat.st_size)
+    tmp_path = index_path + ".tmp"
+    written = 0
+    with open(tmp_path, 'wb') as f:
+        f.write(b"\0" * HEADER.size)
+        for record in merged:
+            f.write(RECORD.pack(*record))
+            written += 1
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, written, stat.st_size, stat.st_mtime, prefix))
+    os.replace(tmp_path, index_path)
+    return mode
+
+
+def _merge(old_records, new_records: dict):
+    """Merge sorted index records with new rows; new rows win on duplicate keys."""
+    new_sorted = sorted((key,) + value for key, value in new_records.items())
+    i = 0
+    for record in old_records:
+        while i < len(new_sorted) and new_sorted[i][0] < record[0]:
+            yield new_sorted[i]
+            i += 1
+        if i < len(new_sorted) and new_sorted[i][0] == record[0]:
+            continue
+        yield record
+    yield from new_sorted[i:]
+
+
+class InventoryIndex:
+    """Read-only, memory-mapped view of an index file."""
+
+    def __init__(self, index_path: str = INVENTORY_INDEX):
+        self.path = index_path
+        self._file = None
+        self._map = None
+        self._count = 0
+        self._mtime = None
+        self.open()
+
+    def open(self):
+        header = _read_header(self.path)
+        if header is None:
+            raise ValueError(f"not a valid inventory index: {self.path}")
+        self.close()
+        self._count = header[0]
+        self._mtime = os.stat(self.path).st_mtime
+        self._file = open(self.path, 'rb')
+        if self._count:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def reload_if_changed(self):
+        """Re-map the file if it was rebuilt since it was opened."""
+        try:
+            if os.stat(self.path).st_mtime != self._mtime:
+                self.open()
+        except (OSError, ValueError):
+            pass
+
+    def __len__(self):
+        return self._count
+
+    def lookup(self, item_number: str) -> Optional[dict]:
+        """Find price, carat and karat for an item number (None if not found)."""
+        if not self._map:
+            return None
+        try:
+            key = normalize_key(item_number)
+        except ValueError:
+            return None
+        mm = self._map
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = HEADER.size + mid * RECORD.size
+            probe = mm[offset:offset + KEY_SIZE]
+            if probe < key:
+                lo = mid + 1
+            elif probe > key:
+                hi = mid
+            else:
+                _, price, carat, karat = RECORD.unpack_from(mm, offset)
+                return {"price": price, "carat_weight": carat,
+                        "gold_karat": None if karat == NO_KARAT else karat}
+        return None
+
+
+_inventory = None
+
+
+def get_inventory(csv_path: str = INVENTORY_CSV,
+                  index_path: str = INVENTORY_INDEX) -> Optional[InventoryIndex]:
+    """
+    Shared index for the CLI and GUI.
+    Refreshes the index first if the export is newer. Returns None if there
+    is no export and no index.
+    """
+    global _inventory
+    if os.path.exists(csv_path):
+        if not os.path.exists(index_path) or os.path.getmtime(csv_path) > os.path.getmtime(index_path):
+            try:
+                mode = build_index(csv_path, index_path)
+                if mode != "unchanged":
+                    log.info("Inventory index updated", extra=fields(mode=mode, ok=True))
+            except (OSError, ValueError) as e:
+                log.warning("Could not update inventory index", extra=fields(error=str(e)))
+    if _inventory is not None:
+        _inventory.reload_if_changed()
+        return _inventory
+    if not os.path.exists(index_path):
+        return None
+    try:
+        _inventory = InventoryIndex(index_path)
+    except (OSError, ValueError) as e:
+        log.warning("Could not open inventory index", extra=fields(error=str(e)))
+        return None
+    return _inventory
+
+
+def lookup_item(item_number: str) -> Optional[dict]:
+    """Look up an item in the shared inventory index (None if unavailable)."""
+    inventory = get_inventory()
+    return inventory.lookup(item_number) if inventory else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or query the inventory index')
+    parser.add_argument('csv', nargs='?', default=INVENTORY_CSV,
+                        help=f'Inventory export CSV (default: {INVENTORY_CSV})')
+    parser.add_argument('--index', default=INVENTORY_INDEX,
+                        help=f'Index file (default: {INVENTORY_INDEX})')
+    parser.add_argument('--force', action='store_true',
+                        help='Rebuild from scratch')
+    parser.add_argument('--lookup', metavar='ITEM',
+                        help='Look up one item number')
+    args = parser.parse_args()
+
+    if args.lookup:
+        index = InventoryIndex(args.index)
+        found = index.lookup(args.lookup)
+        if found:
+            print(f"{generate_item_barcode(args.lookup)}: price {found['price']:.2f}, "
+                  f"D={found['carat_weight']:.2f}, "
+                  f"karat {'-' if found['gold_karat'] is None else found['gold_karat']}")
+        else:
+            print(f"✗ {args.lookup} not in inventory")
+        return
+
+    mode = build_index(args.csv, args.index, force=args.force)
+    index = InventoryIndex(args.index)
+    tag_log.flush()
+    print(f"✓ Index {args.index}: {len(index)} items ({mode})")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,28 +2,55 @@
 """
 Jewelry Tag Printer GUI
 Simple graphical interface for printing jewelry tags
+
+The tag preview is the DPL command that would be sent, rasterized dot for
+dot (dpl_raster) at the selected preset's size.
+
+While the clerk types, the label bytes are rendered ahead on a background
+thread and the printer connection is opened, so Print only has to send.
 """
 
 import tkinter as tk
 from tkinter import ttk, messagebox
+import itertools
 import os
+import queue
 import sys
+import threading
 
 # Add current directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from jewelry_tag_printer import (
-    print_tag, generate_item_barcode, CSV_FILE, PRINTER_IP,
-    DEFAULT_USE_USB, USB_PRINTER_NAME, LABEL_PRESETS, DEFAULT_PRESET
+    save_to_csv, generate_barcode_preview, render_command, create_cancel_command,
+    generate_item_barcode, CSV_FILE, PRINTER_IP, DEFAULT_USE_USB, USB_PRINTER_NAME,
+    LABEL_PRESETS, DEFAULT_PRESET, PRINTER_PORT
 )
+from dpl_raster import render_preset, fit_scale
+from batch_grid import open_batch_grid
+from transport import PrinterConnection
+
+try:
+    from inventory_index import get_inventory
+except ImportError:
+    get_inventory = None
+
+# How often the window picks up status from the print worker (ms)
+POLL_MS = 50
+
+# Rows kept in the print job list
+MAX_JOB_ROWS = 50
+
+# Largest size the dot preview is drawn at (pixels)
+PREVIEW_BOX = (560, 220)
 
 
 class JewelryTagPrinterGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("Jewelry Tag Printer")
-        self.root.geometry("500x600")
-        self.root.minsize(450, 500)
+        self.root.geometry("640x860")
+        self.root.minsize(450, 620)
         # Now resizable!
         
         # Set style
@@ -32,7 +59,30 @@ class JewelryTagPrinterGUI:
         style.configure('Status.TLabel', font=('Helvetica', 10))
         style.configure('Preview.TLabel', font=('Courier', 11))
         
+        # Inventory index for auto-filling price/carat/karat
+        self.inventory = get_inventory() if get_inventory else None
+        self.autofilled = {}
+        
+        # Printing runs on a worker thread so the window never blocks on the
+        # printer; status comes back through self.events
+        self.print_queue = queue.Queue()
+        self.events = queue.Queue()
+        self.job_ids = itertools.count(1)
+        self.cancelled_jobs = set()
+        self.worker = threading.Thread(target=self.print_worker, name="gui-print", daemon=True)
+        self.worker.start()
+        
+        # Speculative work while typing: the latest form snapshot is rendered
+        # into self.prepared and its printer connection opened ahead of Print
+        self.connections = {}
+        self.connections_lock = threading.Lock()
+        self.prepared = (None, None)
+        self.speculation = None
+        self.speculation_ready = threading.Event()
+        threading.Thread(target=self.prepare_worker, name="gui-prepare", daemon=True).start()
+        
         self.create_widgets()
+        self.root.after(POLL_MS, self.poll_events)
         
     def create_widgets(self):
         # Main frame with padding
@@ -103,10 +153,21 @@ class JewelryTagPrinterGUI:
                                         style='Preview.TLabel', justify='left')
         self.preview_label.grid(row=0, column=0, sticky="w")
         
+        # Dot-accurate preview of the command bytes (DPL)
+        self.preview_photo = None
+        self.raster_label = ttk.Label(preview_frame)
+        self.raster_label.grid(row=1, column=0, sticky="w", pady=(5, 0))
+        self.raster_warning_var = tk.StringVar()
+        ttk.Label(preview_frame, textvariable=self.raster_warning_var, foreground="#c62828",
+                  wraplength=PREVIEW_BOX[0]).grid(row=2, column=0, sticky="w")
+        
         # Update preview on input change
+        self.item_number_var.trace('w', self.autofill_from_inventory)
         self.item_number_var.trace('w', self.update_preview)
         self.price_var.trace('w', self.update_preview)
         self.carat_var.trace('w', self.update_preview)
+        self.preset_var.trace('w', self.update_preview)
+        self.karat_var.trace('w', self.update_preview)
         
         row += 1
         
@@ -138,9 +199,14 @@ class JewelryTagPrinterGUI:
                                         variable=self.dry_run_var)
         dry_run_check.grid(row=3, column=0, columnspan=2, sticky="w", pady=5)
         
+        # A different printer means a different connection to warm up
+        self.printer_name_var.trace('w', lambda *a: self.speculate())
+        self.printer_ip_var.trace('w', lambda *a: self.speculate())
+        self.dry_run_var.trace('w', lambda *a: self.speculate())
+        
         self.use_zpl_var = tk.BooleanVar(value=False)
         zpl_check = ttk.Checkbutton(settings_frame, text="Use ZPL Format", 
-                                    variable=self.use_zpl_var)
+                                    variable=self.use_zpl_var, command=self.update_preview)
         zpl_check.grid(row=4, column=0, columnspan=2, sticky="w", pady=2)
         
         row += 1
@@ -166,6 +232,14 @@ class JewelryTagPrinterGUI:
         history_btn = ttk.Button(btn_frame, text="📋 History", command=self.view_history)
         history_btn.grid(row=0, column=2, padx=5)
         
+        # Cancel Button - stops the printer and clears its buffer
+        cancel_btn = ttk.Button(btn_frame, text="⏹️ Cancel", command=self.cancel_printing)
+        cancel_btn.grid(row=0, column=3, padx=5)
+        
+        # Batch Grid Button - many tags at once
+        grid_btn = ttk.Button(btn_frame, text="📑 Batch Grid", command=self.open_batch_grid)
+        grid_btn.grid(row=0, column=4, padx=5)
+        
         row += 1
         
         # Status bar
@@ -173,6 +247,20 @@ class JewelryTagPrinterGUI:
         status_bar = ttk.Label(main_frame, textvariable=self.status_var, 
                                relief="sunken", anchor="w")
         status_bar.grid(row=row, column=0, columnspan=2, sticky="ew", pady=(10, 0))
+        row += 1
+        
+        # Print jobs - newest first, updated live by the worker
+        jobs_frame = ttk.LabelFrame(main_frame, text="Print Jobs", padding="5")
+        jobs_frame.grid(row=row, column=0, columnspan=2, sticky="nsew", pady=(10, 0))
+        self.jobs_tree = ttk.Treeview(jobs_frame, columns=("job", "item", "status"),
+                                      show="headings", height=5)
+        self.jobs_tree.heading("job", text="#")
+        self.jobs_tree.heading("item", text="Item")
+        self.jobs_tree.heading("status", text="Status")
+        self.jobs_tree.column("job", width=40, anchor="e")
+        self.jobs_tree.column("item", width=150)
+        self.jobs_tree.column("status", width=200)
+        self.jobs_tree.grid(row=0, column=0, sticky="nsew")
         
         # Focus on first entry
         self.item_entry.focus()
@@ -185,6 +273,31 @@ class JewelryTagPrinterGUI:
         else:
             self.printer_name_entry.config(state='disabled')
             self.ip_entry.config(state='normal')
+        self.speculate()
+    
+    def autofill_from_inventory(self, *args):
+        """Fill price/carat/karat from the inventory index as the item number is typed."""
+        if not self.inventory:
+            return
+        found = self.inventory.lookup(self.item_number_var.get())
+        fields = {
+            "price": (self.price_var, lambda v: f"{v:g}"),
+            "carat_weight": (self.carat_var, lambda v: f"{v:.2f}"),
+            "gold_karat": (self.karat_var, str),
+        }
+        for key, (var, fmt) in fields.items():
+            # Only touch fields that are empty or still hold our last auto-fill
+            current = var.get()
+            ours = self.autofilled.get(key) == current
+            if found and found[key]:
+                if not current or ours or key == "gold_karat":
+                    var.set(fmt(found[key]))
+                    self.autofilled[key] = var.get()
+            elif ours and key != "gold_karat":
+                var.set("")
+                self.autofilled.pop(key, None)
+        if found:
+            self.status_var.set("✓ Filled from inventory")
     
     def update_preview(self, *args):
         """Update the tag preview and barcode text."""
@@ -213,6 +326,50 @@ class JewelryTagPrinterGUI:
             self.barcode_label.config(text=f"Barcode (on back): {barcode}")
         else:
             self.barcode_label.config(text="Barcode (on back): ---")
+        
+        self.update_raster_preview()
+        self.speculate()
+    
+    def update_raster_preview(self):
+        """Rasterize the command the current fields would send (DPL only)."""
+        if not hasattr(self, 'use_zpl_var'):
+            return      # traces fire while the widgets are still being built
+        if self.use_zpl_var.get():
+            self.show_raster(None, "Dot preview is available for DPL only")
+            return
+        try:
+            item = self.item_number_var.get().strip()
+            price = float(self.price_var.get().replace('$', '').replace(',', ''))
+            carat = float(self.carat_var.get())
+            karat = int(self.karat_var.get() or 14)
+        except ValueError:
+            self.show_raster(None, "")
+            return
+        if not item:
+            self.show_raster(None, "")
+            return
+        preset = self.preset_var.get()
+        try:
+            raster = render_preset(render_command(item, price, carat, karat, preset), preset)
+        except (ValueError, UnicodeError) as e:
+            self.show_raster(None, f"⚠ {e}")
+            return
+        warning = ""
+        if raster.warnings:
+            warning = f"⚠ {raster.warnings[0]}"
+            if len(raster.warnings) > 1:
+                warning += f" (+{len(raster.warnings) - 1} more)"
+        self.show_raster(raster, warning)
+    
+    def show_raster(self, raster, warning: str):
+        if raster is None:
+            self.preview_photo = None
+            self.raster_label.config(image="")
+        else:
+            zoom, shrink = fit_scale(raster, *PREVIEW_BOX)
+            self.preview_photo = tk.PhotoImage(data=raster.to_pgm(zoom, shrink), format="PPM")
+            self.raster_label.config(image=self.preview_photo)
+        self.raster_warning_var.set(warning)
     
     def validate_inputs(self):
         """Validate all input fields."""
@@ -241,42 +398,162 @@ class JewelryTagPrinterGUI:
         return errors
     
     def print_tag(self):
-        """Print the jewelry tag."""
+        """Queue the tag for the print worker and get ready for the next one."""
         errors = self.validate_inputs()
         if errors:
             messagebox.showerror("Validation Error", "\n".join(errors))
             return
         
-        self.status_var.set("Printing...")
-        self.root.update()
+        job = self.form_job()
+        job_id = next(self.job_ids)
+        self.jobs_tree.insert("", 0, iid=str(job_id),
+                              values=(job_id, job["item_number"], "Queued"))
+        for old in self.jobs_tree.get_children()[MAX_JOB_ROWS:]:
+            self.jobs_tree.delete(old)
+        self.print_queue.put((job_id, job))
+        self.status_var.set(f"Queued {job['item_number']}")
         
+        # Ready for the next tag while this one prints
+        self.item_number_var.set("")
+        self.price_var.set("")
+        self.carat_var.set("")
+        self.item_entry.focus()
+    
+    def form_job(self) -> dict:
+        """The tag and printer options in the form (raises ValueError if incomplete)."""
+        item_number = self.item_number_var.get().strip()
+        if not item_number:
+            raise ValueError("Item Number is required")
+        return dict(
+            item_number=item_number,
+            price=float(self.price_var.get().replace('$', '').replace(',', '')),
+            carat_weight=float(self.carat_var.get()),
+            gold_karat=int(self.karat_var.get()),
+            **self.printer_settings()
+        )
+    
+    @staticmethod
+    def command_key(job: dict) -> tuple:
+        """Everything the command bytes depend on."""
+        return (job["item_number"], job["price"], job["carat_weight"], job["gold_karat"],
+                job["preset"], job["use_zpl"])
+    
+    def connection_for(self, use_usb: bool, printer_name: str, printer_ip: str) -> PrinterConnection:
+        """Reusable connection for a printer; network sockets stay open between tags."""
+        key = ("usb", printer_name) if use_usb else ("network", printer_ip)
+        with self.connections_lock:
+            conn = self.connections.get(key)
+            if conn is None:
+                spec = {"name": printer_name if use_usb else printer_ip,
+                        "connection": key[0], "printer_name": printer_name or USB_PRINTER_NAME,
+                        "ip": printer_ip or PRINTER_IP, "port": PRINTER_PORT}
+                conn = self.connections[key] = PrinterConnection(key[0], spec)
+            return conn
+    
+    def speculate(self):
+        """Hand the current form to the prepare worker (only the latest is kept)."""
+        if not hasattr(self, 'dry_run_var'):
+            return
         try:
-            success = print_tag(
-                item_number=self.item_number_var.get().strip(),
-                price=float(self.price_var.get().replace('$', '').replace(',', '')),
-                carat_weight=float(self.carat_var.get()),
-                gold_karat=int(self.karat_var.get()),
-                preset=self.preset_var.get(),
-                printer_ip=self.printer_ip_var.get().strip(),
-                printer_name=self.printer_name_var.get().strip(),
-                use_usb=self.use_usb_var.get(),
-                use_zpl=self.use_zpl_var.get(),
-                dry_run=self.dry_run_var.get()
-            )
-            
-            if success:
-                self.status_var.set("✓ Print successful!")
-                if not self.dry_run_var.get():
-                    messagebox.showinfo("Success", "Tag printed successfully!")
+            self.speculation = self.form_job()
+        except ValueError:
+            return
+        self.speculation_ready.set()
+    
+    def prepare_worker(self):
+        """Background thread: render the form's tag and warm its printer connection."""
+        while True:
+            self.speculation_ready.wait()
+            self.speculation_ready.clear()
+            job = self.speculation
+            key = self.command_key(job)
+            try:
+                if self.prepared[0] != key:
+                    self.prepared = (key, render_command(job["item_number"], job["price"],
+                                                         job["carat_weight"], job["gold_karat"],
+                                                         job["preset"], use_zpl=job["use_zpl"]))
+                if not job["dry_run"]:
+                    self.connection_for(job["use_usb"], job["printer_name"],
+                                        job["printer_ip"]).warm()
+            except Exception:
+                # e.g. a non-ASCII item number; Print renders again and reports it
+                self.prepared = (None, None)
+    
+    def send_job(self, job: dict) -> bool:
+        """Send one tag, using the pre-rendered bytes if they match."""
+        key, command = self.prepared
+        if key != self.command_key(job):
+            command = render_command(job["item_number"], job["price"], job["carat_weight"],
+                                     job["gold_karat"], job["preset"], use_zpl=job["use_zpl"])
+        if job["dry_run"]:
+            print("\n[DRY RUN] Print command generated:")
+            print(command.decode('ascii'))
+            success = True
+        else:
+            success = self.connection_for(job["use_usb"], job["printer_name"],
+                                          job["printer_ip"]).send(command)
+        save_to_csv(job["item_number"], job["price"], job["carat_weight"],
+                    job["gold_karat"], success)
+        generate_barcode_preview(job["item_number"])
+        return success
+    
+    def print_worker(self):
+        """Background thread: print queued tags one at a time."""
+        while True:
+            job_id, job = self.print_queue.get()
+            if job_id in self.cancelled_jobs:
+                continue
+            self.events.put((job_id, "Printing..."))
+            try:
+                if self.send_job(job):
+                    status = "✓ Dry run" if job["dry_run"] else "✓ Printed"
                 else:
-                    messagebox.showinfo("Dry Run", "Print command generated (not sent to printer)")
-            else:
-                self.status_var.set("✗ Print failed")
-                messagebox.showerror("Error", "Failed to send to printer. Check connection.")
-                
-        except Exception as e:
-            self.status_var.set("✗ Error")
-            messagebox.showerror("Error", str(e))
+                    status = "✗ Failed - check connection"
+            except Exception as e:
+                status = f"✗ Error: {e}"
+            self.events.put((job_id, status))
+    
+    def poll_events(self):
+        """Apply status updates from the print worker (on the Tk thread)."""
+        try:
+            while True:
+                job_id, status = self.events.get_nowait()
+                self.set_job_status(job_id, status)
+        except queue.Empty:
+            pass
+        self.root.after(POLL_MS, self.poll_events)
+    
+    def set_job_status(self, job_id, status: str):
+        """Update a job's row and the status bar; job_id None is printer-wide."""
+        if job_id is None:
+            self.status_var.set(status)
+            return
+        iid = str(job_id)
+        if self.jobs_tree.exists(iid):
+            item = self.jobs_tree.set(iid, "item")
+            self.jobs_tree.set(iid, "status", status)
+            self.status_var.set(f"{item}: {status}")
+        if status.startswith("✗"):
+            self.root.bell()
+    
+    def cancel_printing(self):
+        """Drop tags still waiting to print, stop the printer and clear its buffer."""
+        for iid in self.jobs_tree.get_children():
+            if self.jobs_tree.set(iid, "status") == "Queued":
+                self.cancelled_jobs.add(int(iid))
+                self.jobs_tree.set(iid, "status", "Cancelled")
+        if self.dry_run_var.get():
+            self.status_var.set("Dry run - queued tags cancelled")
+            return
+        self.status_var.set("Cancelling...")
+        settings = (self.use_usb_var.get(), self.printer_name_var.get().strip(),
+                    self.printer_ip_var.get().strip())
+        threading.Thread(target=self.send_cancel, args=settings, daemon=True).start()
+    
+    def send_cancel(self, use_usb: bool, printer_name: str, printer_ip: str):
+        """Background thread: send the printer's cancel / clear-buffer command."""
+        ok = self.connection_for(use_usb, printer_name, printer_ip).send(create_cancel_command())
+        self.events.put((None, "✓ Printer buffer cleared" if ok else "✗ Could not reach printer"))
     
     def clear_fields(self):
         """Clear all input fields."""
@@ -287,6 +564,21 @@ class JewelryTagPrinterGUI:
         self.status_var.set("Ready")
         self.item_entry.focus()
     
+    def printer_settings(self) -> dict:
+        """Current printer options, for windows that print on their own."""
+        return dict(
+            preset=self.preset_var.get(),
+            printer_ip=self.printer_ip_var.get().strip(),
+            printer_name=self.printer_name_var.get().strip(),
+            use_usb=self.use_usb_var.get(),
+            use_zpl=self.use_zpl_var.get(),
+            dry_run=self.dry_run_var.get()
+        )
+    
+    def open_batch_grid(self):
+        """Open the spreadsheet-style grid for entering many tags."""
+        open_batch_grid(self.root, self.printer_settings, self.inventory)
+    
     def view_history(self):
         """Open the CSV history file."""
         if os.path.exists(CSV_FILE):
@@ -4,27 +4,35 @@ Jewelry Tag Printer for Datamax O'Neil E-Class Mark III
 Prints item details on front, barcode on back of jewelry tags (42mm x 26mm)
 """
 
-import csv
 import os
-import socket
 import sys
+
+# Plain single-tag prints go to a running print daemon (print_daemon.py).
+# Checked before the other imports so a forwarded print starts in milliseconds.
+if __name__ == "__main__" and '--no-daemon' not in sys.argv:
+    from daemon_client import forward_cli
+    _exit_code = forward_cli(sys.argv[1:])
+    if _exit_code is not None:
+        sys.exit(_exit_code)
+
+import csv
+import importlib.util
+import logging
+import socket
+import threading
 from datetime import datetime
 from typing import Optional
 import argparse
 
-# Try to import barcode library for preview generation
-try:
-    import barcode
-    from barcode.writer import ImageWriter
-    BARCODE_PREVIEW_AVAILABLE = True
-except ImportError:
-    BARCODE_PREVIEW_AVAILABLE = False
+# Barcode library for preview generation (imported on first use - it pulls
+# in Pillow, which is most of our startup time)
+BARCODE_PREVIEW_AVAILABLE = importlib.util.find_spec("barcode") is not None
 
 # Try to load configuration from config.py
 try:
     from config import (
         PRINTER_IP, PRINTER_PORT, CSV_FILE, PRINTER_DPI,
-        DEFAULT_USE_USB, USB_PRINTER_NAME, LABEL_PRESETS, DEFAULT_PRESET
+        DEFAULT_USE_USB, USB_PRINTER_NAME, DEFAULT_PRESET
     )
     DPI = PRINTER_DPI
 except ImportError:
@@ -36,27 +44,27 @@ except ImportError:
     DEFAULT_USE_USB = True
     USB_PRINTER_NAME = "Datamax-O'Neil E-4205A Mark III"
     DEFAULT_PRESET = "standard"
-    LABEL_PRESETS = {
-        "standard": {
-            "name": "Standard Tag (42x26mm)",
-            "width_dots": 336,
-            "height_dots": 208,
-            "printable_height_dots": 208,
-        },
-        "barbell": {
-            "name": "Barbell Tag (7/16 x 3.5 inch)",
-            "width_dots": 89,
-            "height_dots": 710,
-            "printable_height_dots": 355,
-        }
-    }
+
+# Per-DPI field positions for the DPL presets; LABEL_PRESETS with dot sizes
+from label_geometry import get_geometry, LABEL_PRESETS
+
+# Every transport write is recorded when WIRE_JOURNAL_DIR is set
+from wire_journal import journal_write
+# Logos/karat stamps are downloaded once per printer, then referenced by name
+from printer_graphics import with_uploads, mark_uploaded, zpl_references
+import memprofile
+import profiling
+import tag_log
+from tag_log import get_logger, fields
+
+log = get_logger("printer")
 
 
 def get_label_preset(preset_name: str) -> dict:
-    """Get label dimensions for a preset."""
+    """Get label dimensions for a preset (ValueError if there is no such preset)."""
     if preset_name not in LABEL_PRESETS:
-        print(f"⚠ Unknown preset '{preset_name}', using 'standard'")
-        preset_name = "standard"
+        raise ValueError(f"unknown preset '{preset_name}' "
+                         f"(expected one of: {', '.join(LABEL_PRESETS)})")
     return LABEL_PRESETS[preset_name]
 
 
@@ -72,7 +80,8 @@ def generate_item_barcode(item_number: str) -> str:
 
 
 def create_dpl_command(item_number: str, price: float, carat_weight: float, 
-                        gold_karat: int, preset: str = "standard") -> bytes:
+                        gold_karat: int, preset: str = "standard",
+                        dpi: Optional[int] = None) -> bytes:
     """
     Create DPL (Datamax Programming Language) command for the jewelry tag.
     Datamax O'Neil E-4205A Mark III
@@ -81,13 +90,19 @@ def create_dpl_command(item_number: str, price: float, carat_weight: float,
     - standard: 68mm x 26mm tag (42mm body + 26mm tail)
                 Text on body (rotated 90°), barcode on tail
     - barbell: 7/16" x 3.5" narrow tag (text vertical, barcode below)
+    
+    Field positions come from the preset's geometry table for the printer's
+    resolution (label_geometry.py; default PRINTER_DPI).
     """
     barcode_data = generate_item_barcode(item_number)
-    label = get_label_preset(preset)
+    get_label_preset(preset)
+    geometry = get_geometry(preset, dpi or DPI)
     
     # Format values for display
     price_str = f"{int(price)}" if price == int(price) else f"{price:.2f}"
     carat_str = f"D={carat_weight:.2f}"
+    values = {"price": price_str, "carat": carat_str, "item": item_number,
+              "barcode": barcode_data}
     
     # Build DPL command
     dpl = []
@@ -97,62 +112,18 @@ def create_dpl_command(item_number: str, price: float, carat_weight: float,
     dpl.append("S2")                     # Speed
     dpl.append("H10")                    # Heat setting
     
-    if preset == "barbell":
-        # Barbell tag using format from working label software
-        # Format: 19 (scalable font) + 1 (rotation) + height + row + col + width
-        # Based on: 1911001008001 20 pattern from old software
-        
-        # Setup commands from working software
-        dpl.append("PE")   # Present enable
-        dpl.append("SE")   # Sensor enable  
-        dpl.append("H17")  # Heat setting
-        
-        # Text lines using scalable font format (19)
-        # Format: 191100RRRRCCC20 where RRRR=row, CCC=column area
-        # Rows decrease for stacking (like 1008, 1007, 1006)
-        
-        # Price at row 1008
-        dpl.append(f"1911001008001 20{price_str}")
-        
-        # Carat at row 1007  
-        dpl.append(f"1911001007001 20{carat_str}")
-        
-        # Item number at row 1006
-        dpl.append(f"1911001006001 20{item_number}")    # Item at ~90 dots
-        
-    else:
-        # Standard RFID tag: 68mm x 26mm (544 x 208 dots at 203 DPI)
-        # Layout (as printed flat, before folding):
-        #
-        #   ┌──────────────────┬──────────────────┬─────────────┐
-        #   │   Product Info   │     BARCODE      │    TAIL     │  26mm
-        #   │   (front)        │   (folds behind) │  (string)   │  height
-        #   │   21mm (168 dots)│   21mm (168 dots)│ 26mm (208)  │
-        #   └──────────────────┴──────────────────┴─────────────┘
-        #                        68mm total (544 dots)
-        #
-        # When folded: barcode wraps behind product info, tail is the loop
-        
-        dpl.append(f"PW{label['height_dots']}")     # Width: 208 dots (26mm height)
-        dpl.append(f"L0{label['width_dots']}")      # Length: 544 dots (68mm)
-        
-        # PRODUCT INFO - First 21mm (0-168 dots) - this is the FRONT when folded
-        # Text rotated 90° so it reads correctly when tag hangs
-        # Format: 1 ROT 11 00 XXX YYY 0 HH W F DATA
-        
-        # Price - top of front section, large font
-        dpl.append(f"111100001500300221{price_str}")
-        
-        # D=carat - middle of front section
-        dpl.append(f"111100006500300211{carat_str}")
-        
-        # Item number - bottom of front section
-        dpl.append(f"111100011500150211{item_number}")
-        
-        # BARCODE - Next 21mm (168-336 dots) - this FOLDS BEHIND
-        # Position starts at X=168, rotated 90° to fit
-        # Code 128, narrow bars, height fits in 26mm width
-        dpl.append(f"1e1017000300101020070{barcode_data}")
+    # Preset setup (barbell: present/sensor enable + heat; standard: width/length)
+    dpl.extend(geometry.setup)
+    
+    # Standard: price, D=carat and item on the front, barcode on the panel
+    # that folds behind. Barbell: the three text lines stacked.
+    # Text too long for its box is set in a smaller font (font_metrics.py).
+    for field, prefix in geometry.fields:
+        dpl.append(geometry.record(field, prefix, values[field]))
+    
+    # Printer-resident graphics by name (logo, K14 stamp - printer_graphics.py)
+    for name, prefix in geometry.graphics:
+        dpl.append(prefix + name.format(karat=gold_karat))
     
     # Print 1 label
     dpl.append("Q0001")
@@ -215,7 +186,7 @@ def create_zpl_command(item_number: str, price: float, carat_weight: float,
 ^FWB
 ^BY2
 ^FO150,180^BCB,40,N,N,N^FD{barcode_data}^FS
-^XZ
+{zpl_references(gold_karat)}^XZ
 """
     return zpl.encode('ascii')
 
@@ -263,27 +234,33 @@ def create_epl_command(item_number: str, price: float, carat_weight: float,
 
 
 def send_to_printer(command: bytes, printer_ip: str = PRINTER_IP, 
-                    printer_port: int = PRINTER_PORT) -> bool:
+                    printer_port: int = PRINTER_PORT, job: Optional[str] = None) -> bool:
     """Send print command to the Datamax printer via TCP/IP."""
+    command, uploads = with_uploads(command, f"tcp:{printer_ip}:{printer_port}")
     try:
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
             sock.settimeout(10)
             sock.connect((printer_ip, printer_port))
             sock.sendall(command)
-            print(f"✓ Print command sent to {printer_ip}:{printer_port}")
+            journal_write(f"tcp:{printer_ip}:{printer_port}", command, job)
+            mark_uploaded(f"tcp:{printer_ip}:{printer_port}", uploads)
+            log.info("Print command sent", extra=fields(
+                target=f"{printer_ip}:{printer_port}", bytes=len(command), ok=True))
             return True
     except socket.timeout:
-        print(f"✗ Connection timeout to printer at {printer_ip}:{printer_port}")
+        log.error("Connection timeout", extra=fields(target=f"{printer_ip}:{printer_port}"))
         return False
     except ConnectionRefusedError:
-        print(f"✗ Connection refused by printer at {printer_ip}:{printer_port}")
+        log.error("Connection refused", extra=fields(target=f"{printer_ip}:{printer_port}"))
         return False
     except Exception as e:
-        print(f"✗ Failed to send to printer: {e}")
+        log.error("Failed to send to printer", extra=fields(
+            target=f"{printer_ip}:{printer_port}", error=str(e)))
         return False
 
 
-def send_to_usb_printer(command: bytes, printer_name: Optional[str] = None) -> bool:
+def send_to_usb_printer(command: bytes, printer_name: Optional[str] = None,
+                        job: Optional[str] = None) -> bool:
     """
     Send print command to USB-connected printer.
     Works on Windows with the printer name from Control Panel.
@@ -292,7 +269,16 @@ def send_to_usb_printer(command: bytes, printer_name: Optional[str] = None) -> b
     """
     if printer_name is None:
         printer_name = USB_PRINTER_NAME
-    
+    command, uploads = with_uploads(command, f"usb:{printer_name}")
+    ok = _write_usb_printer(command, printer_name)
+    if ok:
+        journal_write(f"usb:{printer_name}", command, job)
+        mark_uploaded(f"usb:{printer_name}", uploads)
+    return ok
+
+
+def _write_usb_printer(command: bytes, printer_name: str) -> bool:
+    """Spool raw bytes to a USB printer (win32print, share write, or lpr)."""
     if sys.platform == "win32":
         # Try Method 1: win32print (standard Windows printing)
         try:
@@ -310,25 +296,24 @@ def send_to_usb_printer(command: bytes, printer_name: Optional[str] = None) -> b
             
             if matched_printer:
                 printer_name = matched_printer
-                print(f"Found printer: {printer_name}")
+                log.debug("Found printer", extra=fields(printer=printer_name))
             elif printer_name not in printers:
-                print(f"⚠ Warning: '{printer_name}' not found in printer list")
-                print(f"  Available printers: {printers}")
-                print(f"  Trying anyway...")
+                log.warning("Printer not in the printer list - trying anyway",
+                            extra=fields(printer=printer_name, available=printers))
             
             hPrinter = win32print.OpenPrinter(printer_name)
             try:
                 # Get printer port for direct access attempt
                 printer_info = win32print.GetPrinter(hPrinter, 2)
                 port_name = printer_info.get('pPortName', 'Unknown')
-                print(f"Printer port: {port_name}")
                 
                 hJob = win32print.StartDocPrinter(hPrinter, 1, ("Jewelry Tag", None, "RAW"))
                 try:
                     win32print.StartPagePrinter(hPrinter)
                     bytes_written = win32print.WritePrinter(hPrinter, command)
                     win32print.EndPagePrinter(hPrinter)
-                    print(f"✓ Sent {bytes_written} bytes to {printer_name}")
+                    log.info("Print command sent", extra=fields(
+                        target=printer_name, port=port_name, bytes=bytes_written, ok=True))
                 finally:
                     win32print.EndDocPrinter(hPrinter)
             finally:
@@ -336,12 +321,11 @@ def send_to_usb_printer(command: bytes, printer_name: Optional[str] = None) -> b
             return True
             
         except ImportError:
-            print("✗ win32print not available. Install pywin32:")
-            print("  pip install pywin32")
+            log.error("win32print not available - install pywin32: pip install pywin32")
             return False
         except Exception as e:
-            print(f"✗ Failed via win32print: {e}")
-            print("  Trying alternative method...")
+            log.warning("Failed via win32print - trying a direct write",
+                        extra=fields(target=printer_name, error=str(e)))
             
             # Try Method 2: Direct file write to printer share
             try:
@@ -349,16 +333,18 @@ def send_to_usb_printer(command: bytes, printer_name: Optional[str] = None) -> b
                 printer_path = f"\\\\localhost\\{printer_name}"
                 with open(printer_path, 'wb') as f:
                     f.write(command)
-                print(f"✓ Sent via direct file write to {printer_path}")
+                log.info("Print command sent via direct file write", extra=fields(
+                    target=printer_path, bytes=len(command), ok=True))
                 return True
             except Exception as e2:
-                print(f"✗ Direct write also failed: {e2}")
+                log.error("Direct write also failed", extra=fields(target=printer_path,
+                                                                    error=str(e2)))
                 
             # List printers for help
             try:
                 import win32print
                 printers = [p[2] for p in win32print.EnumPrinters(win32print.PRINTER_ENUM_LOCAL | win32print.PRINTER_ENUM_CONNECTIONS)]
-                print(f"  Available printers: {printers}")
+                log.info("Available printers", extra=fields(available=printers))
             except:
                 pass
             return False
@@ -378,19 +364,94 @@ def send_to_usb_printer(command: bytes, printer_name: Optional[str] = None) -> b
             )
             stdout, stderr = process.communicate(input=command)
             if process.returncode == 0:
-                print(f"✓ Print command sent via lpr to {printer_name or 'default printer'}")
+                log.info("Print command sent via lpr", extra=fields(
+                    target=printer_name or "default printer", bytes=len(command), ok=True))
                 return True
             else:
-                print(f"✗ lpr failed: {stderr.decode()}")
+                log.error("lpr failed", extra=fields(target=printer_name,
+                                                     error=stderr.decode().strip()))
                 return False
         except FileNotFoundError:
-            print("✗ lpr command not found")
+            log.error("lpr command not found")
             return False
         except Exception as e:
-            print(f"✗ Failed to send via lpr: {e}")
+            log.error("Failed to send via lpr", extra=fields(target=printer_name, error=str(e)))
             return False
 
 
+def render_command(item_number: str, price: float, carat_weight: float,
+                   gold_karat: int, preset: str = "standard",
+                   use_zpl: bool = False, use_epl: bool = False,
+                   dpi: Optional[int] = None) -> bytes:
+    """
+    Build the printer command bytes for one tag in the chosen language.
+    dpi picks the DPL geometry table (ZPL/EPL layouts are 203 dpi only).
+    """
+    if use_zpl:
+        return create_zpl_command(item_number, price, carat_weight, gold_karat)
+    if use_epl:
+        return create_epl_command(item_number, price, carat_weight, gold_karat)
+    return create_dpl_command(item_number, price, carat_weight, gold_karat, preset, dpi)
+
+
+def send_command(command: bytes, use_usb: bool = None,
+                 printer_name: Optional[str] = None,
+                 printer_ip: Optional[str] = None,
+                 job: Optional[str] = None) -> bool:
+    """Send command bytes over USB or the network, as configured."""
+    if use_usb is None:
+        use_usb = DEFAULT_USE_USB
+    if use_usb:
+        return send_to_usb_printer(command, printer_name, job=job)
+    return send_to_printer(command, printer_ip or PRINTER_IP, job=job)
+
+
+# Print history CSV columns
+HISTORY_HEADER = [
+    'Timestamp', 'Item Number', 'Price', 'Carat Weight',
+    'Gold Karat', 'Barcode Data', 'Print Status'
+]
+
+
+def format_history_row(item_number: str, price: float, carat_weight: float,
+                       gold_karat: int, success: bool) -> list:
+    """Build one print history row (matches HISTORY_HEADER)."""
+    barcode_data = generate_item_barcode(item_number)
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    status = 'SUCCESS' if success else 'FAILED'
+    return [
+        timestamp, item_number, f"{price:.2f}", f"{carat_weight:.2f}",
+        gold_karat, barcode_data, status
+    ]
+
+
+class HistoryWriter:
+    """
+    Keeps the print history CSV open for long runs (batches, services).
+    Thread-safe; each row is flushed as it is written.
+    """
+    
+    def __init__(self, csv_path: str = CSV_FILE):
+        self.csv_path = csv_path
+        self._lock = threading.Lock()
+        file_exists = os.path.exists(csv_path)
+        self._file = open(csv_path, 'a', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        if not file_exists:
+            self._writer.writerow(HISTORY_HEADER)
+    
+    def write(self, item_number: str, price: float, carat_weight: float,
+              gold_karat: int, success: bool):
+        row = format_history_row(item_number, price, carat_weight, gold_karat, success)
+        with self._lock:
+            self._writer.writerow(row)
+            self._file.flush()
+    
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
 def save_to_csv(item_number: str, price: float, carat_weight: float,
                 gold_karat: int, success: bool, csv_path: str = CSV_FILE):
     """Save print record to CSV file."""
@@ -401,27 +462,26 @@ def save_to_csv(item_number: str, price: float, carat_weight: float,
         
         # Write header if new file
         if not file_exists:
-            writer.writerow([
-                'Timestamp', 'Item Number', 'Price', 'Carat Weight', 
-                'Gold Karat', 'Barcode Data', 'Print Status'
-            ])
-        
-        barcode_data = generate_item_barcode(item_number)
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        status = 'SUCCESS' if success else 'FAILED'
+            writer.writerow(HISTORY_HEADER)
         
-        writer.writerow([
-            timestamp, item_number, f"{price:.2f}", f"{carat_weight:.2f}",
-            gold_karat, barcode_data, status
-        ])
+        writer.writerow(format_history_row(
+            item_number, price, carat_weight, gold_karat, success
+        ))
     
-    print(f"✓ Record saved to {csv_path}")
+    log.info("Record saved", extra=fields(path=csv_path, ok=True))
 
 
 def generate_barcode_preview(item_number: str, output_dir: str = "barcodes"):
     """Generate a barcode image preview (optional)."""
     if not BARCODE_PREVIEW_AVAILABLE:
-        print("ℹ Barcode preview not available. Install: pip install python-barcode[images]")
+        log.debug("Barcode preview not available - install: pip install python-barcode[images]")
+        return None
+    
+    try:
+        import barcode
+        from barcode.writer import ImageWriter
+    except ImportError:
+        log.debug("Barcode preview not available - install: pip install python-barcode[images]")
         return None
     
     os.makedirs(output_dir, exist_ok=True)
@@ -433,7 +493,7 @@ def generate_barcode_preview(item_number: str, output_dir: str = "barcodes"):
     
     filename = os.path.join(output_dir, f"barcode_{barcode_data}")
     saved_path = barcode_instance.save(filename)
-    print(f"✓ Barcode preview saved: {saved_path}")
+    log.info("Barcode preview saved", extra=fields(path=saved_path, ok=True))
     return saved_path
 
 
@@ -471,48 +531,46 @@ def print_tag(item_number: str, price: float, carat_weight: float,
     
     label = get_label_preset(preset)
     
-    print("\n" + "="*50)
-    print("JEWELRY TAG PRINT JOB")
-    print("="*50)
-    print(f"Label Preset: {label['name']}")
-    print(f"Item Number:  {item_number}")
-    print(f"Price:        {int(price) if price == int(price) else price}")
-    print(f"Carat Weight: D={carat_weight:.2f}")
-    print(f"Gold Karat:   {gold_karat}K")
-    print(f"Barcode:      {generate_item_barcode(item_number)}")
-    print(f"Connection:   {'USB' if use_usb else 'Network'}")
-    print("="*50)
+    log.info("Print job", extra=fields(
+        preset=label['name'], item_number=item_number, price=price,
+        carat_weight=carat_weight, gold_karat=gold_karat,
+        connection='USB' if use_usb else 'Network',
+        language='ZPL' if use_zpl else 'EPL' if use_epl else 'DPL'))
     
     # Generate print command
-    if use_zpl:
-        command = create_zpl_command(item_number, price, carat_weight, gold_karat)
-        print("Using ZPL format")
-    elif use_epl:
-        command = create_epl_command(item_number, price, carat_weight, gold_karat)
-        print("Using EPL format")
-    else:
-        command = create_dpl_command(item_number, price, carat_weight, gold_karat, preset)
-        print("Using DPL format")
+    with profiling.stage("render"):
+        command = render_command(item_number, price, carat_weight, gold_karat,
+                                 preset, use_zpl=use_zpl, use_epl=use_epl)
     
     if dry_run:
+        tag_log.flush()
         print("\n[DRY RUN] Print command generated:")
         print(command.decode('ascii'))
         success = True
-    elif use_usb:
-        success = send_to_usb_printer(command, printer_name)
     else:
-        ip = printer_ip or PRINTER_IP
-        success = send_to_printer(command, ip)
+        with profiling.stage("send"):
+            success = send_command(command, use_usb, printer_name, printer_ip)
     
     # Save to CSV
-    save_to_csv(item_number, price, carat_weight, gold_karat, success)
+    with profiling.stage("history_csv"):
+        save_to_csv(item_number, price, carat_weight, gold_karat, success)
     
     # Generate barcode preview image
-    generate_barcode_preview(item_number)
+    with profiling.stage("barcode_preview"):
+        generate_barcode_preview(item_number)
     
     return success
 
 
+def lookup_inventory(item_number: str) -> Optional[dict]:
+    """Price/carat/karat for an item from the inventory index, if one exists."""
+    try:
+        from inventory_index import lookup_item
+    except ImportError:
+        return None
+    return lookup_item(item_number)
+
+
 def interactive_mode(preset: str = "standard"):
     """Run in interactive mode, prompting for each field."""
     label = get_label_preset(preset)
@@ -528,6 +586,7 @@ def interactive_mode(preset: str = "standard"):
     
     while True:
         try:
+            tag_log.flush()
             item_number = input("Item Number (or 'quit'/'switch'): ").strip()
             if item_number.lower() in ('quit', 'exit', 'q'):
                 print("Goodbye!")
@@ -551,9 +610,20 @@ def interactive_mode(preset: str = "standard"):
                 print("✗ Item number is required\n")
                 continue
             
-            price = float(input("Price: ").replace('$', '').replace(',', ''))
-            carat_weight = float(input("Carat Weight (D=): "))
-            gold_karat = int(input("Gold Karat (14/18/24): "))
+            # Offer inventory values as defaults (Enter accepts)
+            found = lookup_inventory(item_number) or {}
+            if found:
+                print("✓ Found in inventory - press Enter to accept")
+            
+            def ask(prompt, key, fmt):
+                default = found.get(key)
+                hint = f" [{fmt(default)}]" if default else ""
+                answer = input(f"{prompt}{hint}: ").strip()
+                return answer or (fmt(default) if default else answer)
+            
+            price = float(ask("Price", "price", lambda v: f"{v:g}").replace('$', '').replace(',', ''))
+            carat_weight = float(ask("Carat Weight (D=)", "carat_weight", lambda v: f"{v:.2f}"))
+            gold_karat = int(ask("Gold Karat (14/18/24)", "gold_karat", str))
             
             # Confirm before printing
             print(f"\nLabel: {label['name']}")
@@ -595,6 +665,29 @@ def list_printers():
         return []
 
 
+def control_daemon_jobs(action: str = "jobs", job_id: Optional[str] = None) -> bool:
+    """List, pause, resume or cancel jobs on the running print daemon."""
+    from daemon_client import request
+    payload = {"op": action}
+    if job_id:
+        payload["id"] = job_id
+    reply = request(payload, timeout=15)
+    if reply is None:
+        print("✗ Print daemon is not running")
+        return False
+    if "error" in reply:
+        print(f"✗ {reply['error']}")
+        return False
+    jobs = reply["jobs"] if action == "jobs" else [reply["job"]]
+    if not jobs:
+        print("ℹ No jobs")
+    for job in jobs:
+        print(f"  {job['id']:14} {job['state']:10} {job['priority']:11} "
+              f"sent {job['sent']}/{job['labels']}, confirmed {job['confirmed']}"
+              f"  {job['printer'] or '-'}")
+    return True
+
+
 def create_calibrate_command() -> bytes:
     """
     Create command to calibrate the printer for the current media.
@@ -607,6 +700,17 @@ def create_calibrate_command() -> bytes:
     return "\r\n".join(dpl).encode('ascii')
 
 
+def create_cancel_command() -> bytes:
+    """
+    Create command to stop printing and drop everything already buffered.
+    Labels sent before this may not print.
+    """
+    dpl = []
+    dpl.append("\x18")          # CAN - cancel current and queued jobs
+    dpl.append("\x02n")         # Clear image buffer
+    return ("".join(dpl) + "\r\n").encode('ascii')
+
+
 def create_setup_command() -> bytes:
     """
     Configure printer for jewelry tag labels.
@@ -744,6 +848,12 @@ def list_presets():
     print("-" * 60)
 
 
+def finish_memprofile(json_path: Optional[str]):
+    """Report --memprofile results; exit 1 if the per-label budget was exceeded."""
+    if memprofile.ENABLED and not memprofile.finish(json_path or None):
+        sys.exit(1)
+
+
 def main():
     """Main entry point with argument parsing."""
     parser = argparse.ArgumentParser(
@@ -759,16 +869,29 @@ Label Presets:
 
 Examples:
   %(prog)s -i                                      # Interactive mode
+  %(prog)s --scan                                  # Reprint scanned tags
   %(prog)s -n "MSD958009" -p 17600 -c 5.26 -k 14   # Standard tag
   %(prog)s -n "MSD958009" -p 17600 -c 5.26 -k 14 --label barbell  # Barbell tag
   %(prog)s --list-presets                          # Show label presets
   %(prog)s --test                                  # Test print
   %(prog)s --test --label barbell                  # Test barbell label
+  %(prog)s --batch intake.csv                      # Print a CSV of tags
+  %(prog)s --watch C:\\POS\\tags                     # Print CSVs dropped in a folder
+  %(prog)s -n "MSD958009"                          # Price/carat/karat from inventory
+  %(prog)s --build-index inventory.csv             # Index the inventory export
+  %(prog)s --batch intake.csv --profile            # Time each print stage
+  %(prog)s --batch intake.csv --quiet              # Warnings and errors only
+  %(prog)s --batch reprice.csv --dry-run --memprofile  # Check memory per label
+
+If print_daemon.py is running, plain prints are forwarded to it
+(use --no-daemon to print directly).
         """
     )
     
     parser.add_argument('-i', '--interactive', action='store_true',
                         help='Run in interactive mode')
+    parser.add_argument('--scan', action='store_true',
+                        help='Reprint scanned tags with no prompts (barcode scanner mode)')
     parser.add_argument('-n', '--item-number', type=str,
                         help='Item number/SKU')
     parser.add_argument('-p', '--price', type=float,
@@ -802,9 +925,59 @@ Examples:
                         help='Calibrate printer for current label media')
     parser.add_argument('--setup', action='store_true',
                         help='Configure printer for jewelry tags - run once')
+    parser.add_argument('--batch', type=str, metavar='CSV',
+                        help='Print every row of a CSV (item_number, price, carat, karat)')
+    parser.add_argument('--watch', type=str, metavar='DIR',
+                        help='Hot-folder mode: print CSV files dropped into DIR')
+    parser.add_argument('--queue-size', type=int, default=16,
+                        help='Batch mode: labels buffered between stages (default: 16)')
+    parser.add_argument('--render-processes', type=int, default=0,
+                        help='Batch mode: render in N worker processes (default: 0 = thread)')
+    parser.add_argument('--no-daemon', action='store_true',
+                        help='Print directly even if the print daemon is running')
+    parser.add_argument('--build-index', type=str, nargs='?', const='', metavar='CSV',
+                        help='Build/refresh the inventory index from an export CSV')
+    parser.add_argument('--resume-from', type=int, metavar='ROW',
+                        help='Batch mode: skip CSV rows before ROW (after a cancelled batch)')
+    parser.add_argument('--jobs', action='store_true',
+                        help='List print daemon jobs with their progress')
+    parser.add_argument('--pause', type=str, metavar='JOB',
+                        help='Pause a print daemon job')
+    parser.add_argument('--resume', type=str, metavar='JOB',
+                        help='Resume a paused or cancelled print daemon job')
+    parser.add_argument('--cancel', type=str, metavar='JOB',
+                        help='Cancel a print daemon job and clear the printer buffer')
+    parser.add_argument('--profile', type=str, nargs='?', const='', metavar='JSON',
+                        help='Time each print stage and show p50/p95/p99 (optionally save JSON)')
+    parser.add_argument('--memprofile', type=str, nargs='?', const='', metavar='JSON',
+                        help='Trace memory during the run, show top allocation sites and '
+                             'fail over the per-label budget (optionally save JSON)')
+    parser.add_argument('--mem-budget', type=float, default=memprofile.MEMPROFILE_BUDGET_KB,
+                        metavar='KB',
+                        help=f'Memory budget per label for --memprofile '
+                             f'(default: {memprofile.MEMPROFILE_BUDGET_KB})')
+    parser.add_argument('--mem-min-labels', type=int, default=memprofile.MEMPROFILE_MIN_LABELS,
+                        metavar='N',
+                        help=f'Smallest batch --memprofile judges against the budget '
+                             f'(default: {memprofile.MEMPROFILE_MIN_LABELS})')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help='Only log warnings and errors (fastest for large batches)')
+    parser.add_argument('--log-format', choices=tag_log.FORMATS, default=tag_log.LOG_FORMAT,
+                        help=f'Log line format (default: {tag_log.LOG_FORMAT})')
+    parser.add_argument('--log-file', type=str, metavar='FILE',
+                        help='Write the log to FILE instead of the console')
     
     args = parser.parse_args()
     
+    tag_log.configure(level=logging.WARNING if args.quiet else logging.INFO,
+                      fmt=args.log_format, path=args.log_file, lean_records=True)
+    
+    if args.profile is not None:
+        profiling.enable(report_at_exit=True, json_path=args.profile or None)
+    
+    if args.memprofile is not None:
+        memprofile.enable(budget_kb=args.mem_budget, min_labels=args.mem_min_labels)
+    
     if args.list_printers:
         list_printers()
         return
@@ -830,7 +1003,62 @@ Examples:
         )
         return
     
-    if args.interactive:
+    if args.jobs or args.pause or args.resume or args.cancel:
+        action = next((name for name in ("pause", "resume", "cancel")
+                       if getattr(args, name)), "jobs")
+        control_daemon_jobs(action, None if action == "jobs" else getattr(args, action))
+        return
+    
+    if args.build_index is not None:
+        from inventory_index import build_index, InventoryIndex, INVENTORY_CSV, INVENTORY_INDEX
+        mode = build_index(args.build_index or INVENTORY_CSV, INVENTORY_INDEX)
+        print(f"✓ Inventory index: {len(InventoryIndex(INVENTORY_INDEX))} items ({mode})")
+        return
+    
+    # Fill in missing price/carat/karat from the inventory index
+    if args.item_number and None in (args.price, args.carat, args.karat):
+        found = lookup_inventory(args.item_number)
+        if found:
+            if args.price is None:
+                args.price = found['price']
+            if args.carat is None:
+                args.carat = found['carat_weight']
+            if args.karat is None:
+                args.karat = found['gold_karat']
+            print(f"✓ Filled from inventory: {args.item_number}")
+    
+    batch_options = dict(
+        preset=args.label,
+        use_usb=not args.network,
+        printer_name=args.printer,
+        printer_ip=args.ip,
+        use_zpl=args.zpl,
+        use_epl=args.epl,
+        dry_run=args.dry_run,
+        queue_size=args.queue_size,
+        render_processes=args.render_processes
+    )
+    
+    if args.watch:
+        from hot_folder import watch_folder
+        watch_folder(args.watch, **batch_options)
+        finish_memprofile(args.memprofile)
+        return
+    
+    if args.batch:
+        from batch_printer import run_batch, print_batch_report
+        skip_rows = set(range(2, args.resume_from)) if args.resume_from else None
+        summary = run_batch(args.batch, skip_rows=skip_rows, **batch_options)
+        print_batch_report(summary)
+        finish_memprofile(args.memprofile)
+        return
+    
+    if args.scan:
+        from scan_reprint import scan_mode
+        scan_mode(preset=args.label, use_usb=not args.network, printer_name=args.printer,
+                  printer_ip=args.ip, use_zpl=args.zpl, use_epl=args.epl,
+                  dry_run=args.dry_run)
+    elif args.interactive:
         interactive_mode(preset=args.label)
     elif all([args.item_number, args.price is not None, args.carat is not None,
               args.karat is not None]):
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+Print Job Queue
+Shared queue of print jobs in front of the printer farm.
+
+Submitting only validates and enqueues, so callers (HTTP service, daemon)
+return immediately. One worker thread per registered printer takes the
+next job it can print - a job either names a printer or goes to whichever
+printer is free first.
+
+Jobs have a priority class - interactive (someone is waiting at the
+counter), normal or bulk. Jobs are queued as chunks of at most
+CHUNK_LABELS labels and a printer goes back to the queue between chunks,
+so a single rush tag waits at most one chunk behind a 1,000-tag batch.
+
+Jobs can be paused, resumed and cancelled. A printer checks between labels,
+so it stops within one label; cancelling also sends the printer's cancel /
+clear-buffer command. The unsent labels of a paused or cancelled job are
+set aside (they don't count as queued) and resume() prints them.
+
+resume() starts at the first label that wasn't sent. Labels sent just
+before a cancel may still have been in the printer's buffer when the
+cancel command cleared it; those are not printed again - check the last
+tags that came out and resubmit any that are missing.
+"""
+
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from jewelry_tag_printer import (
+    render_command, create_cancel_command, HistoryWriter, CSV_FILE,
+    DEFAULT_PRESET, LABEL_PRESETS
+)
+from batch_printer import parse_row
+from transport import ConnectionPool
+import profiling
+import metrics
+
+
+# Priority classes, most urgent first
+PRIORITIES = ("interactive", "normal", "bulk")
+
+# Labels per chunk - the longest an interactive job waits for a busy printer
+CHUNK_LABELS = 10
+
+# Finished jobs kept for status queries
+KEEP_FINISHED_JOBS = 1000
+
+# Recent queue waits kept per priority for wait_stats()
+WAIT_SAMPLES = 1000
+
+_job_ids = itertools.count(1)
+
+
+class PrintJob:
+    """One submitted job: one or more labels for a single preset and printer."""
+
+    def __init__(self, labels: list, preset: str = DEFAULT_PRESET,
+                 printer: Optional[str] = None, use_zpl: bool = False,
+                 use_epl: bool = False, dry_run: bool = False, source: str = "",
+                 priority: str = "normal"):
+        self.id = f"{int(time.time()):x}-{next(_job_ids)}"
+        self.labels = labels
+        self.preset = preset
+        self.printer = printer
+        self.use_zpl = use_zpl
+        self.use_epl = use_epl
+        self.dry_run = dry_run
+        self.source = source
+        self.priority = priority
+        self.state = "queued"
+        self.hold = None            # "paused" / "cancelled" while held
+        self.assigned_printer = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.sent = 0               # labels handed to the printer
+        self.printed = 0            # ...and confirmed sent by the transport
+        self.failed = 0
+        self.errors = []
+        self.chunks_left = 0
+        self.held_chunks = []       # set aside while paused / cancelled
+        self.finished_event = threading.Event()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job is done, failed or cancelled; False on timeout."""
+        return self.finished_event.wait(timeout)
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "state": self.state,
+            "priority": self.priority,
+            "labels": len(self.labels),
+            "sent": self.sent,
+            "confirmed": self.printed,
+            "printed": self.printed,
+            "failed": self.failed,
+            "preset": self.preset,
+            "printer": self.assigned_printer or self.printer,
+            "dry_run": self.dry_run,
+            "source": self.source,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "errors": self.errors[:50],
+        }
+
+
+class Chunk:
+    """Consecutive labels job.labels[start:end] - what a printer takes at a time."""
+
+    __slots__ = ("job", "start", "end", "queued_at")
+
+    def __init__(self, job: PrintJob, start: int, end: int):
+        self.job = job
+        self.start = start
+        self.end = end
+        self.queued_at = time.monotonic()
+
+    def __len__(self):
+        return self.end - self.start
+
+
+def parse_labels(labels: list) -> list:
+    """Validate label dicts up front so bad jobs are rejected at submit time."""
+    if not labels:
+        raise ValueError("job has no labels")
+    parsed = []
+    for index, label in enumerate(labels, 1):
+        if not isinstance(label, dict):
+            raise ValueError(f"label {index}: expected an object")
+        try:
+            parsed.append(parse_row(label))
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"label {index}: {e}")
+    return parsed
+
+
+class JobQueue:
+    """Shared priority job queue with one worker per printer."""
+
+    def __init__(self, pool: Optional[ConnectionPool] = None,
+                 csv_path: Optional[str] = CSV_FILE,
+                 renderer=render_command, chunk_labels: int = CHUNK_LABELS):
+        self.pool = pool or ConnectionPool()
+        self.renderer = renderer
+        self.chunk_labels = max(1, chunk_labels)
+        self.history = HistoryWriter(csv_path) if csv_path else None
+        self._pending = {priority: deque() for priority in PRIORITIES}
+        self._waits = {priority: deque(maxlen=WAIT_SAMPLES) for priority in PRIORITIES}
+        self._jobs = OrderedDict()
+        self._cond = threading.Condition()
+        self._busy = {}
+        self._workers = []
+        self._running = False
+        metrics.QUEUE_DEPTH.set_source(self._depth_samples)
+        metrics.PRINTER_BUSY.set_source(self._busy_samples)
+
+    # -- submitting --------------------------------------------------------
+
+    def submit(self, labels: list, preset: str = DEFAULT_PRESET,
+               printer: Optional[str] = None, priority: Optional[str] = None,
+               **options) -> PrintJob:
+        """
+        Validate and enqueue a job; returns immediately.
+        Without a priority, single labels are interactive and batches normal.
+        """
+        if preset not in LABEL_PRESETS:
+            raise ValueError(f"unknown preset '{preset}'")
+        if printer is not None and printer not in self.pool.printers:
+            raise ValueError(f"unknown printer '{printer}'")
+        parsed = parse_labels(labels)
+        if priority is None:
+            priority = "interactive" if len(parsed) == 1 else "normal"
+        if priority not in PRIORITIES:
+            raise ValueError(f"unknown priority '{priority}' "
+                             f"(expected one of: {', '.join(PRIORITIES)})")
+        job = PrintJob(parsed, preset, printer, priority=priority, **options)
+        chunks = [Chunk(job, start, min(start + self.chunk_labels, len(parsed)))
+                  for start in range(0, len(parsed), self.chunk_labels)]
+        job.chunks_left = len(chunks)
+        with self._cond:
+            self._jobs[job.id] = job
+            self._pending[priority].extend(chunks)
+            self._trim()
+            self._cond.notify_all()
+        return job
+
+    def get(self, job_id: str) -> Optional[PrintJob]:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> list:
+        with self._cond:
+            return list(self._jobs.values())
+
+    def depth(self, priority: Optional[str] = None) -> int:
+        """Labels waiting for a printer, in total or for one priority."""
+        with self._cond:
+            classes = (priority,) if priority else PRIORITIES
+            return sum(len(chunk) for name in classes for chunk in self._pending[name])
+
+    def _depth_samples(self) -> dict:
+        return {(priority,): self.depth(priority) for priority in PRIORITIES}
+
+    def _busy_samples(self) -> dict:
+        with self._cond:
+            return {(key,): int(key in self._busy) for key in self.pool.printers}
+
+    def wait_stats(self) -> dict:
+        """Queue wait per priority (queued until a printer picked it up), in ms."""
+        stats = {}
+        with self._cond:
+            for priority in PRIORITIES:
+                samples = sorted(self._waits[priority])
+                entry = {"queued_labels": sum(len(chunk) for chunk in self._pending[priority]),
+                         "samples": len(samples)}
+                if samples:
+                    entry.update({
+                        "avg_ms": round(sum(samples) / len(samples) * 1000, 1),
+                        "p95_ms": round(samples[min(len(samples) - 1,
+                                                    int(len(samples) * 0.95))] * 1000, 1),
+                        "max_ms": round(samples[-1] * 1000, 1),
+                    })
+                stats[priority] = entry
+        return stats
+
+    def _trim(self):
+        """Forget the oldest finished or cancelled jobs beyond KEEP_FINISHED_JOBS."""
+        finished = [job_id for job_id, job in self._jobs.items()
+                    if job.state in ("done", "failed", "cancelled")]
+        for job_id in finished[:max(0, len(finished) - KEEP_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    # -- job control -------------------------------------------------------
+
+    def pause(self, job_id: str) -> PrintJob:
+        """Stop a job after its current label; resume() continues it."""
+        with self._cond:
+            job = self._control_target(job_id, ("queued", "printing"))
+            job.hold = job.state = "paused"
+            self._hold_chunks(job)
+            return job
+
+    def cancel(self, job_id: str) -> PrintJob:
+        """
+        Stop a job and clear the printer's buffer if it has sent anything.
+        The unsent labels are kept; resume() prints them (but not labels
+        the buffer clear may have dropped - see the module docstring).
+        """
+        with self._cond:
+            job = self._control_target(job_id, ("queued", "printing", "paused"))
+            job.hold = job.state = "cancelled"
+            self._hold_chunks(job)
+            in_chunk = job in self._busy.values()
+        if in_chunk:
+            # The printer's worker clears the buffer once the current label is sent
+            return job
+        if job.assigned_printer and not job.dry_run:
+            # Between chunks: labels already sent may still be in the buffer
+            self.pool.get(job.assigned_printer).send(create_cancel_command(), job.id)
+        job.finished_event.set()
+        return job
+
+    def resume(self, job_id: str) -> PrintJob:
+        """Requeue the remaining labels of a paused or cancelled job."""
+        with self._cond:
+            job = self._control_target(job_id, ("paused", "cancelled"))
+            if job.chunks_left == 0:
+                raise ValueError(f"job {job_id} has nothing left to print")
+            job.hold = None
+            job.state = "printing" if job.started else "queued"
+            job.finished_event.clear()
+            now = time.monotonic()
+            for chunk in job.held_chunks:
+                chunk.queued_at = now
+            self._pending[job.priority].extendleft(reversed(job.held_chunks))
+            job.held_chunks = []
+            self._cond.notify_all()
+            return job
+
+    def _hold_chunks(self, job: PrintJob):
+        """Move a held job's queued chunks out of the queue (with _cond held)."""
+        pending = self._pending[job.priority]
+        job.held_chunks.extend(chunk for chunk in pending if chunk.job is job)
+        self._pending[job.priority] = deque(chunk for chunk in pending if chunk.job is not job)
+
+    def _control_target(self, job_id: str, states: tuple) -> PrintJob:
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        if job.state not in states:
+            raise ValueError(f"job {job_id} is {job.state}")
+        return job
+
+    # -- printers ----------------------------------------------------------
+
+    @staticmethod
+    def _eligible(chunk: Chunk, key: str) -> bool:
+        # Once a job has started, its remaining chunks stay on the same printer
+        job = chunk.job
+        return job.hold is None and (job.assigned_printer or job.printer) in (None, key)
+
+    def printer_status(self) -> list:
+        status = []
+        with self._cond:
+            for key, spec in self.pool.printers.items():
+                conn = self.pool.get(key)
+                busy = self._busy.get(key)
+                status.append({
+                    "id": key,
+                    "name": spec["name"],
+                    "connection": spec["connection"],
+                    "dpi": spec["dpi"],
+                    "busy_job": busy.id if busy else None,
+                    "queued_jobs": len({chunk.job.id for name in PRIORITIES
+                                        for chunk in self._pending[name]
+                                        if self._eligible(chunk, key)}),
+                    "last_error": conn.last_error,
+                })
+        return status
+
+    # -- workers -----------------------------------------------------------
+
+    def start(self):
+        """Start one worker thread per registered printer."""
+        self._running = True
+        for key in self.pool.printers:
+            worker = threading.Thread(target=self._worker, args=(key,),
+                                      name=f"printer-{key}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for worker in self._workers:
+            worker.join()
+        self._workers.clear()
+        self.pool.close()
+        if self.history:
+            self.history.close()
+
+    def _next_chunk(self, key: str) -> Optional[Chunk]:
+        """
+        Wait for the oldest chunk of the most urgent priority this printer
+        may take (None when stopping).
+        """
+        with self._cond:
+            while self._running:
+                for priority in PRIORITIES:
+                    pending = self._pending[priority]
+                    for index, chunk in enumerate(pending):
+                        if self._eligible(chunk, key):
+                            del pending[index]
+                            self._waits[priority].append(time.monotonic() - chunk.queued_at)
+                            self._busy[key] = chunk.job
+                            chunk.job.assigned_printer = key
+                            return chunk
+                self._cond.wait()
+        return None
+
+    def _worker(self, key: str):
+        conn = self.pool.get(key)
+        while True:
+            chunk = self._next_chunk(key)
+            if chunk is None:
+                return
+            job = chunk.job
+            if job.started is None:
+                job.state = "printing"
+                job.started = time.time()
+            stopped = None
+            for index in range(chunk.start, chunk.end):
+                if job.hold:
+                    stopped = job.hold
+                    with self._cond:
+                        rest = Chunk(job, index, chunk.end)
+                        if job.hold:
+                            job.held_chunks.insert(0, rest)
+                        else:
+                            # Resumed in the meantime
+                            self._pending[job.priority].appendleft(rest)
+                            self._cond.notify_all()
+                    break
+                label = job.labels[index]
+                job.sent += 1
+                command = None
+                try:
+                    with profiling.stage("queue.render"):
+                        command = self.renderer(label["item_number"], label["price"],
+                                                label["carat_weight"], label["gold_karat"],
+                                                job.preset, use_zpl=job.use_zpl,
+                                                use_epl=job.use_epl, dpi=conn.spec["dpi"])
+                    with profiling.stage("queue.send"):
+                        ok = True if job.dry_run else conn.send(command, job.id)
+                    error = None if ok else (conn.last_error or "send failed")
+                except Exception as e:
+                    ok, error = False, f"render: {e}" if command is None else str(e)
+                if ok:
+                    job.printed += 1
+                    if not job.dry_run:
+                        metrics.LABELS_PRINTED.inc(job.preset, key)
+                else:
+                    job.failed += 1
+                    job.errors.append(f"{label['item_number']}: {error}")
+                    metrics.LABEL_FAILURES.inc(key, metrics.failure_reason(error))
+                if self.history:
+                    with profiling.stage("queue.history"):
+                        self.history.write(label["item_number"], label["price"],
+                                           label["carat_weight"], label["gold_karat"], ok)
+            if job.hold == "cancelled" and not job.dry_run:
+                conn.send(create_cancel_command(), job.id)
+            with self._cond:
+                self._busy.pop(key, None)
+                if not stopped:
+                    job.chunks_left -= 1
+                if job.chunks_left == 0:
+                    job.finished = time.time()
+                    if job.hold != "cancelled":
+                        job.hold = None
+                        job.state = "failed" if job.failed else "done"
+                elif job.hold != "cancelled":
+                    continue
+            job.finished_event.set()
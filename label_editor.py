@@ -2,6 +2,12 @@
 """
 Visual Label Preset Editor
 See exactly what will print and adjust positions in real-time
+
+The preview is the actual DPL that Test Print sends, rasterized dot for
+dot (dpl_raster) at the selected preset's size. Canvas items are created
+once and then only updated; key, slider and resize events just schedule a
+redraw, so bursts of events (dragging a slider) collapse into at most one
+redraw per frame, and only the field that changed is re-rasterized.
 """
 
 import tkinter as tk
@@ -15,6 +21,11 @@ from jewelry_tag_printer import (
     send_to_usb_printer, generate_item_barcode, 
     LABEL_PRESETS, USB_PRINTER_NAME
 )
+from dpl_raster import render_preset, fit_scale
+from label_geometry import TEXT_RECORD
+
+# Minimum time between preview redraws (ms) - about one frame at 60 Hz
+FRAME_MS = 16
 
 
 class LabelEditor:
@@ -42,10 +53,16 @@ class LabelEditor:
         self.item_x = tk.IntVar(value=90)
         self.item_y = tk.IntVar(value=5)
         
-        # Label dimensions for barbell (in dots)
-        self.label_width = 89      # 7/16" at 203 DPI
-        self.label_length = 355    # 1.75" printable at 203 DPI
-        self.first_half = 177      # First half boundary
+        # Label dimensions of the current preset (in dots)
+        self.label_width = 0
+        self.label_length = 0
+        self.set_label_size()
+        
+        # Preview state: canvas item ids, pending redraw, last drawn state
+        self.items = {}
+        self._redraw_id = None
+        self._drawn_state = None
+        self._dpl_shown = None
         
         self.create_widgets()
         self.update_preview()
@@ -86,19 +103,19 @@ class LabelEditor:
         self.price_entry = ttk.Entry(data_frame, width=15)
         self.price_entry.insert(0, self.sample_data["price"])
         self.price_entry.grid(row=0, column=1, padx=5, pady=2)
-        self.price_entry.bind("<KeyRelease>", lambda e: self.update_preview())
+        self.price_entry.bind("<KeyRelease>", lambda e: self.schedule_preview())
         
         ttk.Label(data_frame, text="Carat:").grid(row=1, column=0, sticky="e")
         self.carat_entry = ttk.Entry(data_frame, width=15)
         self.carat_entry.insert(0, self.sample_data["carat"])
         self.carat_entry.grid(row=1, column=1, padx=5, pady=2)
-        self.carat_entry.bind("<KeyRelease>", lambda e: self.update_preview())
+        self.carat_entry.bind("<KeyRelease>", lambda e: self.schedule_preview())
         
         ttk.Label(data_frame, text="Item#:").grid(row=2, column=0, sticky="e")
         self.item_entry = ttk.Entry(data_frame, width=15)
         self.item_entry.insert(0, self.sample_data["item"])
         self.item_entry.grid(row=2, column=1, padx=5, pady=2)
-        self.item_entry.bind("<KeyRelease>", lambda e: self.update_preview())
+        self.item_entry.bind("<KeyRelease>", lambda e: self.schedule_preview())
         
         # Position controls
         pos_frame = ttk.LabelFrame(parent, text="Text Positions (dots)", padding=10)
@@ -106,44 +123,46 @@ class LabelEditor:
         
         # Price position
         ttk.Label(pos_frame, text="Price X:").grid(row=0, column=0, sticky="e")
-        price_x_scale = ttk.Scale(pos_frame, from_=0, to=350, variable=self.price_x,
-                                   command=lambda v: self.update_preview())
+        price_x_scale = ttk.Scale(pos_frame, from_=0, to=self.label_width, variable=self.price_x,
+                                   command=lambda v: self.schedule_preview())
         price_x_scale.grid(row=0, column=1, sticky="ew", padx=5)
         ttk.Label(pos_frame, textvariable=self.price_x, width=4).grid(row=0, column=2)
         
         ttk.Label(pos_frame, text="Price Y:").grid(row=1, column=0, sticky="e")
-        price_y_scale = ttk.Scale(pos_frame, from_=0, to=89, variable=self.price_y,
-                                   command=lambda v: self.update_preview())
+        price_y_scale = ttk.Scale(pos_frame, from_=0, to=self.label_length, variable=self.price_y,
+                                   command=lambda v: self.schedule_preview())
         price_y_scale.grid(row=1, column=1, sticky="ew", padx=5)
         ttk.Label(pos_frame, textvariable=self.price_y, width=4).grid(row=1, column=2)
         
         # Carat position
         ttk.Label(pos_frame, text="Carat X:").grid(row=2, column=0, sticky="e")
-        carat_x_scale = ttk.Scale(pos_frame, from_=0, to=350, variable=self.carat_x,
-                                   command=lambda v: self.update_preview())
+        carat_x_scale = ttk.Scale(pos_frame, from_=0, to=self.label_width, variable=self.carat_x,
+                                   command=lambda v: self.schedule_preview())
         carat_x_scale.grid(row=2, column=1, sticky="ew", padx=5)
         ttk.Label(pos_frame, textvariable=self.carat_x, width=4).grid(row=2, column=2)
         
         ttk.Label(pos_frame, text="Carat Y:").grid(row=3, column=0, sticky="e")
-        carat_y_scale = ttk.Scale(pos_frame, from_=0, to=89, variable=self.carat_y,
-                                   command=lambda v: self.update_preview())
+        carat_y_scale = ttk.Scale(pos_frame, from_=0, to=self.label_length, variable=self.carat_y,
+                                   command=lambda v: self.schedule_preview())
         carat_y_scale.grid(row=3, column=1, sticky="ew", padx=5)
         ttk.Label(pos_frame, textvariable=self.carat_y, width=4).grid(row=3, column=2)
         
         # Item position
         ttk.Label(pos_frame, text="Item X:").grid(row=4, column=0, sticky="e")
-        item_x_scale = ttk.Scale(pos_frame, from_=0, to=350, variable=self.item_x,
-                                  command=lambda v: self.update_preview())
+        item_x_scale = ttk.Scale(pos_frame, from_=0, to=self.label_width, variable=self.item_x,
+                                  command=lambda v: self.schedule_preview())
         item_x_scale.grid(row=4, column=1, sticky="ew", padx=5)
         ttk.Label(pos_frame, textvariable=self.item_x, width=4).grid(row=4, column=2)
         
         ttk.Label(pos_frame, text="Item Y:").grid(row=5, column=0, sticky="e")
-        item_y_scale = ttk.Scale(pos_frame, from_=0, to=89, variable=self.item_y,
-                                  command=lambda v: self.update_preview())
+        item_y_scale = ttk.Scale(pos_frame, from_=0, to=self.label_length, variable=self.item_y,
+                                  command=lambda v: self.schedule_preview())
         item_y_scale.grid(row=5, column=1, sticky="ew", padx=5)
         ttk.Label(pos_frame, textvariable=self.item_y, width=4).grid(row=5, column=2)
         
         pos_frame.columnconfigure(1, weight=1)
+        self.x_scales = (price_x_scale, carat_x_scale, item_x_scale)
+        self.y_scales = (price_y_scale, carat_y_scale, item_y_scale)
         
         # Buttons
         btn_frame = ttk.Frame(parent)
@@ -173,7 +192,8 @@ class LabelEditor:
         self.canvas = tk.Canvas(preview_frame, bg="white", highlightthickness=1,
                                 highlightbackground="gray")
         self.canvas.pack(fill=tk.BOTH, expand=True)
-        self.canvas.bind("<Configure>", lambda e: self.update_preview())
+        self.create_preview_items()
+        self.canvas.bind("<Configure>", lambda e: self.schedule_preview())
         
         # DPL commands display
         cmd_frame = ttk.LabelFrame(parent, text="Generated DPL Commands", padding=10)
@@ -184,8 +204,19 @@ class LabelEditor:
         
     def on_preset_change(self):
         self.current_preset = self.preset_var.get()
+        self.set_label_size()
+        for scale in self.x_scales:
+            scale.configure(to=self.label_width)
+        for scale in self.y_scales:
+            scale.configure(to=self.label_length)
         self.update_info()
-        self.update_preview()
+        self.schedule_preview()
+        
+    def set_label_size(self):
+        """Take the label dimensions from the current preset."""
+        preset = LABEL_PRESETS[self.current_preset]
+        self.label_width = preset["width_dots"]
+        self.label_length = preset["height_dots"]
         
     def update_info(self):
         preset = LABEL_PRESETS.get(self.current_preset, {})
@@ -196,9 +227,29 @@ class LabelEditor:
             info += f"{preset['description']}"
         self.info_label.config(text=info)
         
+    def create_preview_items(self):
+        """Create the preview canvas items once; update_preview updates them."""
+        c = self.canvas
+        self.photo = None
+        self.items = {
+            "label": c.create_rectangle(0, 0, 0, 0, fill="white", outline="gray", width=1),
+            "image": c.create_image(0, 0, anchor="nw"),
+            "fold": c.create_line(0, 0, 0, 0, fill="red", dash=(4, 4), width=1),
+            "price_dot": c.create_oval(0, 0, 0, 0, fill="red", outline="red"),
+            "carat_dot": c.create_oval(0, 0, 0, 0, fill="blue", outline="blue"),
+            "item_dot": c.create_oval(0, 0, 0, 0, fill="green", outline="green"),
+            "scale": c.create_text(0, 0, anchor="w", font=("Arial", 9), fill="gray"),
+            "warning": c.create_text(0, 0, anchor="w", font=("Arial", 9), fill="#c62828"),
+        }
+        
+    def schedule_preview(self):
+        """Ask for a redraw; events before it runs are folded into it."""
+        if self._redraw_id is None:
+            self._redraw_id = self.root.after(FRAME_MS, self.update_preview)
+        
     def update_preview(self):
-        """Update the visual preview and DPL commands."""
-        self.canvas.delete("all")
+        """Update the raster preview and DPL commands."""
+        self._redraw_id = None
         
         # Get canvas size
         canvas_width = self.canvas.winfo_width()
@@ -207,103 +258,69 @@ class LabelEditor:
         if canvas_width < 10 or canvas_height < 10:
             return
         
-        # For barbell: label is 89 dots wide x 355 dots long (printable)
-        # Plus ~355 dots for the loop (shown grayed out)
-        label_w = 89
-        label_l = 355  # Printable
-        loop_l = 355   # Loop (non-printable)
-        total_l = label_l + loop_l
+        command = self.generate_raw_dpl()
+        positions = (self.price_x.get(), self.price_y.get(),
+                     self.carat_x.get(), self.carat_y.get(),
+                     self.item_x.get(), self.item_y.get())
+        state = (canvas_width, canvas_height, self.current_preset, command, positions)
+        if state == self._drawn_state:
+            return
+        self._drawn_state = state
         
-        # Calculate scale to fit canvas (with padding)
+        # Rasterize what Test Print would send and fit it to the canvas
         padding = 40
-        scale_x = (canvas_width - padding * 2) / total_l
-        scale_y = (canvas_height - padding * 2) / label_w
-        scale = min(scale_x, scale_y, 3)  # Cap at 3x
-        
-        # Draw label outline
+        raster = render_preset(command, self.current_preset)
+        zoom, shrink = fit_scale(raster, canvas_width - padding * 2,
+                                 canvas_height - padding * 2 - 20)
+        scale = zoom / shrink
+        self.photo = tk.PhotoImage(data=raster.to_pgm(zoom, shrink), format="PPM")
+        
+        c = self.canvas
+        items = self.items
         x_offset = padding
-        y_offset = padding + 20
-        
-        # First half (printable - front)
-        first_half_end = int(177 * scale)
-        self.canvas.create_rectangle(
-            x_offset, y_offset,
-            x_offset + first_half_end, y_offset + int(label_w * scale),
-            fill="#e8f5e9", outline="green", width=2
-        )
-        self.canvas.create_text(
-            x_offset + first_half_end/2, y_offset - 10,
-            text="FRONT (Product Info)", font=("Arial", 9), fill="green"
-        )
-        
-        # Second half (printable - back/barcode)
-        second_half_end = int(label_l * scale)
-        self.canvas.create_rectangle(
-            x_offset + first_half_end, y_offset,
-            x_offset + second_half_end, y_offset + int(label_w * scale),
-            fill="#e3f2fd", outline="blue", width=2
-        )
-        self.canvas.create_text(
-            x_offset + first_half_end + (second_half_end - first_half_end)/2, y_offset - 10,
-            text="BACK (Barcode)", font=("Arial", 9), fill="blue"
-        )
-        
-        # Loop (non-printable)
-        loop_end = int(total_l * scale)
-        self.canvas.create_rectangle(
-            x_offset + second_half_end, y_offset,
-            x_offset + loop_end, y_offset + int(label_w * scale * 0.3),  # Narrower
-            fill="#f5f5f5", outline="gray", width=1
-        )
-        self.canvas.create_text(
-            x_offset + second_half_end + (loop_end - second_half_end)/2, 
-            y_offset + int(label_w * scale * 0.15),
-            text="LOOP (no print)", font=("Arial", 8), fill="gray"
-        )
-        
-        # Draw fold line
-        self.canvas.create_line(
-            x_offset + first_half_end, y_offset,
-            x_offset + first_half_end, y_offset + int(label_w * scale),
-            fill="red", dash=(4, 4), width=2
-        )
-        
-        # Draw text positions
-        price_text = self.price_entry.get() or "PRICE"
-        carat_text = self.carat_entry.get() or "D=0.00"
-        item_text = self.item_entry.get() or "ITEM#"
-        
-        # Price
-        px = x_offset + int(self.price_x.get() * scale)
-        py = y_offset + int(self.price_y.get() * scale)
-        self.canvas.create_text(px, py, text=price_text, anchor="nw", 
-                                font=("Arial", 8), fill="black")
-        self.canvas.create_oval(px-3, py-3, px+3, py+3, fill="red", outline="red")
-        
-        # Carat
-        cx = x_offset + int(self.carat_x.get() * scale)
-        cy = y_offset + int(self.carat_y.get() * scale)
-        self.canvas.create_text(cx, cy, text=carat_text, anchor="nw",
-                                font=("Arial", 8), fill="black")
-        self.canvas.create_oval(cx-3, cy-3, cx+3, cy+3, fill="blue", outline="blue")
-        
-        # Item
-        ix = x_offset + int(self.item_x.get() * scale)
-        iy = y_offset + int(self.item_y.get() * scale)
-        self.canvas.create_text(ix, iy, text=item_text, anchor="nw",
-                                font=("Arial", 8), fill="black")
-        self.canvas.create_oval(ix-3, ix-3, ix+3, iy+3, fill="green", outline="green")
-        
-        # Add scale indicator
-        self.canvas.create_text(
-            padding, canvas_height - 20,
-            text=f"Scale: 1 dot = {scale:.2f} pixels | First half ends at X=177",
-            anchor="w", font=("Arial", 9), fill="gray"
-        )
+        y_offset = padding
+        c.coords(items["label"], x_offset - 1, y_offset - 1,
+                 x_offset + raster.width * scale, y_offset + raster.height * scale)
+        c.coords(items["image"], x_offset, y_offset)
+        c.itemconfigure(items["image"], image=self.photo)
+        
+        # Fold between the front and the part that folds behind
+        preset = LABEL_PRESETS[self.current_preset]
+        if "front_dots" in preset:
+            fold_y = y_offset + preset["front_dots"] * scale
+            c.coords(items["fold"], x_offset, fold_y, x_offset + raster.width * scale, fold_y)
+        elif "body_width_dots" in preset:
+            fold_x = x_offset + preset["body_width_dots"] / 2 * scale
+            c.coords(items["fold"], fold_x, y_offset, fold_x, y_offset + raster.height * scale)
+        else:
+            c.coords(items["fold"], 0, 0, 0, 0)
+        
+        # Slider positions, so they can be compared with where the text landed
+        for name, x, y in zip(("price", "carat", "item"), positions[::2], positions[1::2]):
+            dx = x_offset + x * scale
+            dy = y_offset + y * scale
+            c.coords(items[name + "_dot"], dx - 3, dy - 3, dx + 3, dy + 3)
+        
+        # Scale indicator and anything the rasterizer couldn't place
+        c.coords(items["scale"], padding, canvas_height - 30)
+        c.itemconfigure(items["scale"],
+                        text=f"{raster.width}x{raster.height} dots | "
+                             f"1 dot = {scale:.2f} pixels | {raster.fields} fields")
+        c.coords(items["warning"], padding, canvas_height - 14)
+        warning = ""
+        if raster.warnings:
+            warning = f"⚠ {raster.warnings[0]}"
+            if len(raster.warnings) > 1:
+                warning += f" (+{len(raster.warnings) - 1} more)"
+        c.itemconfigure(items["warning"], text=warning)
         
         # Update DPL commands
         self.update_dpl_display()
         
+    @staticmethod
+    def text_record(x: int, y: int, data: str) -> str:
+        return TEXT_RECORD.format(font="2", wide=1, high=1, row=y, column=x) + data
+        
     def generate_dpl(self):
         """Generate the DPL commands based on current settings."""
         price = self.price_entry.get() or "0"
@@ -320,12 +337,11 @@ class LabelEditor:
         dpl.append("\\x02L")           # Start label
         dpl.append("D11")              # Density
         
-        # Text commands: 1 ROT 11 00 XXX YYY H W F DATA
-        # ROT=2 (0 degrees), XXX=X position, YYY=Y position
-        # Padding positions to 3 digits
-        dpl.append(f"12110{px:03d}0{py:02d}00100{price}")
-        dpl.append(f"12110{cx:03d}0{cy:02d}00100{carat}")
-        dpl.append(f"12110{ix:03d}0{iy:02d}00100{item}")
+        # Text records: a b c d eee ffff gggg DATA - font 2, row (Y) and
+        # column (X) as 4 digits, so any position on the label fits
+        dpl.append(self.text_record(px, py, price))
+        dpl.append(self.text_record(cx, cy, carat))
+        dpl.append(self.text_record(ix, iy, item))
         
         dpl.append("E")                # End and print
         
@@ -344,18 +360,21 @@ class LabelEditor:
         dpl = "\x02n\r\n"
         dpl += "\x02L\r\n"
         dpl += "D11\r\n"
-        dpl += f"12110{px:03d}0{py:02d}00100{price}\r\n"
-        dpl += f"12110{cx:03d}0{cy:02d}00100{carat}\r\n"
-        dpl += f"12110{ix:03d}0{iy:02d}00100{item}\r\n"
+        dpl += self.text_record(px, py, price) + "\r\n"
+        dpl += self.text_record(cx, cy, carat) + "\r\n"
+        dpl += self.text_record(ix, iy, item) + "\r\n"
         dpl += "E\r\n"
         
         return dpl.encode('ascii')
         
     def update_dpl_display(self):
-        """Update the DPL commands text display."""
+        """Update the DPL commands text display (only when they changed)."""
+        commands = "\n".join(self.generate_dpl())
+        if commands == self._dpl_shown:
+            return
+        self._dpl_shown = commands
         self.cmd_text.delete("1.0", tk.END)
-        commands = self.generate_dpl()
-        self.cmd_text.insert("1.0", "\n".join(commands))
+        self.cmd_text.insert("1.0", commands)
         
     def test_print(self):
         """Send test print to printer."""
@@ -390,7 +409,7 @@ class LabelEditor:
         self.carat_y.set(5)
         self.item_x.set(90)
         self.item_y.set(5)
-        self.update_preview()
+        self.schedule_preview()
 
 
 def main():
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Label Geometry
+Tag layouts in physical units (mm), turned into per-DPI dot tables.
+
+Each preset's DPL field records are written once here with their positions,
+bar heights and module widths in millimetres; the label sizes come from
+LABEL_PRESETS in config.py. At import, a table is built
+for every resolution in the printer registry, so a 203 dpi and a 300 dpi
+printer share one layout and rendering a tag is only string joins - no
+unit conversion per label.
+
+    python label_geometry.py            # show the tables for the fleet
+
+Datamax rates its heads at 8, 11.8 and 23.6 dots/mm ("203", "300" and
+"600 dpi"); those exact figures are used so 203 dpi output is unchanged.
+
+Text fields with a "box" are fitted per label (font_metrics): if the text
+is too wide at the designed font, the largest smaller font/multiplier that
+fits is used instead.
+
+A preset measured with calibration.py has its field positions shifted and
+scaled by the saved offset/scale (CALIBRATION_FILE) at every resolution.
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from font_metrics import fit_candidates, fit_text
+
+try:
+    from config import PRINTERS, PRINTER_DPI
+except ImportError:
+    PRINTERS = {}
+    PRINTER_DPI = 203
+
+try:
+    from config import CALIBRATION_FILE
+except ImportError:
+    CALIBRATION_FILE = "preset_calibration.json"
+
+try:
+    from config import LABEL_GRAPHICS
+except ImportError:
+    LABEL_GRAPHICS = {}
+
+try:
+    from config import LABEL_PRESETS as CONFIG_PRESETS
+except ImportError:
+    CONFIG_PRESETS = {
+        "standard": {"name": "Standard RFID Tag (68x26mm)",
+                     "width_mm": 68, "height_mm": 26, "body_width_mm": 42},
+        "barbell": {"name": "Barbell Tag (7/16\" x 3.5\")",
+                    "width_mm": 11.125, "height_mm": 44.375, "front_mm": 22.125},
+    }
+
+# Dots per mm for each print head resolution
+DOTS_PER_MM = {203: 8.0, 300: 11.8, 600: 23.6}
+
+# Font and barcode multipliers are sized for this resolution
+BASE_DPI = 203
+
+# Field records per preset, in millimetres. Records are DPL format records
+# with the geometry left as slots: {row}, {column} and {height} are mm;
+# {wide}/{high}/{narrow} are multipliers or bar widths at BASE_DPI. The
+# field's data follows. "box" is the width (mm) a text field's {font} and
+# multiplier are fitted to.
+_FIELD_LAYOUTS = {
+    "standard": {
+        # Layout as printed flat, before folding:
+        #
+        #   ┌──────────────────┬──────────────────┬─────────────┐
+        #   │   Product Info   │     BARCODE      │    TAIL     │  26mm
+        #   │   (front)        │   (folds behind) │  (string)   │  height
+        #   │   21mm           │   21mm           │  26mm       │
+        #   └──────────────────┴──────────────────┴─────────────┘
+        #                        68mm total
+        "setup": ["PW{height_dots}", "L0{width_dots}"],
+        # The text positions were first written with a two-digit eee, which the
+        # printer reads as ten times the row/column - carat and item fell off the
+        # label. These are the positions that layout meant.
+        "fields": [
+            ("price", "1{font}{wide}{high}000{row:04d}{column:04d}221",
+             {"row": 1.875, "column": 3.75, "font": "1", "wide": 1, "high": 1, "box": 21}),
+            ("carat", "1{font}{wide}{high}000{row:04d}{column:04d}211",
+             {"row": 8.125, "column": 3.75, "font": "1", "wide": 1, "high": 1, "box": 21}),
+            ("item", "1{font}{wide}{high}000{row:04d}{column:04d}211",
+             {"row": 14.375, "column": 1.875, "font": "1", "wide": 1, "high": 1, "box": 21}),
+            # Code 128 - wide/narrow bar widths and bar height
+            ("barcode", "1e{wide}{narrow}{height:03d}{row:04d}{column:04d}020070",
+             {"row": 3.75, "column": 12.625, "height": 21.25, "wide": 1, "narrow": 0}),
+        ],
+    },
+    "barbell": {
+        # 7/16" wide, 1.75" printable (front half info, back half barcode)
+        "setup": ["PE", "SE", "H17"],
+        "fields": [
+            # Scalable font 9: the point size is already physical
+            ("price", "1911001{row:04d}01 20", {"row": 10.0}),
+            ("carat", "1911001{row:04d}01 20", {"row": 8.75}),
+            ("item", "1911001{row:04d}01 20", {"row": 7.5}),
+        ],
+    },
+}
+
+# Slots measured in mm; the rest are multipliers (font is copied as is)
+_LENGTH_SLOTS = ("row", "column", "height")
+
+# Header before a record's data: a b c d eee ffff gggg
+RECORD_HEADER = 15
+
+# Text field at a position in dots (label_editor.py)
+TEXT_RECORD = "1{font}{wide}{high}000{row:04d}{column:04d}"
+
+# Image field placing a printer-resident graphic by name (printer_graphics.py)
+IMAGE_RECORD = "1Y{wide}{high}000{row:04d}{column:04d}"
+
+
+def dots_per_mm(dpi: int) -> float:
+    return DOTS_PER_MM.get(dpi, dpi / 25.4)
+
+
+def to_dots(mm: float, dpi: int) -> int:
+    return int(mm * dots_per_mm(dpi) + 0.5)
+
+
+def _with_dots(preset: dict) -> dict:
+    """A LABEL_PRESETS entry plus its sizes in dots at BASE_DPI ("width_mm" -> "width_dots")."""
+    return dict(preset, **{key[:-3] + "_dots": to_dots(value, BASE_DPI)
+                           for key, value in preset.items() if key.endswith("_mm")})
+
+
+# Printable presets: a size in config.py and field records here
+PRESET_LAYOUTS = {name: dict(_FIELD_LAYOUTS[name], width_mm=preset["width_mm"],
+                             height_mm=preset["height_mm"])
+                  for name, preset in CONFIG_PRESETS.items() if name in _FIELD_LAYOUTS}
+LABEL_PRESETS = {name: _with_dots(CONFIG_PRESETS[name]) for name in PRESET_LAYOUTS}
+
+
+def load_calibration(path: str = CALIBRATION_FILE) -> dict:
+    """Measured offset/scale per preset (calibration.py), {} if none."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def calibrated_position(mm: float, center: float, offset: float, scale: float) -> float:
+    """Where to send a field so it lands at mm on a printer with that offset/scale."""
+    return center + (mm - center - offset) / scale
+
+
+def scale_multiplier(value: int, dpi: int) -> int:
+    """A multiplier / bar width sized for BASE_DPI, at another resolution."""
+    return 0 if value == 0 else max(1, int(value * dpi / BASE_DPI + 0.5))
+
+
+def _multiplier_char(value: int) -> str:
+    """DPL encodes multipliers as 1-9, then A-Z."""
+    return str(value) if value < 10 else chr(ord('A') + value - 10)
+
+
+class PresetGeometry:
+    """
+    One preset at one resolution: label size in dots and record prefixes.
+    Fitted fields also get a prefix for each smaller font they may use.
+    """
+
+    def __init__(self, preset: str, dpi: int, calibration: Optional[dict] = None):
+        layout = PRESET_LAYOUTS[preset]
+        self.preset = preset
+        self.dpi = dpi
+        self.calibration = calibration
+        # Field positions to correct: column runs along the width, row along the height
+        axes = {}
+        if calibration:
+            axes = {"column": (layout["width_mm"] / 2, calibration["offset_x_mm"]),
+                    "row": (layout["height_mm"] / 2, calibration["offset_y_mm"])}
+        self.width_dots = to_dots(layout["width_mm"], dpi)
+        self.height_dots = to_dots(layout["height_mm"], dpi)
+        self.setup = [line.format(width_dots=self.width_dots, height_dots=self.height_dots)
+                      for line in layout["setup"]]
+        self.fields = []
+        self.fitting = {}
+        for name, record, slots in layout["fields"]:
+            values = {}
+            for slot, value in slots.items():
+                if slot in axes:
+                    center, offset = axes[slot]
+                    value = calibrated_position(value, center, offset, calibration["scale"])
+                    values[slot] = to_dots(max(0.0, value), dpi)
+                elif slot in _LENGTH_SLOTS or slot == "box":
+                    values[slot] = to_dots(value, dpi)
+                elif slot == "font":
+                    values[slot] = value
+                else:
+                    values[slot] = _multiplier_char(scale_multiplier(value, dpi))
+            self.fields.append((name, record.format(**values)))
+            if "box" in slots:
+                candidates = fit_candidates(slots["font"], scale_multiplier(slots["wide"], dpi), dpi)
+                prefixes = {(font, m): record.format(**dict(values, font=font,
+                                                            wide=_multiplier_char(m),
+                                                            high=_multiplier_char(m)))
+                            for font, m in candidates}
+                self.fitting[name] = (values["box"], candidates, prefixes)
+        # Graphics (LABEL_GRAPHICS): name template and image record prefix
+        self.graphics = []
+        multiplier = _multiplier_char(scale_multiplier(1, dpi))
+        for name, row, column in LABEL_GRAPHICS.get(preset, []):
+            position = {"row": row, "column": column}
+            for slot in position:
+                if slot in axes:
+                    center, offset = axes[slot]
+                    position[slot] = calibrated_position(position[slot], center, offset,
+                                                         calibration["scale"])
+            self.graphics.append((name, IMAGE_RECORD.format(
+                wide=multiplier, high=multiplier,
+                row=to_dots(max(0.0, position["row"]), dpi),
+                column=to_dots(max(0.0, position["column"]), dpi))))
+
+    def record(self, name: str, prefix: str, data: str) -> str:
+        """A field's record line, in a smaller font if the data overflows its box."""
+        fit = self.fitting.get(name)
+        if fit:
+            box, candidates, prefixes = fit
+            prefix = prefixes[fit_text(prefix[RECORD_HEADER:] + data, box, candidates, self.dpi)]
+        return prefix + data
+
+    def __repr__(self):
+        return f"PresetGeometry({self.preset!r}, {self.dpi}, {self.width_dots}x{self.height_dots})"
+
+
+def fleet_dpis() -> list:
+    """Every resolution in the printer registry, plus the default."""
+    return sorted({PRINTER_DPI, BASE_DPI} | {spec.get("dpi", PRINTER_DPI)
+                                            for spec in PRINTERS.values()})
+
+
+# Built once at import for the whole fleet; other resolutions on first use
+CALIBRATION = load_calibration()
+GEOMETRY = {(preset, dpi): PresetGeometry(preset, dpi, CALIBRATION.get(preset))
+            for preset in PRESET_LAYOUTS for dpi in fleet_dpis()}
+
+
+def get_geometry(preset: str, dpi: Optional[int] = None) -> PresetGeometry:
+    """The precomputed table for a preset at a printer's resolution."""
+    key = (preset, dpi or PRINTER_DPI)
+    geometry = GEOMETRY.get(key)
+    if geometry is None:
+        geometry = GEOMETRY[key] = PresetGeometry(*key, CALIBRATION.get(preset))
+    return geometry
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Show per-DPI label geometry tables')
+    parser.add_argument('--dpi', type=int, action='append',
+                        help='Resolution to show (repeatable; default: the printer registry)')
+    args = parser.parse_args()
+
+    for dpi in args.dpi or fleet_dpis():
+        print("\n" + "="*50)
+        print(f"  {dpi} dpi ({dots_per_mm(dpi):g} dots/mm)")
+        print("="*50)
+        for preset in PRESET_LAYOUTS:
+            geometry = get_geometry(preset, dpi)
+            calibrated = " (calibrated)" if geometry.calibration else ""
+            print(f"{preset}: {geometry.width_dots} x {geometry.height_dots} dots{calibrated}")
+            for line in geometry.setup:
+                print(f"  {line}")
+            for name, prefix in geometry.fields:
+                fit = geometry.fitting.get(name)
+                box = f"  (fits {fit[0]} dots)" if fit else ""
+                print(f"  {name:8} {prefix}{box}")
+
+
+if __name__ == "__main__":
+    main()
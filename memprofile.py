@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Memory Profiling
+tracemalloc snapshots during batch runs, so a 100k-tag re-price can be
+checked for memory that grows with the number of labels before it is run
+for real.
+
+    python jewelry_tag_printer.py --batch reprice.csv --dry-run --memprofile
+    python jewelry_tag_printer.py --batch reprice.csv --memprofile mem.json --mem-budget 2
+
+While enabled, a sampler thread records traced memory every
+SNAPSHOT_INTERVAL seconds and keeps the snapshot taken at the highest
+traced total. The baseline is taken after a warm-up (the first
+MEMPROFILE_WARMUP_LABELS labels), once imports and the first render are
+done, so that fixed cost isn't charged to the batch; the profiler's own
+snapshots are left out too. The report shows peak traced memory, peak
+RSS, the top allocation sites (growth from the baseline snapshot to the
+peak one) and the per-label cost: (peak - traced at baseline) / labels
+after the warm-up. A pipeline that streams keeps that near zero; one
+that holds on to every label does not. Every run with at least
+MEMPROFILE_MIN_LABELS labels after the warm-up (--mem-min-labels; the
+few KB of labels in flight between stages would dominate a smaller one)
+is judged against the budget (MEMPROFILE_BUDGET_KB in config.py or
+--mem-budget, KB per label); over it the CLI exits 1.
+
+Only this process is traced - run with --render-processes 0 (the
+default) to include rendering. tracemalloc slows a batch down 2-3x, so
+don't combine --memprofile with --profile timings.
+
+The benchmark suite uses MemoryProfiler directly:
+
+    run_batch(rows[:1], dry_run=True, csv_path=None)      # warm up first
+    with MemoryProfiler(budget_kb=2, warmup_labels=0) as mem:
+        run_batch(rows, dry_run=True, csv_path=None)
+        mem.count_labels(len(rows))
+    report = mem.report()          # report["within_budget"]
+"""
+
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Optional
+
+import tag_log
+
+try:
+    from config import MEMPROFILE_BUDGET_KB
+except ImportError:
+    MEMPROFILE_BUDGET_KB = None
+
+try:
+    from config import MEMPROFILE_WARMUP_LABELS, MEMPROFILE_MIN_LABELS
+except ImportError:
+    MEMPROFILE_WARMUP_LABELS = 1
+    MEMPROFILE_MIN_LABELS = 20
+
+# Seconds between samples (each snapshot walks every traced block)
+SNAPSHOT_INTERVAL = 2.0
+TOP_SITES = 10
+# Frames kept per allocation (1 = the allocating line)
+TRACE_FRAMES = 1
+
+ENABLED = False
+_profiler = None
+
+# Our own and the import machinery's allocations aren't the batch's
+_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def peak_rss() -> Optional[int]:
+    """Peak resident set size of this process in bytes (None if unknown)."""
+    try:
+        import resource
+    except ImportError:
+        return _windows_peak_rss()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _windows_peak_rss() -> Optional[int]:
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class Counters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t),
+                        ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t),
+                        ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        counters = Counters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters),
+                                                         counters.cb):
+            return None
+        return counters.PeakWorkingSetSize
+    except (ImportError, AttributeError, OSError):
+        return None
+
+
+class MemoryProfiler:
+    """
+    Traces allocations between start() and stop() (or a with block).
+
+    Args:
+        budget_kb: Allowed peak growth per label in KB (None = no budget)
+        warmup_labels: Labels counted before the baseline is taken (0 = at start)
+        min_labels: Fewest labels after the warm-up for the budget to be judged
+        interval: Seconds between samples
+        top: Allocation sites in the report
+    """
+
+    def __init__(self, budget_kb: Optional[float] = MEMPROFILE_BUDGET_KB,
+                 warmup_labels: int = MEMPROFILE_WARMUP_LABELS,
+                 min_labels: int = MEMPROFILE_MIN_LABELS, interval: float = SNAPSHOT_INTERVAL, top: int = TOP_SITES):
+        self.budget_kb = budget_kb
+        self.warmup_labels = warmup_labels
+        self.min_labels = min_labels
+        self.interval = interval
+        self.top = top
+        self.labels = 0
+        self.baseline_labels = None
+        self.samples = []
+        self._first = None
+        self._peak_snapshot = None
+        self._peak_snapshot_size = -1
+        # Bytes held by our own snapshots, left out of every reading
+        self._first_bytes = 0
+        self._peak_snapshot_bytes = 0
+        self._start_traced = 0
+        self._peak_traced = 0
+        self._started_tracing = False
+        self._t0 = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self) -> "MemoryProfiler":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def start(self) -> "MemoryProfiler":
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+            self._started_tracing = True
+        self._t0 = time.perf_counter()
+        if self.warmup_labels <= 0:
+            self.baseline()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="memprofile", daemon=True)
+        self._thread.start()
+        return self
+
+    def baseline(self):
+        """Measure from here on: what is traced now is fixed cost, not the batch's."""
+        with self._lock:
+            self._peak_snapshot = None
+            self._peak_snapshot_bytes = 0
+            self._peak_snapshot_size = -1
+            self._start_traced = self._peak_traced = tracemalloc.get_traced_memory()[0]
+            self._first, self._first_bytes = self._take_snapshot()
+            self.baseline_labels = self.labels
+
+    def count_labels(self, count: int = 1):
+        with self._lock:
+            self.labels += count
+        if self.baseline_labels is None and self.labels >= self.warmup_labels:
+            self.baseline()
+
+    def _take_snapshot(self) -> tuple:
+        """(snapshot, bytes it holds); the peak is reset so taking it doesn't count."""
+        before = tracemalloc.get_traced_memory()[0]
+        snapshot = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+        held = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.reset_peak()
+        return snapshot, held
+
+    def sample(self):
+        """Record traced memory now; keep the snapshot if it's the largest so far."""
+        with self._lock:
+            own = self._first_bytes + self._peak_snapshot_bytes
+            current, peak = (value - own for value in tracemalloc.get_traced_memory())
+            self.samples.append({"t_s": round(time.perf_counter() - self._t0, 3),
+                                 "labels": self.labels, "traced_kb": current // 1024,
+                                 "peak_kb": peak // 1024})
+            if self.baseline_labels is None:
+                return
+            self._peak_traced = max(self._peak_traced, peak)
+            if current > self._peak_snapshot_size:
+                self._peak_snapshot = None
+                self._peak_snapshot_bytes = 0
+                self._peak_snapshot, self._peak_snapshot_bytes = self._take_snapshot()
+                self._peak_snapshot_size = current
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.sample()
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def top_sites(self) -> list:
+        if self._first is None or self._peak_snapshot is None:
+            return []
+        stats = self._peak_snapshot.compare_to(self._first, "lineno")
+        return [{"site": f"{s.traceback[0].filename}:{s.traceback[0].lineno}",
+                 "size_kb": round(s.size / 1024, 1),
+                 "growth_kb": round(s.size_diff / 1024, 1),
+                 "blocks": s.count}
+                for s in stats[:self.top]]
+
+    def report(self) -> dict:
+        measured = self.labels - (self.baseline_labels or 0)
+        growth = max(0, self._peak_traced - self._start_traced)
+        per_label = growth / measured if self.baseline_labels is not None and measured else None
+        judged = (self.budget_kb is not None and per_label is not None
+                  and measured >= self.min_labels)
+        within = not judged or per_label <= self.budget_kb * 1024
+        rss = peak_rss()
+        return {
+            "created": time.strftime('%Y-%m-%d %H:%M:%S'),
+            "labels": self.labels,
+            "warmup_labels": self.baseline_labels,
+            "min_labels": self.min_labels,
+            "start_traced_kb": self._start_traced // 1024,
+            "peak_traced_kb": self._peak_traced // 1024,
+            "peak_rss_kb": rss // 1024 if rss is not None else None,
+            "bytes_per_label": round(per_label, 1) if per_label is not None else None,
+            "budget_kb": self.budget_kb,
+            "judged": judged,
+            "within_budget": within,
+            "top_sites": self.top_sites(),
+            "samples": self.samples,
+        }
+
+
+def enable(budget_kb: Optional[float] = MEMPROFILE_BUDGET_KB,
+           min_labels: int = MEMPROFILE_MIN_LABELS):
+    """Start tracing for the rest of the run (the CLI's --memprofile)."""
+    global ENABLED, _profiler
+    _profiler = MemoryProfiler(budget_kb=budget_kb, min_labels=min_labels).start()
+    ENABLED = True
+
+
+def count_labels(count: int = 1):
+    """Called by the batch pipeline as labels are recorded."""
+    if ENABLED:
+        _profiler.count_labels(count)
+
+
+def finish(json_path: str = None) -> bool:
+    """Stop tracing, print the report (and save JSON); False if over budget."""
+    global ENABLED
+    if _profiler is None:
+        return True
+    ENABLED = False
+    _profiler.stop()
+    tag_log.flush()
+    report = _profiler.report()
+    print_report(report)
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Memory profile saved to {json_path}")
+    return report["within_budget"]
+
+
+def print_report(report: dict):
+    print("\n" + "="*50)
+    print("MEMORY PROFILE")
+    print("="*50)
+    print(f"Labels:        {report['labels']} ({report['warmup_labels'] or 0} warm-up)")
+    print(f"Peak traced:   {report['peak_traced_kb']:,} KB "
+          f"(baseline {report['start_traced_kb']:,} KB)")
+    if report["peak_rss_kb"] is not None:
+        print(f"Peak RSS:      {report['peak_rss_kb']:,} KB")
+    if report["bytes_per_label"] is not None:
+        print(f"Per label:     {report['bytes_per_label']:,.1f} bytes")
+    if report["top_sites"]:
+        print("-"*50)
+        print(f"{'growth KB':>10} {'size KB':>10} {'blocks':>8}  site")
+        for site in report["top_sites"]:
+            print(f"{site['growth_kb']:10,.1f} {site['size_kb']:10,.1f} "
+                  f"{site['blocks']:8}  {site['site']}")
+    print("-"*50)
+    if report["budget_kb"] is None:
+        print("ℹ No per-label budget set")
+    elif not report["judged"]:
+        print(f"ℹ Budget not checked - fewer than {report['min_labels']} labels "
+              f"after the warm-up")
+    elif report["within_budget"]:
+        print(f"✓ Within budget of {report['budget_kb']} KB per label")
+    else:
+        print(f"✗ Over budget: {report['bytes_per_label'] / 1024:.2f} KB per label "
+              f"(budget {report['budget_kb']} KB)")
+    print("="*50)
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Printer Metrics
+Counters, gauges and histograms for the shop dashboard, exposed in the
+Prometheus text format at /metrics.
+
+    GET http://127.0.0.1:8631/metrics     (print_service.py)
+    python print_daemon.py --metrics-port 9464
+
+Recording is one locked dict update per sample - no formatting or I/O
+happens until /metrics is scraped. Gauges such as queue depth are read
+from a callback at scrape time, so they cost nothing in between.
+
+Labels per minute is rate(tag_labels_printed_total[1m]) * 60 on the
+Prometheus side.
+"""
+
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Transport send latency buckets (seconds): USB spooler/lpr spawns are slow,
+# a warm socket write is sub-millisecond
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> dict:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> list:
+        lines = self.header()
+        for labels, value in sorted(self.samples().items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    """A set value, or a callback returning {label values: value} at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        super().__init__(name, help_text, labelnames)
+        self.source = None
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def set_source(self, source):
+        self.source = source
+
+    def samples(self) -> dict:
+        values = super().samples()
+        if self.source is not None:
+            values.update(self.source())
+        return values
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (),
+                 buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> list:
+        lines = self.header()
+        with self._lock:
+            values = {labels: (list(counts), total, count)
+                      for labels, (counts, total, count) in self._values.items()}
+        for labels, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                bucket_labels = _labels(self.labelnames, labels, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> bytes:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return ("\n".join(lines) + "\n").encode('utf-8')
+
+
+REGISTRY = Registry()
+
+LABELS_PRINTED = REGISTRY.register(Counter(
+    "tag_labels_printed_total", "Labels sent to a printer successfully.", ("preset", "printer")))
+LABEL_FAILURES = REGISTRY.register(Counter(
+    "tag_label_failures_total", "Labels that failed to render or send.", ("printer", "reason")))
+BYTES_SENT = REGISTRY.register(Counter(
+    "tag_bytes_sent_total", "Command bytes written to a printer.", ("printer",)))
+SENDS = REGISTRY.register(Counter(
+    "tag_transport_sends_total", "Transport writes by outcome.", ("printer", "result")))
+SEND_SECONDS = REGISTRY.register(Histogram(
+    "tag_transport_send_seconds", "Time to hand one command to the transport.", ("printer",)))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "tag_queue_depth", "Labels waiting for a printer.", ("priority",)))
+PRINTER_BUSY = REGISTRY.register(Gauge(
+    "tag_printer_busy", "1 while a printer is working on a job.", ("printer",)))
+
+
+def failure_reason(error: str) -> str:
+    """A short, low-cardinality reason for a failed label's error text."""
+    text = (error or "").lower()
+    if text.startswith("render"):
+        return "render"
+    for reason, words in (("timeout", ("timed out", "timeout")),
+                          ("refused", ("refused",)),
+                          ("unreachable", ("unreachable", "no route", "name or service")),
+                          ("usb", ("usb", "lpr", "win32print")),
+                          ("connection", ("reset", "broken pipe", "closed"))):
+        if any(word in text for word in words):
+            return reason
+    return "other"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0].rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        send_metrics(self)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def send_metrics(handler: BaseHTTPRequestHandler):
+    """Write the /metrics reply on an http.server handler."""
+    data = REGISTRY.render()
+    handler.send_response(200)
+    handler.send_header("Content-Type", CONTENT_TYPE)
+    handler.send_header("Content-Length", str(len(data)))
+    handler.end_headers()
+    handler.wfile.write(data)
+
+
+def serve_metrics(host: str, port: int) -> ThreadingHTTPServer:
+    """Serve /metrics on a background thread (for processes without HTTP)."""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"📈 Metrics on http://{host}:{port}/metrics")
+    return server
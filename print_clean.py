@@ -9,15 +9,13 @@ import os
 import time
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from jewelry_tag_printer import send_to_usb_printer
+from jewelry_tag_printer import send_to_usb_printer, create_cancel_command
 
 def clear_printer():
     """Send commands to clear any pending jobs"""
     print("Clearing printer buffer...")
-    # Cancel any pending job
-    clear = "\x18"  # CAN - cancel
-    clear += "\x02n\r\n"  # Clear image buffer
-    send_to_usb_printer(clear.encode('ascii'))
+    # Cancel any pending job and clear the image buffer
+    send_to_usb_printer(create_cancel_command())
     time.sleep(1)
     print("Buffer cleared.")
 
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Jewelry Tag Print Daemon
+Long-running process that owns the printer connections, a warm render
+cache and the history writer, and listens on a Unix domain socket.
+
+    python print_daemon.py            # start (Ctrl+C to stop)
+
+While it is running, plain CLI prints are forwarded to it automatically:
+
+    python jewelry_tag_printer.py -n MSD958009 -p 17600 -c 5.26 -k 14
+
+With --metrics-port (or DAEMON_METRICS_PORT in config.py) it also serves
+Prometheus metrics at http://127.0.0.1:<port>/metrics.
+
+Use --no-daemon on the CLI to bypass it. Dry runs, tests, batches and
+interactive mode always run locally.
+
+Protocol: one JSON object per line in each direction.
+    {"op": "ping"}
+    {"op": "print", "item_number": ..., "price": ..., "carat": ..., "karat": ...,
+     "preset": ..., "printer_name": ... | "ip": ..., "network": bool, "wait": bool}
+    {"op": "status"}
+    {"op": "jobs"}
+    {"op": "pause" | "resume" | "cancel", "id": job id}
+
+The CLI forwarder uses a tab-separated shorthand for "print" instead, so it
+doesn't have to import json:
+    PRINT<TAB>item_number=...<TAB>price=...        (same fields as above)
+    -> OK<TAB>printer<TAB>job id | FAIL<TAB>printer<TAB>errors
+       | ERROR<TAB>message | FALLBACK
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+from functools import lru_cache
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from jewelry_tag_printer import render_command, lookup_inventory, CSV_FILE, DEFAULT_PRESET
+from daemon_client import DAEMON_SOCKET
+from job_queue import JobQueue
+from transport import ConnectionPool, get_printers
+import profiling
+from metrics import serve_metrics
+
+try:
+    from config import DAEMON_METRICS_PORT
+except ImportError:
+    DAEMON_METRICS_PORT = None
+
+# Seconds a waiting client is held before it gets the job's current state
+# (keep below daemon_client.REPLY_TIMEOUT, or the client gives up first)
+WAIT_TIMEOUT = 60.0
+
+
+@lru_cache(maxsize=4096)
+def cached_render(item_number: str, price: float, carat_weight: float,
+                  gold_karat: int, preset: str = DEFAULT_PRESET,
+                  use_zpl: bool = False, use_epl: bool = False,
+                  dpi: Optional[int] = None) -> bytes:
+    """render_command with reprints of the same tag served from memory."""
+    return render_command(item_number, price, carat_weight, gold_karat,
+                          preset, use_zpl=use_zpl, use_epl=use_epl, dpi=dpi)
+
+
+def resolve_printer(printers: dict, request: dict):
+    """
+    Registry key for a CLI-style request (--printer / --network --ip).
+    Returns None for "any printer"; raises LookupError if it isn't registered.
+    """
+    if request.get("printer"):
+        if request["printer"] not in printers:
+            raise LookupError(request["printer"])
+        return request["printer"]
+    if request.get("network"):
+        ip = request.get("ip")
+        for key, spec in printers.items():
+            if spec["connection"] == "network" and (ip is None or spec["ip"] == ip):
+                return key
+        raise LookupError(ip)
+    name = request.get("printer_name")
+    if name:
+        for key, spec in printers.items():
+            if spec["connection"] == "usb" and name in (key, spec["printer_name"]):
+                return key
+        raise LookupError(name)
+    return None
+
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            if line.startswith(b"PRINT\t"):
+                self.wfile.write(self._text_print(line))
+            else:
+                try:
+                    request = json.loads(line)
+                    if isinstance(request, dict):
+                        reply = self.server.dispatch(request)
+                    else:
+                        reply = {"error": "request must be a JSON object"}
+                except (ValueError, TypeError) as e:
+                    reply = {"error": str(e)}
+                self.wfile.write(json.dumps(reply).encode('utf-8') + b"\n")
+            self.wfile.flush()
+
+    def _text_print(self, line: bytes) -> bytes:
+        """Tab-separated print request from daemon_client.forward_cli."""
+        request = {"op": "print", "wait": True}
+        for part in line.decode('utf-8').rstrip("\r\n").split("\t")[1:]:
+            key, _, value = part.partition("=")
+            request[key] = value
+        for key in ("network", "zpl", "epl"):
+            request[key] = request.get(key) == "True"
+        try:
+            for key in ("price", "carat"):
+                if key in request:
+                    request[key] = float(request[key])
+            if "karat" in request:
+                request["karat"] = int(request["karat"])
+            reply = self.server.dispatch(request)
+        except ValueError as e:
+            reply = {"error": str(e)}
+        if reply.get("fallback"):
+            fields = ["FALLBACK"]
+        elif "error" in reply:
+            fields = ["ERROR", reply["error"]]
+        elif reply["ok"]:
+            fields = ["OK", reply["job"]["printer"], reply["job"]["id"]]
+        else:
+            job = reply["job"]
+            fields = ["FAIL", job["printer"] or "-", "; ".join(job["errors"]) or job["state"]]
+        return ("\t".join(f.replace("\t", " ").replace("\n", " ") for f in fields) + "\n").encode('utf-8')
+
+
+class PrintDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server in front of a JobQueue."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str = DAEMON_SOCKET, job_queue: JobQueue = None):
+        if os.path.exists(socket_path):
+            # Stale socket from a crash - refuse if another daemon answers
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(socket_path)
+                raise RuntimeError(f"a print daemon is already running on {socket_path}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(socket_path)
+            finally:
+                probe.close()
+        super().__init__(socket_path, DaemonHandler)
+        os.chmod(socket_path, 0o660)
+        self.socket_path = socket_path
+        self.job_queue = job_queue or JobQueue(ConnectionPool(get_printers()),
+                                               renderer=cached_render)
+
+    def dispatch(self, request: dict) -> dict:
+        op = request.get("op")
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid()}
+        if op == "status":
+            return {"printers": self.job_queue.printer_status(),
+                    "queued_labels": self.job_queue.depth(),
+                    "priorities": self.job_queue.wait_stats(),
+                    "render_cache": cached_render.cache_info()._asdict()}
+        if op == "print":
+            return self._print(request)
+        if op == "jobs":
+            return {"jobs": [job.as_dict() for job in self.job_queue.jobs()[-100:]]}
+        if op in ("pause", "resume", "cancel"):
+            try:
+                job = getattr(self.job_queue, op)(str(request.get("id")))
+            except KeyError:
+                return {"error": f"no such job '{request.get('id')}'"}
+            except ValueError as e:
+                return {"error": str(e)}
+            return {"ok": True, "job": job.as_dict()}
+        return {"error": f"unknown op '{op}'"}
+
+    def _print(self, request: dict) -> dict:
+        try:
+            printer = resolve_printer(self.job_queue.pool.printers, request)
+        except LookupError:
+            # Not one of our printers - let the CLI handle it itself
+            return {"fallback": True}
+        label = {key: request.get(key) for key in ("item_number", "price", "carat", "karat")}
+        if None in label.values():
+            found = lookup_inventory(label["item_number"]) or {}
+            label["price"] = label["price"] if label["price"] is not None else found.get("price")
+            label["carat"] = label["carat"] if label["carat"] is not None else found.get("carat_weight")
+            label["karat"] = label["karat"] if label["karat"] is not None else found.get("gold_karat")
+            if None in label.values():
+                return {"error": "price, carat and karat are required (not found in inventory)"}
+        job = self.job_queue.submit([label], preset=request.get("preset") or DEFAULT_PRESET,
+                                    printer=printer, use_zpl=bool(request.get("zpl")),
+                                    use_epl=bool(request.get("epl")), source="cli",
+                                    priority="interactive")
+        if request.get("wait", True):
+            job.wait(WAIT_TIMEOUT)
+        return {"ok": job.state == "done", "job": job.as_dict()}
+
+    def serve(self):
+        self.job_queue.start()
+        for key in self.job_queue.pool.printers:
+            self.job_queue.pool.get(key).warm()
+        print(f"🖨️ Print daemon listening on {self.socket_path} - Ctrl+C to stop")
+        try:
+            self.serve_forever()
+        except KeyboardInterrupt:
+            print("\nStopping...")
+        finally:
+            self.server_close()
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+            self.job_queue.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Jewelry tag print daemon')
+    parser.add_argument('--socket', default=DAEMON_SOCKET,
+                        help=f'Unix socket path (default: {DAEMON_SOCKET})')
+    parser.add_argument('--csv', default=CSV_FILE,
+                        help=f'Print history file (default: {CSV_FILE})')
+    parser.add_argument('--metrics-port', type=int, default=DAEMON_METRICS_PORT,
+                        help='Serve Prometheus /metrics on this local port (default: off)')
+    parser.add_argument('--profile', type=str, nargs='?', const='', metavar='JSON',
+                        help='Time render/send per label; report on exit (optionally save JSON)')
+    args = parser.parse_args()
+
+    if args.profile is not None:
+        profiling.enable(report_at_exit=True, json_path=args.profile or None)
+
+    if not hasattr(socket, "AF_UNIX"):
+        print("✗ Unix domain sockets are not available on this platform")
+        sys.exit(1)
+
+    job_queue = JobQueue(ConnectionPool(get_printers()), csv_path=args.csv,
+                         renderer=cached_render)
+    if args.metrics_port:
+        try:
+            serve_metrics("127.0.0.1", args.metrics_port)
+        except OSError as e:
+            print(f"⚠ Metrics not served on port {args.metrics_port}: {e}")
+    try:
+        PrintDaemon(args.socket, job_queue).serve()
+    except RuntimeError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
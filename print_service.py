@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Jewelry Tag Print Service
+Small HTTP/JSON front end to the shared print queue, so POS terminals can
+print without Python, config.py or a printer of their own.
+
+    python print_service.py [--host 0.0.0.0] [--port 8631]
+
+Endpoints:
+    POST /jobs          Submit one label or a batch; returns 202 with a job id
+    GET  /jobs          Recent jobs
+    GET  /jobs/{id}     Job status and progress (labels sent / confirmed)
+    POST /jobs/{id}/pause | /resume | /cancel
+                        Job control; cancel also clears the printer's buffer
+    GET  /printers      Registered printers and what they are doing
+    GET  /queue         Queued labels and queue wait time per priority
+    GET  /metrics       Prometheus metrics (labels printed, failures, bytes,
+                        queue depth, transport latency - see metrics.py)
+
+A single label:
+    {"item_number": "MSD958009", "price": 17600, "carat": 5.26, "karat": 14}
+A batch:
+    {"preset": "barbell", "printer": "counter", "priority": "bulk",
+     "labels": [{"item_number": ...}, {"item_number": ...}]}
+
+"priority" is interactive, normal or bulk; by default a single label is
+interactive and a batch is normal.
+
+POST only validates and enqueues - the reply never waits for a printer.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from jewelry_tag_printer import DEFAULT_PRESET, CSV_FILE
+from job_queue import JobQueue
+from transport import get_printers, ConnectionPool
+import profiling
+from metrics import send_metrics
+
+try:
+    from config import SERVICE_HOST, SERVICE_PORT
+except ImportError:
+    SERVICE_HOST = "127.0.0.1"
+    SERVICE_PORT = 8631
+
+# Largest request body accepted (bytes)
+MAX_BODY = 4 * 1024 * 1024
+
+
+def job_request(body) -> tuple:
+    """Split a POST /jobs body into (labels, options)."""
+    if isinstance(body, list):
+        return body, {}
+    if not isinstance(body, dict):
+        raise ValueError("expected a JSON object or array")
+    if "labels" in body:
+        labels = body["labels"]
+        if not isinstance(labels, list):
+            raise ValueError("'labels' must be an array")
+    else:
+        labels = [body]
+    options = {
+        "preset": body.get("preset", DEFAULT_PRESET),
+        "printer": body.get("printer"),
+        "dry_run": bool(body.get("dry_run", False)),
+        "priority": body.get("priority"),
+    }
+    for key in ("preset", "printer", "priority"):
+        if options[key] is not None and not isinstance(options[key], str):
+            raise ValueError(f"'{key}' must be a string")
+    language = str(body.get("language", "dpl")).lower()
+    if language not in ("dpl", "zpl", "epl"):
+        raise ValueError(f"unknown language '{language}'")
+    options["use_zpl"] = language == "zpl"
+    options["use_epl"] = language == "epl"
+    return labels, options
+
+
+class PrintServiceHandler(BaseHTTPRequestHandler):
+    server_version = "JewelryTagPrintService/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def jobs(self) -> JobQueue:
+        return self.server.job_queue
+
+    def setup(self):
+        super().setup()
+        # Header and body go out as separate writes; don't let Nagle hold the body
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _reply(self, status: int, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status: int, message: str):
+        self._reply(status, {"error": message})
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path == "/metrics":
+            send_metrics(self)
+        elif path == "/printers":
+            self._reply(200, {"printers": self.jobs.printer_status(),
+                              "queued_labels": self.jobs.depth()})
+        elif path == "/queue":
+            self._reply(200, {"queued_labels": self.jobs.depth(),
+                              "priorities": self.jobs.wait_stats()})
+        elif path == "/jobs":
+            self._reply(200, {"jobs": [job.as_dict() for job in self.jobs.jobs()[-100:]]})
+        elif path.startswith("/jobs/"):
+            job = self.jobs.get(path[len("/jobs/"):])
+            if job is None:
+                self._error(404, "no such job")
+            else:
+                self._reply(200, job.as_dict())
+        else:
+            self._error(404, "not found")
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        action = path.rsplit("/", 1)[-1]
+        if path.startswith("/jobs/") and action in ("pause", "resume", "cancel"):
+            self._discard_body()
+            self._control(path[len("/jobs/"):-len(action) - 1], action)
+            return
+        if path != "/jobs":
+            self._discard_body()
+            self._error(404, "not found")
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = 0
+        if length <= 0 or length > MAX_BODY:
+            # The body (if any) is left unread, so it can't be taken for the next request
+            self.close_connection = True
+            self._error(400 if length <= 0 else 413, "missing or oversized body")
+            return
+        try:
+            body = json.loads(self.rfile.read(length))
+            labels, options = job_request(body)
+            if self.server.dry_run:
+                options["dry_run"] = True
+            job = self.jobs.submit(labels, source=self.client_address[0], **options)
+        except (ValueError, TypeError) as e:
+            self._error(400, str(e))
+            return
+        self._reply(202, {"id": job.id, "state": job.state, "labels": len(job.labels),
+                          "status_url": f"/jobs/{job.id}"})
+
+    def _discard_body(self):
+        """Read and drop a body we don't use; close the connection if we can't."""
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if 0 <= length <= MAX_BODY:
+            self.rfile.read(length)
+        else:
+            self.close_connection = True
+
+    def _control(self, job_id: str, action: str):
+        try:
+            job = getattr(self.jobs, action)(job_id)
+        except KeyError:
+            self._error(404, "no such job")
+            return
+        except ValueError as e:
+            self._error(409, str(e))
+            return
+        self._reply(200, job.as_dict())
+
+
+class PrintService(ThreadingHTTPServer):
+    """HTTP server that owns the shared job queue."""
+
+    daemon_threads = True
+
+    def __init__(self, host: str = SERVICE_HOST, port: int = SERVICE_PORT,
+                 job_queue: JobQueue = None, dry_run: bool = False,
+                 verbose: bool = False):
+        super().__init__((host, port), PrintServiceHandler)
+        self.job_queue = job_queue or JobQueue(ConnectionPool(get_printers()))
+        self.dry_run = dry_run
+        self.verbose = verbose
+
+    def serve(self):
+        self.job_queue.start()
+        host, port = self.server_address[:2]
+        print(f"🖨️ Print service on http://{host}:{port} "
+              f"({len(self.job_queue.pool.printers)} printer(s)) - Ctrl+C to stop")
+        try:
+            self.serve_forever()
+        except KeyboardInterrupt:
+            print("\nStopping...")
+        finally:
+            self.server_close()
+            self.job_queue.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Jewelry tag HTTP print service')
+    parser.add_argument('--host', default=SERVICE_HOST,
+                        help=f'Address to listen on (default: {SERVICE_HOST})')
+    parser.add_argument('--port', type=int, default=SERVICE_PORT,
+                        help=f'Port to listen on (default: {SERVICE_PORT})')
+    parser.add_argument('--csv', default=CSV_FILE,
+                        help=f'Print history file (default: {CSV_FILE})')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Accept jobs but never send to a printer')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='Log every request')
+    parser.add_argument('--profile', type=str, nargs='?', const='', metavar='JSON',
+                        help='Time render/send per label; report on exit (optionally save JSON)')
+    args = parser.parse_args()
+
+    if args.profile is not None:
+        profiling.enable(report_at_exit=True, json_path=args.profile or None)
+
+    job_queue = JobQueue(ConnectionPool(get_printers()), csv_path=args.csv)
+    PrintService(args.host, args.port, job_queue, args.dry_run, args.verbose).serve()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""
+Printer Graphics
+Logos and karat stamps stored in printer memory once and referenced by
+name on each label, instead of sending the bitmap with every tag.
+
+Images are PNGs (any format Pillow reads, or a binary PGM without Pillow)
+in GRAPHICS_DIR, named after the graphic: graphics/LOGO.png, graphics/K14.png.
+They are converted to 1-bit (dark pixels print) and downloaded as
+
+    DPL   <STX>I{module}B{name}   followed by a monochrome BMP
+    ZPL   ~DG{device}:{name}.GRF,{bytes},{bytes per row},{hex}
+
+and placed on a label by name - a DPL image record (1Y11000{row}{column}{name})
+or ZPL ^XG{device}:{name}.GRF. LABEL_GRAPHICS in config.py says which
+graphics go where on each preset; "{karat}" in a name is the tag's karat.
+
+Every send checks the command for image references. A client-side
+registry (GRAPHICS_REGISTRY, JSON) records what each printer already
+holds - name and a digest of the bits - and any referenced image the
+printer doesn't hold, or holds an older version of, is downloaded ahead
+of the label in the same write. After the first label only the name
+goes over the wire.
+
+    python printer_graphics.py --list                # images and what's resident where
+    python printer_graphics.py --show LOGO           # 1-bit preview in the terminal
+    python printer_graphics.py --upload --printer backroom
+    python printer_graphics.py --upload LOGO --ip 192.168.1.100 --force
+    python printer_graphics.py --forget tcp:192.168.1.100:9100
+
+Graphics in volatile printer memory are lost on a power cycle, which the
+registry can't see - --forget the printer (or --upload --force) after one.
+Names are 1-8 letters/digits so the same name works in DPL and ZPL.
+"""
+
+import argparse
+import json
+import os
+import re
+import struct
+import sys
+import threading
+import time
+import zlib
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from label_geometry import to_dots
+from tag_log import get_logger, fields
+
+try:
+    from config import GRAPHICS_DIR, GRAPHICS_REGISTRY, LABEL_GRAPHICS
+except ImportError:
+    GRAPHICS_DIR = "graphics"
+    GRAPHICS_REGISTRY = "printer_graphics.json"
+    LABEL_GRAPHICS = {}
+
+try:
+    from config import GRAPHICS_DPL_MODULE, GRAPHICS_ZPL_DEVICE
+except ImportError:
+    GRAPHICS_DPL_MODULE = "D"
+    GRAPHICS_ZPL_DEVICE = "R"
+
+log = get_logger("graphics")
+
+# Gray levels below this print as a dot
+THRESHOLD = 128
+IMAGE_EXTENSIONS = (".png", ".pgm", ".bmp", ".gif")
+NAME_PATTERN = re.compile(r"[A-Za-z0-9]{1,8}")
+# Seconds between checks for changed image files and registry updates
+RECHECK_SECONDS = 2.0
+
+# Image references in outgoing commands: a DPL image record (font "Y") and ZPL ^XG
+_DPL_REFERENCE = re.compile(rb"^[1-4]Y[0-9A-Za-z]{2}\d{3}[\d ]{8}([A-Za-z0-9]{1,16})\r?$",
+                            re.MULTILINE)
+_ZPL_REFERENCE = re.compile(rb"\^XG[A-Z]:([A-Za-z0-9]{1,8})\.GRF")
+
+
+class GraphicImage:
+    """A 1-bit image: one int per row, bit x set = dot at column x (as dpl_raster.Bitmap)."""
+
+    def __init__(self, name: str, width: int, height: int, rows: list):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.rows = rows
+        self.bytes_per_row = (width + 7) // 8
+        self.packed = self._pack()
+        self.digest = f"{zlib.crc32(struct.pack('<HH', width, height) + self.packed):08x}"
+
+    def _pack(self) -> bytes:
+        """Rows left to right, most significant bit first, padded to whole bytes."""
+        pad = self.bytes_per_row * 8 - self.width
+        return b"".join(
+            (int(format(row, f"0{self.width}b")[::-1], 2) << pad).to_bytes(self.bytes_per_row, "big")
+            for row in self.rows)
+
+    def to_text(self) -> str:
+        return "\n".join("".join("#" if row >> x & 1 else "." for x in range(self.width))
+                         for row in self.rows)
+
+    def __repr__(self):
+        return f"GraphicImage({self.name!r}, {self.width}x{self.height}, {self.digest})"
+
+
+def _gray_rows(gray: bytes, width: int, height: int) -> list:
+    table = bytes(ord("1") if level < THRESHOLD else ord("0") for level in range(256))
+    rows = []
+    for y in range(height):
+        bits = gray[y * width:(y + 1) * width].translate(table)
+        rows.append(int(bits[::-1], 2) if width else 0)
+    return rows
+
+
+def _read_pgm(path: str) -> tuple:
+    with open(path, 'rb') as f:
+        data = f.read()
+    fields, pos = [], 2
+    if data[:2] == b"P5":
+        # Three header fields (comments allowed), then exactly one whitespace byte
+        while len(fields) < 3:
+            while data[pos:pos + 1].isspace():
+                pos += 1
+            if data[pos:pos + 1] == b"#":
+                pos = data.index(b"\n", pos)
+                continue
+            end = pos
+            while data[end:end + 1] and not data[end:end + 1].isspace():
+                end += 1
+            fields.append(int(data[pos:end]))
+            pos = end
+    if len(fields) != 3 or fields[2] != 255:
+        raise ValueError(f"{path}: only 8-bit binary PGM can be read without Pillow "
+                         "(pip install Pillow)")
+    width, height, _ = fields
+    return data[pos + 1:pos + 1 + width * height], width, height
+
+
+def read_image(path: str, name: str) -> GraphicImage:
+    """Convert an image file to 1-bit (transparent pixels are paper)."""
+    if path.lower().endswith(".pgm"):
+        gray, width, height = _read_pgm(path)
+    else:
+        # Imported here, not at the top - every print loads this module
+        try:
+            from PIL import Image
+        except ImportError:
+            raise ValueError(f"{path}: converting images needs Pillow (pip install Pillow)")
+        with Image.open(path) as img:
+            if img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info:
+                rgba = img.convert("RGBA")
+                img = Image.new("RGBA", rgba.size, "white")
+                img.alpha_composite(rgba)
+            gray_image = img.convert("L")
+            width, height = gray_image.size
+            gray = gray_image.tobytes()
+    return GraphicImage(name, width, height, _gray_rows(gray, width, height))
+
+
+def find_image(name: str, directory: str = GRAPHICS_DIR) -> Optional[str]:
+    """The image file for a graphic name (case-insensitive), or None."""
+    try:
+        entries = os.listdir(directory)
+    except OSError:
+        return None
+    for extension in IMAGE_EXTENSIONS:
+        for entry in entries:
+            stem, ext = os.path.splitext(entry)
+            if ext.lower() == extension and stem.upper() == name.upper():
+                return os.path.join(directory, entry)
+    return None
+
+
+_images = {}
+_images_lock = threading.Lock()
+_warned = set()
+
+
+def load_image(name: str) -> Optional[GraphicImage]:
+    """
+    A graphic by name from GRAPHICS_DIR, reconverted when its file changes.
+    The directory is looked at again at most every RECHECK_SECONDS.
+    """
+    now = time.monotonic()
+    with _images_lock:
+        cached = _images.get(name)
+        if cached and now - cached[1] < RECHECK_SECONDS:
+            return cached[2]
+    if not NAME_PATTERN.fullmatch(name):
+        raise ValueError(f"graphic names are 1-8 letters/digits: '{name}'")
+    path = find_image(name)
+    try:
+        source = (path, os.path.getmtime(path)) if path else None
+    except OSError:
+        source = None
+    if cached and cached[0] == source:
+        image = cached[2]
+    else:
+        image = read_image(path, name) if source else None
+    with _images_lock:
+        _images[name] = (source, now, image)
+    return image
+
+
+def list_images(directory: str = GRAPHICS_DIR) -> list:
+    try:
+        entries = sorted(os.listdir(directory))
+    except OSError:
+        return []
+    names = []
+    for entry in entries:
+        stem, ext = os.path.splitext(entry)
+        if ext.lower() in IMAGE_EXTENSIONS and NAME_PATTERN.fullmatch(stem):
+            if stem.upper() not in (n.upper() for n in names):
+                names.append(stem)
+    return names
+
+
+# -- download commands --------------------------------------------------------
+
+def bmp_bytes(image: GraphicImage) -> bytes:
+    """Monochrome BMP: palette 0 = white, 1 = black; rows bottom-up, 4-byte aligned."""
+    stride = (image.bytes_per_row + 3) & ~3
+    pad = b"\x00" * (stride - image.bytes_per_row)
+    pixels = b"".join(image.packed[y * image.bytes_per_row:(y + 1) * image.bytes_per_row] + pad
+                      for y in reversed(range(image.height)))
+    offset = 14 + 40 + 8
+    header = struct.pack("<2sIHHI", b"BM", offset + len(pixels), 0, 0, offset)
+    info = struct.pack("<IiiHHIIiiII", 40, image.width, image.height, 1, 1, 0,
+                       len(pixels), 7874, 7874, 2, 2)
+    return header + info + b"\xff\xff\xff\x00\x00\x00\x00\x00" + pixels
+
+
+def dpl_download(image: GraphicImage, module: str = GRAPHICS_DPL_MODULE) -> bytes:
+    return f"\x02I{module}B{image.name}\r".encode("ascii") + bmp_bytes(image)
+
+
+def zpl_download(image: GraphicImage, device: str = GRAPHICS_ZPL_DEVICE) -> bytes:
+    return (f"~DG{device}:{image.name}.GRF,{len(image.packed)},{image.bytes_per_row},"
+            f"{image.packed.hex().upper()}\r\n").encode("ascii")
+
+
+def download_command(image: GraphicImage, language: str) -> bytes:
+    return zpl_download(image) if language == "zpl" else dpl_download(image)
+
+
+# -- label references ----------------------------------------------------------
+
+def label_graphics(preset: str) -> list:
+    """(name template, row mm, column mm) for a preset, from LABEL_GRAPHICS."""
+    return LABEL_GRAPHICS.get(preset, [])
+
+
+def zpl_references(gold_karat: int, preset: str = "standard") -> str:
+    """^XG lines placing the preset's graphics on a (203 dpi) ZPL label."""
+    placed = label_graphics(preset)
+    if not placed:
+        return ""
+    return "".join(f"^FO{to_dots(column, 203)},{to_dots(row, 203)}"
+                   f"^XG{GRAPHICS_ZPL_DEVICE}:{name.format(karat=gold_karat)}.GRF,1,1^FS\n"
+                   for name, row, column in placed)
+
+
+def referenced_images(command: bytes) -> list:
+    """(name, language) for every graphic a command places on a label."""
+    # Most labels have neither - skip the regexes (this runs on every send)
+    if b"Y" not in command and b"^XG" not in command:
+        return []
+    found = [(m.group(1).decode("ascii"), "dpl") for m in _DPL_REFERENCE.finditer(command)]
+    found += [(m.group(1).decode("ascii"), "zpl") for m in _ZPL_REFERENCE.finditer(command)]
+    return list(dict.fromkeys(found))
+
+
+# -- resident registry ----------------------------------------------------------
+
+class ResidentRegistry:
+    """
+    What each printer holds, as JSON:
+    {target: {name: {"digest", "language", "bytes", "uploaded"}}}
+    Targets are the wire journal's: "tcp:host:port" or "usb:printer name".
+    """
+
+    def __init__(self, path: str = GRAPHICS_REGISTRY):
+        self.path = path
+        self._lock = threading.Lock()
+        self._printers = {}
+        self._mtime = None
+        self._checked = None
+
+    def _reload(self, force: bool = False):
+        """Pick up changes made by another process (CLI vs daemon)."""
+        now = time.monotonic()
+        if not force and self._checked is not None and now - self._checked < RECHECK_SECONDS:
+            return
+        self._checked = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime != self._mtime:
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    self._printers = json.load(f)
+            except (OSError, ValueError):
+                self._printers = {}
+            self._mtime = mtime
+
+    def _save(self):
+        temp = self.path + ".tmp"
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(self._printers, f, indent=2)
+        os.replace(temp, self.path)
+        self._mtime = os.path.getmtime(self.path)
+
+    def printers(self) -> dict:
+        with self._lock:
+            self._reload()
+            return json.loads(json.dumps(self._printers))
+
+    def missing(self, target: str, images: list) -> list:
+        """The (image, language) pairs the printer doesn't hold in this version."""
+        with self._lock:
+            self._reload()
+            held = self._printers.get(target, {})
+            return [(image, language) for image, language in images
+                    if held.get(image.name, {}).get("digest") != image.digest
+                    or held[image.name].get("language") != language]
+
+    def mark(self, target: str, images: list):
+        with self._lock:
+            self._reload(force=True)
+            held = self._printers.setdefault(target, {})
+            for image, language in images:
+                held[image.name] = {"digest": image.digest, "language": language,
+                                    "bytes": len(download_command(image, language)),
+                                    "uploaded": time.strftime('%Y-%m-%d %H:%M:%S')}
+            self._save()
+
+    def forget(self, target: Optional[str] = None) -> int:
+        """Drop one printer's entries (or all); returns how many were dropped."""
+        with self._lock:
+            self._reload(force=True)
+            if target is None:
+                count = sum(len(held) for held in self._printers.values())
+                self._printers = {}
+            else:
+                count = len(self._printers.pop(target, {}))
+            self._save()
+            return count
+
+
+REGISTRY = ResidentRegistry()
+
+
+def with_uploads(command: bytes, target: str) -> tuple:
+    """
+    The command with downloads prepended for referenced graphics the target
+    doesn't hold, and the (image, language) pairs to mark_uploaded() once
+    the write succeeds.
+    """
+    references = referenced_images(command)
+    if not references:
+        return command, []
+    images = []
+    for name, language in references:
+        try:
+            image = load_image(name)
+        except (OSError, ValueError) as e:
+            image = None
+            error = str(e)
+        else:
+            error = "no image file" if image is None else None
+        if image is None:
+            if name not in _warned:
+                _warned.add(name)
+                log.warning("Graphic not available - label prints without it",
+                            extra=fields(name=name, directory=GRAPHICS_DIR, error=error))
+            continue
+        images.append((image, language))
+    pending = REGISTRY.missing(target, images)
+    if not pending:
+        return command, []
+    downloads = b"".join(download_command(image, language) for image, language in pending)
+    log.info("Uploading graphics", extra=fields(
+        target=target, names=",".join(image.name for image, _ in pending), bytes=len(downloads)))
+    return downloads + command, pending
+
+
+def mark_uploaded(target: str, pending: list):
+    if pending:
+        REGISTRY.mark(target, pending)
+
+
+# -- CLI ------------------------------------------------------------------------
+
+def pool_target(spec: dict) -> str:
+    """Registry target for a transport printer spec (matches the send paths)."""
+    if spec["connection"] == "network":
+        return f"tcp:{spec['ip']}:{spec['port']}"
+    return f"usb:{spec['printer_name']}"
+
+
+def upload(names: list, language: str, printer: Optional[str] = None,
+           address: Optional[str] = None, force: bool = False) -> bool:
+    """Download graphics to a printer now (all of GRAPHICS_DIR if names is empty)."""
+    from transport import ConnectionPool, get_printers, DEFAULT_PRINTER, PRINTER_PORT, DPI
+    if address:
+        host, _, port = address.partition(":")
+        printer = "upload"
+        pool = ConnectionPool({printer: {"name": address, "connection": "network",
+                                         "printer_name": None, "ip": host,
+                                         "port": int(port or PRINTER_PORT), "dpi": DPI}})
+    else:
+        pool = ConnectionPool(get_printers())
+        printer = printer or DEFAULT_PRINTER
+        if printer not in pool.printers:
+            print(f"✗ Unknown printer '{printer}' (have: {', '.join(pool.printers)})")
+            return False
+    target = pool_target(pool.printers[printer])
+    images = []
+    for name in names or list_images():
+        image = load_image(name)
+        if image is None:
+            print(f"✗ No image for '{name}' in {GRAPHICS_DIR}")
+            return False
+        images.append((image, language))
+    pending = images if force else REGISTRY.missing(target, images)
+    if not pending:
+        print(f"✓ {target} already holds {len(images)} graphic(s)")
+        return True
+    data = b"".join(download_command(image, lang) for image, lang in pending)
+    try:
+        ok = pool.send(data, printer)
+    finally:
+        pool.close()
+    if not ok:
+        print(f"✗ Upload to {target} failed")
+        return False
+    REGISTRY.mark(target, pending)
+    print(f"✓ Uploaded {', '.join(image.name for image, _ in pending)} to {target} "
+          f"({len(data):,} bytes)")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage printer-resident graphics')
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument('--list', action='store_true',
+                        help='List images and what each printer holds (default)')
+    action.add_argument('--show', metavar='NAME', help='Print a graphic as 1-bit text')
+    action.add_argument('--upload', nargs='*', metavar='NAME',
+                        help='Download graphics to a printer (default: all images)')
+    action.add_argument('--forget', nargs='?', const='', metavar='TARGET',
+                        help='Clear the registry for a printer (or every printer)')
+    parser.add_argument('--printer', help='Registry printer for --upload (default: default)')
+    parser.add_argument('--ip', metavar='HOST[:PORT]',
+                        help='Upload to this network address instead of a registry printer')
+    parser.add_argument('--zpl', action='store_true', help='Upload in ZPL (~DG) format')
+    parser.add_argument('--force', action='store_true',
+                        help='Upload even if the registry says the printer has it')
+    args = parser.parse_args()
+
+    if args.show:
+        image = load_image(args.show)
+        if image is None:
+            print(f"✗ No image for '{args.show}' in {GRAPHICS_DIR}")
+            sys.exit(1)
+        print(image.to_text())
+        print(f"{image!r}: DPL {len(dpl_download(image)):,} bytes, "
+              f"ZPL {len(zpl_download(image)):,} bytes")
+        return
+
+    if args.upload is not None:
+        ok = upload(args.upload, "zpl" if args.zpl else "dpl", args.printer, args.ip, args.force)
+        sys.exit(0 if ok else 1)
+
+    if args.forget is not None:
+        count = REGISTRY.forget(args.forget or None)
+        print(f"✓ Forgot {count} resident graphic(s)"
+              f"{' on ' + args.forget if args.forget else ''}")
+        return
+
+    print("="*50)
+    print(f"GRAPHICS ({GRAPHICS_DIR})")
+    print("="*50)
+    names = list_images()
+    if not names:
+        print("ℹ No images")
+    for name in names:
+        try:
+            image = load_image(name)
+            print(f"  {name:8} {image.width:4}x{image.height:<4} {image.digest}")
+        except (OSError, ValueError) as e:
+            print(f"✗ {name:8} {e}")
+    for preset, placed in LABEL_GRAPHICS.items():
+        print(f"ℹ {preset}: " + ", ".join(f"{name} at {row}/{column}mm"
+                                          for name, row, column in placed))
+    printers = REGISTRY.printers()
+    print("-"*50)
+    if not printers:
+        print("ℹ Nothing uploaded yet")
+    for target, held in printers.items():
+        print(f"🖨️ {target}")
+        for name, entry in held.items():
+            print(f"  {name:8} {entry['language']:3} {entry['bytes']:>8,} bytes  "
+                  f"{entry['uploaded']}  {entry['digest']}")
+
+
+if __name__ == "__main__":
+    main()
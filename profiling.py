@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Stage Profiling
+Per-stage timings for the print hot path - render, send, history CSV,
+barcode preview, and the batch / job queue stages - so a slow tag can be
+pinned on one of them.
+
+    python jewelry_tag_printer.py -n MSD958009 -p 17600 -c 5.26 -k 14 --profile
+    python jewelry_tag_printer.py --batch intake.csv --profile timings.json
+
+Durations go into log-linear histograms (HDR-style: 32 sub-buckets per
+power of two, so any percentile is within ~3% of the true value) keyed by
+stage name, and are reported as count / p50 / p95 / p99 / max.
+
+Profiling is off unless enable() is called. Disabled, stage() returns a
+shared no-op context manager and record() returns at its first line.
+"""
+
+import atexit
+import json
+import threading
+import time
+from contextlib import nullcontext
+
+import tag_log
+
+# Sub-buckets per power of two (relative error <= 1/SUB_BUCKETS)
+SUB_BUCKETS = 32
+_SUB_BITS = SUB_BUCKETS.bit_length() - 1
+
+ENABLED = False
+_histograms = {}
+_lock = threading.Lock()
+_NULL = nullcontext()
+
+
+class Histogram:
+    """Log-linear histogram of durations in microseconds."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+        self.buckets = {}
+
+    @staticmethod
+    def bucket_of(value: int) -> int:
+        if value < SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - _SUB_BITS - 1
+        return (shift + 1) * SUB_BUCKETS + (value >> shift) - SUB_BUCKETS
+
+    @staticmethod
+    def bucket_value(bucket: int) -> int:
+        """Upper bound of a bucket (the value reported for it)."""
+        if bucket < SUB_BUCKETS:
+            return bucket
+        shift = bucket // SUB_BUCKETS - 1
+        return ((bucket % SUB_BUCKETS + SUB_BUCKETS + 1) << shift) - 1
+
+    def record(self, micros: int):
+        bucket = self.bucket_of(micros)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += micros
+        self.max = max(self.max, micros)
+        self.min = micros if self.min is None else min(self.min, micros)
+
+    def percentile(self, p: float) -> int:
+        if not self.count:
+            return 0
+        rank = max(1, int(p / 100 * self.count + 0.999999))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self.bucket_value(bucket), self.max)
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            "stage": self.name,
+            "count": self.count,
+            "total_ms": round(self.total / 1000, 3),
+            "min_us": self.min or 0,
+            "p50_us": self.percentile(50),
+            "p95_us": self.percentile(95),
+            "p99_us": self.percentile(99),
+            "max_us": self.max,
+        }
+
+
+class _Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        _record_micros(self.name, (time.perf_counter_ns() - self.start) // 1000)
+        return False
+
+
+def enable(report_at_exit: bool = False, json_path: str = None):
+    """Start timing; optionally print the report (and save JSON) when the process exits."""
+    global ENABLED
+    ENABLED = True
+    if report_at_exit:
+        atexit.register(finish, json_path)
+
+
+def finish(json_path: str = None):
+    tag_log.flush()
+    print_report()
+    if json_path:
+        export_json(json_path)
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+def stage(name: str):
+    """Context manager timing one pass through a stage (no-op when disabled)."""
+    return _Stage(name) if ENABLED else _NULL
+
+
+def record(name: str, seconds: float):
+    """Add a duration measured elsewhere (e.g. a pipeline's own timers)."""
+    if ENABLED:
+        _record_micros(name, int(seconds * 1_000_000))
+
+
+def _record_micros(name: str, micros: int):
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram(name)
+        histogram.record(micros)
+
+
+def snapshot() -> list:
+    """Every stage's summary, in the order stages were first seen."""
+    with _lock:
+        return [h.as_dict() for h in _histograms.values()]
+
+
+def _ms(micros: int) -> str:
+    return f"{micros / 1000:9.3f}"
+
+
+def print_report():
+    stages = snapshot()
+    print("\n" + "="*50)
+    print("PROFILE (ms)")
+    print("="*50)
+    if not stages:
+        print("ℹ No stages timed")
+        return
+    print(f"{'stage':18} {'count':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9} {'total':>10}")
+    for s in stages:
+        print(f"{s['stage']:18} {s['count']:6} {_ms(s['p50_us'])} {_ms(s['p95_us'])} "
+              f"{_ms(s['p99_us'])} {_ms(s['max_us'])} {s['total_ms']:10.2f}")
+
+
+def export_json(path: str):
+    report = {
+        "created": time.strftime('%Y-%m-%d %H:%M:%S'),
+        "sub_buckets": SUB_BUCKETS,
+        "stages": snapshot(),
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"✓ Profile saved to {path}")
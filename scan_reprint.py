@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Scanner Reprint Mode
+Reprints tags from a keyboard-wedge barcode scanner with no prompts.
+
+    python jewelry_tag_printer.py --scan [--network --ip 10.0.0.5]
+
+Each scanned code (the barcode on an old tag, or a typed item number) is
+looked up in the print history, then the inventory index, and the tag is
+sent straight away. Everything that can be done ahead of time is: the
+history is indexed at startup, the label language and preset are rendered
+once to warm them up, commands are cached per item, and network printers
+keep one open connection from the pool. Scan-to-send time is shown for
+every tag and summarized on exit.
+"""
+
+import csv
+import os
+import sys
+import time
+from functools import lru_cache
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from jewelry_tag_printer import (
+    render_command, generate_item_barcode, lookup_inventory, HistoryWriter,
+    CSV_FILE, PRINTER_IP, PRINTER_PORT, USB_PRINTER_NAME, DEFAULT_PRESET
+)
+from transport import PrinterConnection, describe_target
+
+# Scan-to-send target (ms); slower scans are counted in the summary
+LATENCY_TARGET_MS = 50
+
+
+def load_history(csv_path: str = CSV_FILE) -> dict:
+    """
+    Last successful print of each tag, keyed by barcode data:
+    {barcode: (item_number, price, carat_weight, gold_karat)}.
+    """
+    history = {}
+    if not os.path.exists(csv_path):
+        return history
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            if row.get('Print Status') != 'SUCCESS':
+                continue
+            try:
+                item = row['Item Number']
+                history[row.get('Barcode Data') or generate_item_barcode(item)] = (
+                    item, float(row['Price']), float(row['Carat Weight']), int(row['Gold Karat']))
+            except (KeyError, TypeError, ValueError):
+                continue
+    return history
+
+
+@lru_cache(maxsize=1024)
+def cached_render(item_number: str, price: float, carat_weight: float, gold_karat: int,
+                  preset: str, use_zpl: bool, use_epl: bool) -> bytes:
+    """Command bytes for a tag; repeat scans of an item reuse them."""
+    return render_command(item_number, price, carat_weight, gold_karat, preset,
+                          use_zpl=use_zpl, use_epl=use_epl)
+
+
+class ScanReprinter:
+    """Looks up, renders and sends one scanned tag at a time."""
+
+    def __init__(self, preset: str = DEFAULT_PRESET, use_usb: bool = True,
+                 printer_name: Optional[str] = None, printer_ip: Optional[str] = None,
+                 use_zpl: bool = False, use_epl: bool = False, dry_run: bool = False,
+                 csv_path: Optional[str] = CSV_FILE):
+        self.preset = preset
+        self.use_zpl = use_zpl
+        self.use_epl = use_epl
+        self.dry_run = dry_run
+        self.history = load_history(csv_path) if csv_path else {}
+        self.writer = HistoryWriter(csv_path) if csv_path and not dry_run else None
+        spec = {"name": printer_name or USB_PRINTER_NAME,
+                "connection": "usb" if use_usb else "network",
+                "printer_name": printer_name or USB_PRINTER_NAME,
+                "ip": printer_ip or PRINTER_IP, "port": PRINTER_PORT}
+        self.connection = PrinterConnection("scan", spec)
+        self.latencies = []
+
+    def render(self, item_number: str, price: float, carat_weight: float,
+               gold_karat: int) -> bytes:
+        return cached_render(item_number, price, carat_weight, gold_karat, self.preset,
+                             self.use_zpl, self.use_epl)
+
+    def warm(self) -> bool:
+        """Render a throwaway tag and open the printer connection."""
+        render_command("WARMUP", 1.0, 0.0, 14, self.preset,
+                       use_zpl=self.use_zpl, use_epl=self.use_epl)
+        return self.dry_run or self.connection.warm()
+
+    def lookup(self, code: str) -> Optional[tuple]:
+        """(item, price, carat, karat) for a scanned code, from history then inventory."""
+        found = self.history.get(generate_item_barcode(code))
+        if found:
+            return found
+        item = lookup_inventory(code)
+        if item:
+            return (code, item['price'], item['carat_weight'], item['gold_karat'])
+        return None
+
+    def reprint(self, code: str, scanned_at: float) -> Optional[bool]:
+        """Print the tag for a scan. None if the code wasn't found."""
+        found = self.lookup(code)
+        if not found:
+            return None
+        command = self.render(*found)
+        ok = True if self.dry_run else self.connection.send(command)
+        self.latencies.append((time.perf_counter() - scanned_at) * 1000)
+        if self.writer:
+            self.writer.write(*found, ok)
+        if ok:
+            self.history[generate_item_barcode(found[0])] = found
+        return ok
+
+    def latency_stats(self) -> dict:
+        samples = sorted(self.latencies)
+        if not samples:
+            return {"scans": 0}
+        return {
+            "scans": len(samples),
+            "avg_ms": round(sum(samples) / len(samples), 2),
+            "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2),
+            "max_ms": round(samples[-1], 2),
+            "over_target": sum(1 for s in samples if s > LATENCY_TARGET_MS),
+        }
+
+    def close(self):
+        self.connection.close()
+        if self.writer:
+            self.writer.close()
+
+
+def scan_mode(preset: str = DEFAULT_PRESET, **options):
+    """Read scans from stdin (one code per line) and reprint each tag."""
+    reprinter = ScanReprinter(preset=preset, **options)
+
+    print("\n" + "="*50)
+    print("  JEWELRY TAG PRINTER - Scan to Reprint")
+    print(f"  Printer: {'dry run' if reprinter.dry_run else describe_target(reprinter.connection.spec)}")
+    print(f"  History: {len(reprinter.history)} tags")
+    print("="*50 + "\n")
+    if not reprinter.warm():
+        print(f"⚠ Printer not reachable yet: {reprinter.connection.last_error}")
+    print("Scan a tag or item (type 'quit' to stop)\n")
+
+    try:
+        for line in sys.stdin:
+            scanned_at = time.perf_counter()
+            code = line.strip()
+            if not code:
+                continue
+            if code.lower() in ('quit', 'exit', 'q'):
+                break
+            ok = reprinter.reprint(code, scanned_at)
+            if ok is None:
+                print(f"✗ {code}: not in history or inventory")
+            elif ok:
+                print(f"✓ {code} reprinted ({reprinter.latencies[-1]:.1f} ms)")
+            else:
+                print(f"✗ {code}: send failed - {reprinter.connection.last_error}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reprinter.close()
+
+    stats = reprinter.latency_stats()
+    if stats["scans"]:
+        print(f"\n{stats['scans']} tags · scan-to-send avg {stats['avg_ms']} ms, "
+              f"p95 {stats['p95_ms']} ms, max {stats['max_ms']} ms")
+        if stats["over_target"]:
+            print(f"⚠ {stats['over_target']} over {LATENCY_TARGET_MS} ms")
+    print("Goodbye!")
+    return stats
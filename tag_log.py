@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Tag Logging
+Structured, queue-backed logging for the print hot path (print_tag, the
+send functions, the history CSV and barcode previews).
+
+Calls only build a LogRecord and append it to a queue; a writer thread
+formats queued records and writes them in one go every WRITE_INTERVAL,
+so a slow console (Windows conhost) no longer stalls printing. Records
+below the level are dropped before anything is built, which is what
+--quiet relies on in batch runs.
+
+Until configure() is called, records go to stdout at INFO; the writer
+thread starts with the first record. The CLI also passes
+lean_records=True, which makes the tags loggers skip the logging module's
+caller lookup (a stack walk per record for a file/line our formatters never
+print); other loggers in the process are left alone.
+
+Formats (LOG_FORMAT in config.py or --log-format):
+    text   ✓ Print command sent target=192.168.1.100:9100 bytes=144
+    kv     ts=2026-10-19T14:02:11.512 level=info logger=tags.send msg="Print command sent" ...
+    json   {"ts": "...", "level": "info", "logger": "tags.send", "msg": "...", ...}
+
+Usage in a module:
+
+    log = get_logger("send")
+    log.info("Print command sent", extra=fields(target=target, bytes=len(command), ok=True))
+
+ok=True/False marks a record ✓/✗ in the text format.
+"""
+
+import atexit
+import json
+import logging
+import sys
+import threading
+from collections import deque
+from datetime import datetime
+
+try:
+    from config import LOG_FORMAT
+except ImportError:
+    LOG_FORMAT = "text"
+
+ROOT = "tags"
+FORMATS = ("text", "kv", "json")
+
+# How often the writer thread wakes to write queued records (seconds)
+WRITE_INTERVAL = 0.05
+
+# What a record's file/line/function read when the caller lookup is skipped
+_NO_CALLER = ("(unknown file)", 0, "(unknown function)", None)
+
+_lean_records = False
+
+
+def _skip_caller(stack_info: bool = False, stacklevel: int = 1):
+    return _NO_CALLER
+
+
+def _set_lean(logger: logging.Logger):
+    """Skip (or restore) the caller lookup on one of our loggers."""
+    if _lean_records:
+        logger.findCaller = _skip_caller
+    else:
+        logger.__dict__.pop("findCaller", None)
+
+
+def get_logger(name: str) -> logging.Logger:
+    logger = logging.getLogger(f"{ROOT}.{name}")
+    _set_lean(logger)
+    return logger
+
+
+def fields(**values) -> dict:
+    """extra= argument carrying structured fields for a record."""
+    return {"fields": values}
+
+
+def _record_fields(record: logging.LogRecord) -> dict:
+    return getattr(record, "fields", None) or {}
+
+
+def _timestamp(record: logging.LogRecord) -> str:
+    return datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds')
+
+
+def _kv_value(value) -> str:
+    text = str(value)
+    if not text or any(c in text for c in ' "=\t\r\n'):
+        return json.dumps(text, ensure_ascii=False)
+    return text
+
+
+class TextFormatter(logging.Formatter):
+    """The console look: a status mark, the message, then key=value fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        values = dict(_record_fields(record))
+        ok = values.pop("ok", None)
+        if ok is True:
+            mark = "✓ "
+        elif ok is False or record.levelno >= logging.ERROR:
+            mark = "✗ "
+        elif record.levelno >= logging.WARNING:
+            mark = "⚠ "
+        else:
+            mark = ""
+        text = mark + record.getMessage()
+        if values:
+            text += " " + " ".join(f"{k}={_kv_value(v)}" for k, v in values.items())
+        if record.exc_info:
+            text += "\n" + self.formatException(record.exc_info)
+        return text
+
+
+class KeyValueFormatter(logging.Formatter):
+    """One logfmt line per record."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        parts = [f"ts={_timestamp(record)}", f"level={record.levelname.lower()}",
+                 f"logger={record.name}", f"msg={_kv_value(record.getMessage())}"]
+        parts += [f"{k}={_kv_value(v)}" for k, v in _record_fields(record).items()]
+        if record.exc_info:
+            parts.append(f"exc={_kv_value(self.formatException(record.exc_info))}")
+        return " ".join(parts)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {"ts": _timestamp(record), "level": record.levelname.lower(),
+                 "logger": record.name, "msg": record.getMessage()}
+        entry.update(_record_fields(record))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+FORMATTERS = {"text": TextFormatter, "kv": KeyValueFormatter, "json": JsonFormatter}
+
+
+class _QueueHandler(logging.Handler):
+    """
+    Appends records to a deque (no lock, no formatting) for a writer thread
+    that formats them in batches and writes each batch with one write() -
+    one console write per batch instead of one per line.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.pending = deque()
+        self.stream = None
+        self.formatter = FORMATTERS.get(LOG_FORMAT, TextFormatter)()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    def emit(self, record: logging.LogRecord):
+        self.pending.append(record)
+        if self._thread is None:
+            self._start_default()
+
+    def _start_default(self):
+        """First record before configure(): start writing to stdout."""
+        with self._write_lock:
+            if self._thread is None and self.stream is None:
+                self.start(sys.stdout, self.formatter)
+
+    def start(self, stream, formatter: logging.Formatter):
+        self.stream = stream
+        self.formatter = formatter
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(WRITE_INTERVAL)
+            self._wake.clear()
+            self.drain()
+
+    def drain(self):
+        """Format and write everything queued so far."""
+        with self._write_lock:
+            records = []
+            while self.pending:
+                records.append(self.pending.popleft())
+            if not records:
+                return
+            stream = self.stream or sys.stdout
+            lines = []
+            for record in records:
+                try:
+                    lines.append(self.formatter.format(record))
+                except Exception:
+                    self.handleError(record)
+            try:
+                stream.write("\n".join(lines) + "\n")
+                stream.flush()
+            except (OSError, ValueError):
+                pass
+
+    def stop(self):
+        if self._thread is not None:
+            self._stopping = True
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        self.drain()
+
+
+_handler = _QueueHandler()
+_file = None
+
+
+def _attach(level: int):
+    logger = logging.getLogger(ROOT)
+    logger.setLevel(level)
+    logger.propagate = False
+    if _handler not in logger.handlers:
+        logger.addHandler(_handler)
+
+
+def configure(level: int = logging.INFO, fmt: str = LOG_FORMAT, stream=None,
+              path: str = None, lean_records: bool = False):
+    """
+    (Re)start the writer on stream (default stdout) or a file.
+    Quiet runs pass level=logging.WARNING. lean_records makes the tags
+    loggers skip the caller lookup (our formatters don't use it).
+    """
+    global _file, _lean_records
+    if fmt not in FORMATTERS:
+        raise ValueError(f"unknown log format '{fmt}' (expected one of: {', '.join(FORMATS)})")
+    stop()
+    if path:
+        stream = _file = open(path, 'a', encoding='utf-8')
+    _handler.start(stream or sys.stdout, FORMATTERS[fmt]())
+    _attach(level)
+    _lean_records = lean_records
+    prefix = ROOT + "."
+    for name, logger in list(logging.Logger.manager.loggerDict.items()):
+        if name.startswith(prefix) and isinstance(logger, logging.Logger):
+            _set_lean(logger)
+
+
+def flush():
+    """Write everything logged so far (before prompts and reports)."""
+    _handler.drain()
+
+
+def stop():
+    """Write what is queued and stop the writer thread."""
+    global _file
+    _handler.stop()
+    if _file is not None:
+        _file.close()
+        _file = None
+
+
+# Console output at INFO until a CLI reconfigures it (the writer starts lazily)
+_attach(logging.INFO)
+atexit.register(stop)
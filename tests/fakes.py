@@ -0,0 +1,69 @@
+"""Stand-ins for the printer side of JobQueue, shared by the tests."""
+
+import threading
+
+from jewelry_tag_printer import create_cancel_command
+
+CANCEL = create_cancel_command()
+
+
+class FakeConnection:
+    """Records what is sent; a label can be held mid-send until released."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.spec = {"name": key, "connection": "network", "ip": "127.0.0.1", "port": 9100,
+                     "printer_name": key, "dpi": 203}
+        self.last_error = None
+        self.sent = []
+        self.held = {}          # marker bytes -> (entered, release) events
+        self._lock = threading.Lock()
+
+    def hold(self, marker: bytes) -> threading.Event:
+        """Block the send of any command containing marker; returns its 'entered' event."""
+        entered, release = threading.Event(), threading.Event()
+        self.held[marker] = (entered, release)
+        return entered
+
+    def release(self, marker: bytes):
+        self.held.pop(marker)[1].set()
+
+    def send(self, command: bytes, job=None) -> bool:
+        for marker, (entered, release) in list(self.held.items()):
+            if marker in command:
+                entered.set()
+                release.wait(5)
+        with self._lock:
+            self.sent.append(command)
+        return True
+
+    def labels(self) -> list:
+        """What was sent, as item numbers ("CANCEL" for buffer clears)."""
+        with self._lock:
+            return ["CANCEL" if command == CANCEL else command.decode("ascii")[len("LABEL "):]
+                    for command in self.sent]
+
+    def warm(self) -> bool:
+        return True
+
+    def close(self):
+        pass
+
+
+def label_renderer(item_number, price, carat_weight, gold_karat, preset, **options) -> bytes:
+    """JobQueue renderer whose commands are just the item number."""
+    return f"LABEL {item_number}".encode("ascii")
+
+
+class FakePool:
+    """ConnectionPool with FakeConnections for the given printer keys."""
+
+    def __init__(self, *keys: str):
+        self.connections = {key: FakeConnection(key) for key in keys or ("counter",)}
+        self.printers = {key: conn.spec for key, conn in self.connections.items()}
+
+    def get(self, key=None) -> FakeConnection:
+        return self.connections[key or next(iter(self.connections))]
+
+    def close(self):
+        pass
@@ -0,0 +1,63 @@
+"""batch_printer: process-pool rendering keeps every worker busy and rows in order."""
+
+import multiprocessing
+import os
+import sys
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import batch_printer
+from batch_printer import run_batch
+
+
+def rows(count: int) -> list:
+    return [{"item_number": f"MSD{i:06d}", "price": 100 + i, "carat": 1.0, "karat": 14}
+            for i in range(count)]
+
+
+def slow_render(job, preset, use_zpl, use_epl) -> bytes:
+    time.sleep(0.05)
+    return job["item_number"].encode()
+
+
+class RenderPoolTest(unittest.TestCase):
+    def run_pool(self, source: list, processes: int, chunk: int = 8) -> tuple:
+        sent = []
+        summary = run_batch(source, csv_path=None, render_processes=processes,
+                            render_chunk=chunk,
+                            sender=lambda command, job: sent.append(job["row"]) or True)
+        return summary, sent
+
+    def test_output_keeps_row_order(self):
+        summary, sent = self.run_pool(rows(200), processes=3)
+        self.assertEqual(summary["printed"], 200)
+        self.assertEqual(sent, list(range(1, 201)))
+
+    def test_failed_render_is_reported_per_row(self):
+        source = rows(50)
+        source[9]["item_number"] = "MSDé"         # not encodable for the printer
+        summary, sent = self.run_pool(source, processes=2)
+        self.assertEqual(summary["printed"], 49)
+        self.assertEqual([row for row, _ in summary["errors"]], [10])
+        self.assertTrue(summary["errors"][0][1].startswith("render: "))
+        self.assertNotIn(10, sent)
+
+    @unittest.skipUnless(multiprocessing.get_start_method() == "fork",
+                         "workers must inherit the patched renderer")
+    def test_chunks_render_concurrently(self):
+        # 8 chunks x 4 labels x 50 ms: 1.6 s one chunk at a time
+        with mock.patch.object(batch_printer, "_render_one", slow_render):
+            start = time.perf_counter()
+            summary, sent = self.run_pool(rows(32), processes=4, chunk=4)
+            elapsed = time.perf_counter() - start
+        self.assertEqual(sent, list(range(1, 33)))
+        self.assertLess(elapsed, 1.2)
+        render = next(s for s in summary["stages"] if s["stage"] == "render")
+        self.assertLessEqual(render["utilization"], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
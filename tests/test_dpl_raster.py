@@ -0,0 +1,48 @@
+"""dpl_raster: every shipped preset previews with all its fields on the label."""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dpl_raster import rasterize_record, render_preset
+from jewelry_tag_printer import render_command
+from label_geometry import PRESET_LAYOUTS, fleet_dpis
+
+SAMPLES = [("MSD958009", 17600, 5.26, 14), ("A1", 9.5, 0.0, 10),
+           ("MSD958009-LONG-SKU-1234", 1234567, 12.75, 18)]
+
+
+class PresetRasterTest(unittest.TestCase):
+    def test_presets_render_inside_the_label(self):
+        for preset, layout in PRESET_LAYOUTS.items():
+            for dpi in sorted(set(fleet_dpis()) | {203, 300, 600}):
+                for sample in SAMPLES:
+                    with self.subTest(preset=preset, dpi=dpi, item=sample[0]):
+                        raster = render_preset(render_command(*sample, preset, dpi=dpi),
+                                               preset, dpi)
+                        self.assertEqual(raster.warnings, [])
+                        self.assertEqual(raster.fields, len(layout["fields"]))
+                        self.assertGreater(raster.black_dots(), 0)
+
+
+class RecordTest(unittest.TestCase):
+    def test_numbers_are_read_up_to_the_first_non_digit(self):
+        column, row, bitmap, warning = rasterize_record("1911001008001 2017600")
+        self.assertEqual((column, row, warning), (1, 80, None))
+        self.assertIsNotNone(bitmap)
+
+    def test_text_record_position(self):
+        column, row, bitmap, warning = rasterize_record("121100000500030TEST")
+        self.assertEqual((column, row), (30, 50))
+        self.assertEqual(bitmap.width, 4 * 11)
+
+    def test_bad_position_is_a_warning(self):
+        column, row, bitmap, warning = rasterize_record("1211000 x00030TEST")
+        self.assertIsNone(bitmap)
+        self.assertIn("bad row/column", warning)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+"""inventory_index: full, incremental and edited-export builds, and lookups."""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import inventory_index
+from inventory_index import InventoryIndex, build_index
+
+HEADER = "SKU,Price,Carat,Karat\n"
+
+
+class InventoryIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.csv = os.path.join(self.tmp.name, "inventory.csv")
+        self.index = os.path.join(self.tmp.name, "inventory.idx")
+        self.mtime = 1_700_000_000
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, text: str, mode: str = "w"):
+        with open(self.csv, mode, encoding="utf-8", newline="") as f:
+            f.write(text)
+        # A fresh mtime each write, so quick rewrites never look unchanged
+        self.mtime += 10
+        os.utime(self.csv, (self.mtime, self.mtime))
+
+    def lookup(self, item: str):
+        index = InventoryIndex(self.index)
+        try:
+            return index.lookup(item)
+        finally:
+            index.close()
+
+    def test_full_build_and_lookup(self):
+        self.write(HEADER + "MSD958009,\"$17,600\",5.26,18\nAB-12,99.5,0.5,14\n")
+        self.assertEqual(build_index(self.csv, self.index), "full")
+        self.assertEqual(self.lookup("msd958009"),
+                         {"price": 17600.0, "carat_weight": 5.26, "gold_karat": 18})
+        self.assertEqual(self.lookup(" AB-12 ")["price"], 99.5)
+        self.assertIsNone(self.lookup("NOPE"))
+        self.assertIsNone(self.lookup("X" * 64))
+        self.assertEqual(len(InventoryIndex(self.index)), 2)
+
+    def test_unchanged_export_is_a_no_op(self):
+        self.write(HEADER + "A1,1,1,14\n")
+        build_index(self.csv, self.index)
+        self.assertEqual(build_index(self.csv, self.index), "unchanged")
+
+    def test_appended_rows_are_merged(self):
+        self.write(HEADER + "B2,2,1,14\nD4,4,1,14\n")
+        build_index(self.csv, self.index)
+        self.write("A1,1,1,10\nC3,3,1,22\nD4,40,2,24\n", mode="a")
+        self.assertEqual(build_index(self.csv, self.index), "incremental")
+        self.assertEqual(len(InventoryIndex(self.index)), 4)
+        self.assertEqual([self.lookup(item)["price"] for item in ("A1", "B2", "C3", "D4")],
+                         [1.0, 2.0, 3.0, 40.0])
+        self.assertEqual(self.lookup("D4")["gold_karat"], 24)
+
+    def test_edited_export_is_rebuilt(self):
+        self.write(HEADER + "A1,1,1,14\nB2,2,1,14\n")
+        build_index(self.csv, self.index)
+        self.write(HEADER + "A1,9,1,14\nB2,2,1,14\nC3,3,1,14\n")
+        self.assertEqual(build_index(self.csv, self.index), "full")
+        self.assertEqual(self.lookup("A1")["price"], 9.0)
+        self.assertEqual(len(InventoryIndex(self.index)), 3)
+
+    def test_karat_zero_is_kept_and_blank_is_none(self):
+        self.write(HEADER + "A1,1,1,0\nB2,2,1,\n")
+        build_index(self.csv, self.index)
+        self.assertEqual(self.lookup("A1")["gold_karat"], 0)
+        self.assertIsNone(self.lookup("B2")["gold_karat"])
+
+    def test_bad_rows_are_skipped(self):
+        self.write(HEADER + "A1,1,1,14\nB2,abc,1,14\nC3,3,1,255\nD4,4,1,-1\n,5,1,14\n")
+        with self.assertLogs("tags.inventory", "WARNING") as logs:
+            build_index(self.csv, self.index)
+        self.assertEqual(logs.records[0].fields["rows"], 3)
+        self.assertEqual(len(InventoryIndex(self.index)), 1)
+
+    def test_older_index_version_is_rebuilt(self):
+        self.write(HEADER + "A1,1,1,14\n")
+        build_index(self.csv, self.index)
+        with open(self.index, "r+b") as f:
+            f.seek(4)
+            f.write((inventory_index.VERSION - 1).to_bytes(2, "little"))
+        self.assertEqual(build_index(self.csv, self.index), "full")
+
+
+if __name__ == "__main__":
+    unittest.main()
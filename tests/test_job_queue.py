@@ -0,0 +1,112 @@
+"""job_queue: pause, cancel and resume of chunked jobs."""
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import FakePool, label_renderer
+from job_queue import JobQueue
+
+
+def labels(prefix: str, count: int) -> list:
+    return [{"item_number": f"{prefix}{i}", "price": 100, "carat": 1.0, "karat": 14}
+            for i in range(1, count + 1)]
+
+
+class JobControlTest(unittest.TestCase):
+    def setUp(self):
+        self.pool = FakePool("counter")
+        self.printer = self.pool.get("counter")
+        self.queue = JobQueue(self.pool, csv_path=None, renderer=label_renderer,
+                              chunk_labels=2)
+
+    def tearDown(self):
+        for marker in list(self.printer.held):
+            self.printer.release(marker)
+        self.queue.stop()
+
+    def start_blocked_on(self, marker: bytes, job_labels: list, **options):
+        """Submit a job and wait until the printer is sending marker."""
+        entered = self.printer.hold(marker)
+        job = self.queue.submit(job_labels, **options)
+        self.queue.start()
+        self.assertTrue(entered.wait(5))
+        return job
+
+    def wait_idle(self):
+        """Until the printer has put its chunk down (workers don't signal that)."""
+        deadline = time.monotonic() + 5
+        while self.queue.printer_status()[0]["busy_job"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertIsNone(self.queue.printer_status()[0]["busy_job"])
+
+    def test_pause_holds_the_rest_and_resume_prints_it_once(self):
+        job = self.start_blocked_on(b"A2", labels("A", 6))
+        self.queue.pause(job.id)
+        self.assertEqual(self.queue.depth(), 0)
+        self.printer.release(b"A2")
+        self.wait_idle()
+        self.assertEqual(self.printer.labels(), ["A1", "A2"])
+        self.assertEqual(job.state, "paused")
+
+        self.queue.resume(job.id)
+        self.assertTrue(job.wait(5))
+        self.assertEqual(job.state, "done")
+        self.assertEqual(self.printer.labels(), [f"A{i}" for i in range(1, 7)])
+
+    def test_cancel_mid_chunk_clears_the_buffer_after_the_current_label(self):
+        job = self.start_blocked_on(b"A1", labels("A", 4))
+        self.queue.cancel(job.id)
+        self.assertFalse(job.finished_event.is_set())
+        self.printer.release(b"A1")
+        self.assertTrue(job.wait(5))
+        self.assertEqual(self.printer.labels(), ["A1", "CANCEL"])
+        self.assertEqual(job.state, "cancelled")
+
+    def test_cancel_between_chunks_clears_the_buffer(self):
+        # A's first chunk is sent, then the printer takes the interactive job B
+        job = self.start_blocked_on(b"A2", labels("A", 4), priority="bulk")
+        entered = self.printer.hold(b"B1")
+        rush = self.queue.submit(labels("B", 1), priority="interactive")
+        self.printer.release(b"A2")
+        self.assertTrue(entered.wait(5))
+        self.assertEqual(job.state, "printing")
+
+        self.queue.cancel(job.id)
+        self.assertTrue(job.finished_event.is_set())
+        self.assertEqual(self.printer.labels(), ["A1", "A2", "CANCEL"])
+        self.printer.release(b"B1")
+        self.assertTrue(rush.wait(5))
+        self.assertEqual(self.queue.depth(), 0)
+
+    def test_cancel_queued_job_sends_nothing(self):
+        job = self.queue.submit(labels("A", 3))
+        self.queue.cancel(job.id)
+        self.assertTrue(job.finished_event.is_set())
+        self.assertEqual(self.queue.depth(), 0)
+        self.assertEqual(self.printer.labels(), [])
+
+    def test_resume_after_cancel_prints_the_unsent_labels(self):
+        job = self.start_blocked_on(b"A3", labels("A", 5))
+        self.queue.cancel(job.id)
+        self.printer.release(b"A3")
+        self.assertTrue(job.wait(5))
+        self.queue.resume(job.id)
+        self.assertTrue(job.wait(5))
+        self.assertEqual(job.state, "done")
+        self.assertEqual(self.printer.labels(), ["A1", "A2", "A3", "CANCEL", "A4", "A5"])
+
+    def test_control_errors(self):
+        job = self.queue.submit(labels("A", 1))
+        with self.assertRaises(KeyError):
+            self.queue.pause("nope")
+        with self.assertRaises(ValueError):
+            self.queue.resume(job.id)           # not paused
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+"""memprofile: per-label budget judged after the warm-up."""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import memprofile
+
+
+def run(profiler: memprofile.MemoryProfiler, labels: int, keep_bytes: int = 0,
+        warmup_bytes: int = 0) -> dict:
+    """Count labels one at a time, optionally holding keep_bytes per label."""
+    held = []
+    with profiler:
+        for i in range(labels):
+            if i == 0 and warmup_bytes:
+                held.append(bytearray(warmup_bytes))
+            scratch = bytearray(512)        # freed per label, like a render
+            del scratch
+            if keep_bytes:
+                held.append(bytearray(keep_bytes))
+            profiler.count_labels()
+    return profiler.report()
+
+
+class BudgetTest(unittest.TestCase):
+    def test_streaming_run_is_within_budget(self):
+        report = run(memprofile.MemoryProfiler(budget_kb=0.25, min_labels=20), 500)
+        self.assertTrue(report["judged"])
+        self.assertTrue(report["within_budget"])
+
+    def test_growing_run_is_over_budget(self):
+        report = run(memprofile.MemoryProfiler(budget_kb=0.25, min_labels=20), 500,
+                     keep_bytes=1024)
+        self.assertTrue(report["judged"])
+        self.assertFalse(report["within_budget"])
+        self.assertGreater(report["bytes_per_label"], 1024)
+
+    def test_small_runs_are_judged(self):
+        report = run(memprofile.MemoryProfiler(budget_kb=0.25, min_labels=20), 50,
+                     keep_bytes=1024)
+        self.assertTrue(report["judged"])
+        self.assertFalse(report["within_budget"])
+
+    def test_warmup_is_not_charged(self):
+        # 1 MB allocated with the first label (imports, first render) is fixed cost
+        report = run(memprofile.MemoryProfiler(budget_kb=0.25, warmup_labels=1, min_labels=20),
+                     100, warmup_bytes=1024 * 1024)
+        self.assertEqual(report["warmup_labels"], 1)
+        self.assertTrue(report["within_budget"])
+
+    def test_below_min_labels_is_reported_not_judged(self):
+        report = run(memprofile.MemoryProfiler(budget_kb=0.25, min_labels=20), 10,
+                     keep_bytes=1024)
+        self.assertFalse(report["judged"])
+        self.assertTrue(report["within_budget"])
+        self.assertIsNotNone(report["bytes_per_label"])
+
+    def test_no_budget_is_never_judged(self):
+        report = run(memprofile.MemoryProfiler(budget_kb=None), 100, keep_bytes=1024)
+        self.assertFalse(report["judged"])
+
+
+if __name__ == "__main__":
+    unittest.main()
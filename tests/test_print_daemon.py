@@ -0,0 +1,88 @@
+"""print_daemon: the line protocol, including requests it must refuse."""
+
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import FakePool, label_renderer
+from job_queue import JobQueue
+from print_daemon import PrintDaemon
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "needs Unix domain sockets")
+class DaemonProtocolTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pool = FakePool("counter")
+        self.queue = JobQueue(self.pool, csv_path=None, renderer=label_renderer)
+        self.daemon = PrintDaemon(os.path.join(self.tmp.name, "daemon.sock"), self.queue)
+        self.queue.start()
+        threading.Thread(target=self.daemon.serve_forever, args=(0.05,), daemon=True).start()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(5)
+        self.sock.connect(self.daemon.socket_path)
+        self.replies = self.sock.makefile("rb")
+
+    def tearDown(self):
+        self.replies.close()
+        self.sock.close()
+        self.daemon.shutdown()
+        self.daemon.server_close()
+        self.queue.stop()
+        self.tmp.cleanup()
+
+    def send(self, line: bytes) -> bytes:
+        self.sock.sendall(line + b"\n")
+        return self.replies.readline()
+
+    def call(self, request) -> dict:
+        return json.loads(self.send(json.dumps(request).encode()))
+
+    def test_ping(self):
+        self.assertTrue(self.call({"op": "ping"})["ok"])
+
+    def test_non_object_requests_keep_the_connection(self):
+        for request in ([], "x", 3, None, [{"op": "ping"}]):
+            with self.subTest(request=request):
+                self.assertEqual(self.call(request), {"error": "request must be a JSON object"})
+        self.assertEqual(self.send(b"{not json").startswith(b'{"error"'), True)
+        self.assertTrue(self.call({"op": "ping"})["ok"])
+
+    def test_bad_fields_are_errors(self):
+        for request in ({"op": "nope"},
+                        {"op": "print", "item_number": "A1", "price": 1, "carat": 1, "karat": 14,
+                         "preset": ["standard"]},
+                        {"op": "print", "item_number": "A1", "price": "x", "carat": 1,
+                         "karat": 14},
+                        {"op": "cancel", "id": "nope"}):
+            with self.subTest(request=request):
+                self.assertIn("error", self.call(request))
+        self.assertTrue(self.call({"op": "ping"})["ok"])
+
+    def test_json_print_waits_for_the_label(self):
+        reply = self.call({"op": "print", "item_number": "A1", "price": 10, "carat": 1.5,
+                           "karat": 14, "printer": "counter"})
+        self.assertTrue(reply["ok"])
+        self.assertEqual(self.pool.get("counter").labels(), ["A1"])
+
+    def test_text_print(self):
+        reply = self.send(b"PRINT\titem_number=A2\tprice=10\tcarat=1\tkarat=14\tnetwork=True")
+        fields = reply.decode().rstrip("\n").split("\t")
+        self.assertEqual(fields[:2], ["OK", "counter"])
+        self.assertEqual(self.send(b"PRINT\titem_number=A3\tprice=x\tcarat=1\tkarat=14"),
+                         b"ERROR\tcould not convert string to float: 'x'\n")
+
+    def test_unknown_printer_falls_back(self):
+        self.assertEqual(self.send(b"PRINT\titem_number=A4\tprice=1\tcarat=1\tkarat=14"
+                                   b"\tprinter_name=Elsewhere"), b"FALLBACK\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+"""print_service: POST /jobs validation and connection handling."""
+
+import http.client
+import json
+import os
+import socket
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import FakePool, label_renderer
+from job_queue import JobQueue
+from print_service import PrintService
+
+LABEL = {"item_number": "MSD958009", "price": 17600, "carat": 5.26, "karat": 14}
+
+
+class PrintServiceTest(unittest.TestCase):
+    def setUp(self):
+        self.queue = JobQueue(FakePool("counter"), csv_path=None, renderer=label_renderer)
+        self.server = PrintService("127.0.0.1", 0, self.queue, dry_run=True)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def request(self, method: str, path: str, body=None, headers=None) -> tuple:
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        data = json.dumps(body).encode() if body is not None and not isinstance(body, bytes) else body
+        conn.request(method, path, data, headers or {})
+        response = conn.getresponse()
+        payload = json.loads(response.read())
+        conn.close()
+        return response.status, payload
+
+    def raw(self, data: bytes) -> bytes:
+        """Send raw bytes; everything the server answers until it closes."""
+        with socket.create_connection(("127.0.0.1", self.port), timeout=5) as sock:
+            sock.sendall(data)
+            sock.shutdown(socket.SHUT_WR)
+            chunks = []
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    return b"".join(chunks)
+                chunks.append(chunk)
+
+    def test_single_label_is_accepted(self):
+        status, reply = self.request("POST", "/jobs", LABEL)
+        self.assertEqual(status, 202)
+        self.assertEqual(reply["labels"], 1)
+        status, job = self.request("GET", reply["status_url"])
+        self.assertEqual((status, job["priority"], job["dry_run"]), (200, "interactive", True))
+
+    def test_batch_options(self):
+        status, reply = self.request("POST", "/jobs", {"preset": "barbell", "priority": "bulk",
+                                                       "labels": [LABEL, LABEL]})
+        self.assertEqual(status, 202)
+        self.assertEqual(self.request("GET", reply["status_url"])[1]["priority"], "bulk")
+
+    def test_bad_bodies_are_400(self):
+        for body in (b"{not json", [], {"labels": "x"}, {"labels": [LABEL], "preset": ["x"]},
+                     {"labels": [LABEL], "priority": 3}, {"labels": [LABEL], "preset": "nope"},
+                     {"item_number": "A1", "price": "cheap", "carat": 1, "karat": 14},
+                     {"labels": [LABEL], "language": "pcl"}):
+            with self.subTest(body=body):
+                status, reply = self.request("POST", "/jobs", body)
+                self.assertEqual(status, 400)
+                self.assertIn("error", reply)
+
+    def test_bad_content_length_is_400(self):
+        status, _ = self.request("POST", "/jobs", b"{}", {"Content-Length": "abc"})
+        self.assertEqual(status, 400)
+
+    def test_unread_body_is_not_taken_for_the_next_request(self):
+        # No Content-Length: the body is never read, so the connection must close
+        smuggled = b"GET /queue HTTP/1.1\r\nHost: x\r\n\r\n"
+        reply = self.raw(b"POST /jobs HTTP/1.1\r\nHost: x\r\n\r\n" + smuggled)
+        self.assertTrue(reply.startswith(b"HTTP/1.0 400") or reply.startswith(b"HTTP/1.1 400"))
+        self.assertEqual(reply.count(b"HTTP/1."), 1)
+
+    def test_oversized_body_is_413_and_closes(self):
+        reply = self.raw(b"POST /jobs HTTP/1.1\r\nHost: x\r\nContent-Length: 999999999\r\n\r\n"
+                         b"GET /queue HTTP/1.1\r\nHost: x\r\n\r\n")
+        self.assertIn(b" 413 ", reply.split(b"\r\n", 1)[0])
+        self.assertEqual(reply.count(b"HTTP/1."), 1)
+
+    def test_body_on_other_paths_is_drained(self):
+        body = json.dumps(LABEL).encode()
+        reply = self.raw(b"POST /nowhere HTTP/1.1\r\nHost: x\r\nContent-Length: "
+                         + str(len(body)).encode() + b"\r\n\r\n" + body
+                         + b"GET /queue HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n")
+        self.assertEqual(reply.count(b"HTTP/1.1 404"), 1)
+        self.assertEqual(reply.count(b"HTTP/1.1 200"), 1)
+
+    def test_job_control(self):
+        _, reply = self.request("POST", "/jobs", {"labels": [LABEL] * 3})
+        status, job = self.request("POST", f"/jobs/{reply['id']}/pause")
+        self.assertEqual((status, job["state"]), (200, "paused"))
+        self.assertEqual(self.request("POST", f"/jobs/{reply['id']}/pause")[0], 409)
+        self.assertEqual(self.request("POST", "/jobs/nope/cancel")[0], 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
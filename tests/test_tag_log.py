@@ -0,0 +1,52 @@
+"""tag_log: lean records stay inside the tags loggers."""
+
+import io
+import logging
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tag_log
+
+
+class LeanRecordsTest(unittest.TestCase):
+    def setUp(self):
+        self.stream = io.StringIO()
+        self.records = []
+        self.other = logging.getLogger("test_tag_log.other")
+        self.capture = logging.Handler()
+        self.capture.emit = self.records.append
+        self.other.addHandler(self.capture)
+
+    def tearDown(self):
+        self.other.removeHandler(self.capture)
+        tag_log.configure(stream=self.stream)
+        tag_log.stop()
+
+    def test_logging_module_is_left_alone(self):
+        before = (logging._srcfile, logging.logThreads, logging.logProcesses,
+                  logging.logMultiprocessing)
+        tag_log.configure(stream=self.stream, lean_records=True)
+        self.assertEqual((logging._srcfile, logging.logThreads, logging.logProcesses,
+                          logging.logMultiprocessing), before)
+        self.other.warning("elsewhere")
+        self.assertTrue(self.records[0].pathname.endswith("test_tag_log.py"))
+
+    def test_tags_loggers_skip_the_caller(self):
+        existing = tag_log.get_logger("test")
+        tag_log.configure(stream=self.stream, fmt="kv", lean_records=True)
+        created = tag_log.get_logger("test.later")
+        for log in (existing, created):
+            log.info("sent", extra=tag_log.fields(bytes=3))
+        tag_log.flush()
+        self.assertEqual(self.stream.getvalue().count("msg=sent bytes=3"), 2)
+        self.assertEqual(existing.findCaller(), tag_log._NO_CALLER)
+
+        tag_log.configure(stream=self.stream)
+        self.assertNotEqual(existing.findCaller(), tag_log._NO_CALLER)
+
+
+if __name__ == "__main__":
+    unittest.main()
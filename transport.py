@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Printer Transport
+Printer registry and pooled connections for long-running processes
+(print service, daemon, batch runs).
+
+Network printers keep one TCP connection open and reuse it for every job,
+reconnecting once if the printer dropped it. USB printers go through
+send_to_usb_printer (spooler on Windows, lpr elsewhere).
+"""
+
+import os
+import socket
+import sys
+import threading
+import time
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from jewelry_tag_printer import (
+    send_to_usb_printer, USB_PRINTER_NAME, PRINTER_IP, PRINTER_PORT,
+    DEFAULT_USE_USB, DPI
+)
+from wire_journal import journal_write
+from printer_graphics import with_uploads, mark_uploaded
+import metrics
+from tag_log import get_logger, fields
+
+log = get_logger("transport")
+
+try:
+    from config import PRINTERS, DEFAULT_PRINTER
+except ImportError:
+    # Single printer built from the basic settings
+    PRINTERS = {
+        "default": {
+            "name": USB_PRINTER_NAME if DEFAULT_USE_USB else PRINTER_IP,
+            "connection": "usb" if DEFAULT_USE_USB else "network",
+            "printer_name": USB_PRINTER_NAME,
+            "ip": PRINTER_IP,
+            "port": PRINTER_PORT,
+            "dpi": DPI,
+        }
+    }
+    DEFAULT_PRINTER = "default"
+
+
+def get_printers() -> dict:
+    """The printer registry, with defaults filled in for every entry."""
+    printers = {}
+    for key, spec in PRINTERS.items():
+        printers[key] = {
+            "name": spec.get("name", key),
+            "connection": spec.get("connection", "usb"),
+            "printer_name": spec.get("printer_name", USB_PRINTER_NAME),
+            "ip": spec.get("ip", PRINTER_IP),
+            "port": spec.get("port", PRINTER_PORT),
+            "dpi": spec.get("dpi", DPI),
+        }
+    return printers
+
+
+def describe_target(spec: dict) -> str:
+    """Human-readable destination for a printer spec."""
+    if spec["connection"] == "network":
+        return f"{spec['ip']}:{spec['port']}"
+    return spec["printer_name"]
+
+
+class PrinterConnection:
+    """One printer; sends are serialized and network sockets are reused."""
+
+    def __init__(self, key: str, spec: dict, timeout: float = 10):
+        self.key = key
+        self.spec = spec
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self._sock = None
+        self.last_error = None
+        self.last_used = None
+
+    @property
+    def is_network(self) -> bool:
+        return self.spec["connection"] == "network"
+
+    def _connect(self):
+        sock = socket.create_connection((self.spec["ip"], self.spec["port"]),
+                                        timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock = sock
+
+    def warm(self) -> bool:
+        """Open the connection ahead of the first send (network printers)."""
+        if not self.is_network:
+            return True
+        with self.lock:
+            if self._sock is None:
+                try:
+                    self._connect()
+                except OSError as e:
+                    self.last_error = str(e)
+                    return False
+        return True
+
+    def send(self, command: bytes, job: Optional[str] = None) -> bool:
+        """Send command bytes; True on success. job labels the wire journal record."""
+        start = time.perf_counter()
+        ok = self._send(command, job)
+        metrics.SEND_SECONDS.observe(time.perf_counter() - start, self.key)
+        metrics.SENDS.inc(self.key, "ok" if ok else "error")
+        if ok:
+            metrics.BYTES_SENT.inc(self.key, amount=len(command))
+        return ok
+
+    def _send(self, command: bytes, job: Optional[str]) -> bool:
+        with self.lock:
+            self.last_used = time.time()
+            if not self.is_network:
+                ok = send_to_usb_printer(command, self.spec["printer_name"], job=job)
+                self.last_error = None if ok else "USB send failed"
+                return ok
+            target = f"tcp:{describe_target(self.spec)}"
+            command, uploads = with_uploads(command, target)
+            # Reuse the open socket; on failure reconnect once and retry
+            for attempt in (1, 2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    self._sock.sendall(command)
+                    journal_write(target, command, job)
+                    mark_uploaded(target, uploads)
+                    self.last_error = None
+                    return True
+                except OSError as e:
+                    self.last_error = str(e)
+                    self._close_socket()
+                    if attempt == 2:
+                        log.error("Failed to send", extra=fields(
+                            target=describe_target(self.spec), error=str(e)))
+            return False
+
+    def _close_socket(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def close(self):
+        with self.lock:
+            self._close_socket()
+
+
+class ConnectionPool:
+    """Lazily created PrinterConnection per registry entry."""
+
+    def __init__(self, printers: Optional[dict] = None):
+        self.printers = printers if printers is not None else get_printers()
+        self._connections = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Optional[str] = None) -> PrinterConnection:
+        key = key or DEFAULT_PRINTER
+        if key not in self.printers:
+            raise KeyError(f"unknown printer '{key}'")
+        with self._lock:
+            conn = self._connections.get(key)
+            if conn is None:
+                conn = self._connections[key] = PrinterConnection(key, self.printers[key])
+            return conn
+
+    def send(self, command: bytes, key: Optional[str] = None, job: Optional[str] = None) -> bool:
+        return self.get(key).send(command, job)
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections.values():
+                conn.close()
+            self._connections.clear()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Process-wide connection pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool()
+        return _pool
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Wire Journal
+Optional append-only record of every byte written to a printer, so a tag
+that came out wrong can be traced to exactly what was sent.
+
+Turn it on with WIRE_JOURNAL_DIR in config.py. Each transport write
+(network socket, USB spooler/lpr) that succeeds appends one record:
+timestamp, target, job ID and the command bytes. Failed attempts aren't
+journaled, so --resend never replays traffic the printer didn't get. The live segment is rotated at
+WIRE_JOURNAL_MAX_MB and rotated segments are gzipped in the background;
+the oldest beyond WIRE_JOURNAL_KEEP are deleted.
+
+    python wire_journal.py                         # list the journal
+    python wire_journal.py --since "2026-10-19 14:00" --job 6712f3a0-4
+    python wire_journal.py --last 5 --show         # rasterize the last 5
+    python wire_journal.py --last 5 --pgm out/     # ...as PGM images
+    python wire_journal.py --resend --printer backroom --realtime
+    python wire_journal.py --resend --ip 127.0.0.1:9101  # a test transport
+    python wire_journal.py --diff other_journal/   # compare two captures
+
+--resend replays a window through the transport pool, optionally with the
+original gaps between writes, for reproducing a fault or load-testing a new
+transport with real traffic. --diff compares the bytes of a window with
+another journal (e.g. the capture of a replay) record by record.
+
+Record layout (little-endian):
+
+    d timestamp | H target length | H job length | I data length | target | job | data
+"""
+
+import argparse
+import glob
+import os
+import struct
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    from config import WIRE_JOURNAL_DIR, WIRE_JOURNAL_MAX_MB, WIRE_JOURNAL_KEEP
+except ImportError:
+    WIRE_JOURNAL_DIR = None
+    WIRE_JOURNAL_MAX_MB = 16
+    WIRE_JOURNAL_KEEP = 50
+
+RECORD = struct.Struct("<dHHI")
+LIVE_SEGMENT = "wire.jnl"
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class WireJournal:
+    """Appends records to directory/wire.jnl; thread-safe, flushed per write."""
+
+    def __init__(self, directory: str, max_bytes: int = WIRE_JOURNAL_MAX_MB << 20,
+                 keep: int = WIRE_JOURNAL_KEEP):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self.path = os.path.join(directory, LIVE_SEGMENT)
+        self._lock = threading.Lock()
+        self._file = None
+        self._size = 0
+
+    def write(self, target: str, data: bytes, job: Optional[str] = None):
+        target_bytes = target.encode('utf-8')[:0xFFFF]
+        job_bytes = (job or "").encode('utf-8')[:0xFFFF]
+        record = (RECORD.pack(time.time(), len(target_bytes), len(job_bytes), len(data))
+                  + target_bytes + job_bytes + data)
+        with self._lock:
+            if self._file is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self._file = open(self.path, 'ab')
+                self._size = self._file.tell()
+            self._file.write(record)
+            self._file.flush()
+            self._size += len(record)
+            if self._size >= self.max_bytes:
+                self._rotate()
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        rotated = os.path.join(self.directory,
+                               f"wire-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.jnl")
+        os.replace(self.path, rotated)
+        threading.Thread(target=self._compress, args=(rotated,),
+                         name="journal-gzip", daemon=True).start()
+
+    def _compress(self, path: str):
+        import gzip
+        import shutil
+        try:
+            with open(path, 'rb') as src, gzip.open(path + ".gz", 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(path)
+        except OSError as e:
+            print(f"⚠ Could not compress {path}: {e}")
+        # Drop the oldest rotated segments
+        rotated = sorted(glob.glob(os.path.join(self.directory, "wire-*.jnl.gz")))
+        for old in rotated[:-self.keep]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+JOURNAL = WireJournal(WIRE_JOURNAL_DIR) if WIRE_JOURNAL_DIR else None
+
+
+def journal_write(target: str, data: bytes, job: Optional[str] = None):
+    """Record one transport write (no-op unless WIRE_JOURNAL_DIR is set)."""
+    if JOURNAL is not None:
+        try:
+            JOURNAL.write(target, data, job)
+        except OSError as e:
+            print(f"⚠ Wire journal write failed: {e}")
+
+
+# -- reading ----------------------------------------------------------------
+
+def segments(directory: str) -> list:
+    """Journal files oldest first; the live segment last."""
+    plain = glob.glob(os.path.join(directory, "wire-*.jnl"))
+    # A segment being compressed has both files; the plain one is complete
+    rotated = sorted(plain + [path for path in glob.glob(os.path.join(directory, "wire-*.jnl.gz"))
+                              if path[:-3] not in plain])
+    live = os.path.join(directory, LIVE_SEGMENT)
+    return rotated + ([live] if os.path.exists(live) else [])
+
+
+def read_records(path: str):
+    """Yield (timestamp, target, job, data) from one segment."""
+    if path.endswith(".gz"):
+        import gzip
+        opener = gzip.open
+    else:
+        opener = open
+    with opener(path, 'rb') as f:
+        blob = f.read()
+    offset = 0
+    while offset + RECORD.size <= len(blob):
+        timestamp, target_len, job_len, data_len = RECORD.unpack_from(blob, offset)
+        offset += RECORD.size
+        end = offset + target_len + job_len + data_len
+        if end > len(blob):
+            print(f"⚠ {path}: truncated record at the end")
+            return
+        target = blob[offset:offset + target_len].decode('utf-8')
+        job = blob[offset + target_len:offset + target_len + job_len].decode('utf-8') or None
+        yield timestamp, target, job, blob[offset + target_len + job_len:end]
+        offset = end
+
+
+def parse_time(value: str) -> float:
+    """'YYYY-MM-DD HH:MM[:SS]' or '15m' / '2h' / '1d' ago, as a timestamp."""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    if value[-1:] in units and value[:-1].replace('.', '', 1).isdigit():
+        return time.time() - float(value[:-1]) * units[value[-1]]
+    for fmt in (TIME_FORMAT, '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, fmt).timestamp()
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"bad time '{value}'")
+
+
+def select(directory: str, since: Optional[float] = None, until: Optional[float] = None,
+           target: Optional[str] = None, job: Optional[str] = None,
+           last: Optional[int] = None) -> list:
+    """A window of the journal as a list of records."""
+    window = []
+    for path in segments(directory):
+        for record in read_records(path):
+            timestamp, record_target, record_job, _ = record
+            if since is not None and timestamp < since:
+                continue
+            if until is not None and timestamp > until:
+                continue
+            if target and target not in record_target:
+                continue
+            if job and record_job != job:
+                continue
+            window.append(record)
+    return window[-last:] if last else window
+
+
+def describe(record: tuple) -> str:
+    timestamp, target, job, data = record
+    stamp = datetime.fromtimestamp(timestamp).strftime(TIME_FORMAT + '.%f')[:-3]
+    return f"{stamp}  {target:28} {job or '-':16} {len(data):6} bytes"
+
+
+# -- replay -----------------------------------------------------------------
+
+def resend(window: list, printer: Optional[str] = None, realtime: bool = False,
+           address: Optional[str] = None) -> int:
+    """
+    Send the window again through the connection pool; returns failures.
+    address (host[:port]) sends to a network printer outside the registry.
+    """
+    from transport import ConnectionPool, get_printers, PRINTER_PORT, DPI
+    if address:
+        host, _, port = address.partition(":")
+        printer = "replay"
+        pool = ConnectionPool({printer: {"name": address, "connection": "network",
+                                         "printer_name": None, "ip": host,
+                                         "port": int(port or PRINTER_PORT), "dpi": DPI}})
+    else:
+        pool = ConnectionPool(get_printers())
+        if printer and printer not in pool.printers:
+            print(f"✗ Unknown printer '{printer}' (have: {', '.join(pool.printers)})")
+            return len(window)
+    failures = 0
+    previous = None
+    start = time.perf_counter()
+    try:
+        for timestamp, target, job, data in window:
+            if realtime and previous is not None:
+                time.sleep(max(0.0, timestamp - previous))
+            previous = timestamp
+            if not pool.send(data, printer):
+                failures += 1
+                print(f"✗ Resend failed: {describe((timestamp, target, job, data))}")
+    finally:
+        pool.close()
+    elapsed = time.perf_counter() - start
+    total = sum(len(record[3]) for record in window)
+    print(f"✓ Resent {len(window) - failures}/{len(window)} writes, {total:,} bytes "
+          f"in {elapsed:.2f}s")
+    return failures
+
+
+def diff(window: list, other: list) -> int:
+    """Compare data record by record; returns the number of differences."""
+    differences = 0
+    for index in range(max(len(window), len(other))):
+        a = window[index] if index < len(window) else None
+        b = other[index] if index < len(other) else None
+        if a is not None and b is not None and a[3] == b[3]:
+            continue
+        differences += 1
+        if differences > 10:
+            continue
+        if a is None or b is None:
+            present = a or b
+            side = "only here" if a else "only in other"
+            print(f"✗ #{index + 1} {side}: {describe(present)}")
+            continue
+        print(f"✗ #{index + 1}: {describe(a)}")
+        a_lines, b_lines = a[3].split(b"\r\n"), b[3].split(b"\r\n")
+        for line in range(max(len(a_lines), len(b_lines))):
+            left = a_lines[line] if line < len(a_lines) else None
+            right = b_lines[line] if line < len(b_lines) else None
+            if left != right:
+                print(f"    line {line + 1}: {left!r}")
+                print(f"    {' ' * len(str(line + 1))}  other {right!r}")
+                break
+    if differences:
+        print(f"✗ {differences} of {max(len(window), len(other))} writes differ")
+    else:
+        print(f"✓ {len(window)} writes identical")
+    return differences
+
+
+def rasterize(window: list, preset: str, dpi: int, pgm_dir: Optional[str] = None,
+              shrink: int = 2):
+    """Render each write as the printer would see it (text, or PGM files)."""
+    from dpl_raster import render_preset
+    if pgm_dir:
+        os.makedirs(pgm_dir, exist_ok=True)
+    for index, record in enumerate(window, 1):
+        raster = render_preset(record[3], preset, dpi)
+        print(f"\n#{index} {describe(record)}")
+        if pgm_dir:
+            path = os.path.join(pgm_dir, f"write-{index:04d}.pgm")
+            with open(path, 'wb') as f:
+                f.write(raster.to_pgm())
+            print(f"✓ Wrote {path}")
+        else:
+            print(raster.to_text(shrink))
+        print(f"ℹ {raster.fields} fields, {raster.black_dots()} dots")
+        for warning in raster.warnings:
+            print(f"⚠ {warning}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='List or replay the printer wire journal')
+    parser.add_argument('directory', nargs='?', default=WIRE_JOURNAL_DIR,
+                        help='Journal directory (default: WIRE_JOURNAL_DIR)')
+    parser.add_argument('--since', type=parse_time, help='Start time or age (e.g. 30m)')
+    parser.add_argument('--until', type=parse_time, help='End time or age')
+    parser.add_argument('--target', help='Only targets containing this text')
+    parser.add_argument('--job', help='Only this job ID')
+    parser.add_argument('--last', type=int, help='Only the last N writes')
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument('--resend', action='store_true', help='Send the window again')
+    action.add_argument('--diff', metavar='OTHER_DIR', help='Compare with another journal')
+    action.add_argument('--show', action='store_true', help='Rasterize as text')
+    action.add_argument('--pgm', metavar='DIR', help='Rasterize to PGM images')
+    action.add_argument('--dump', action='store_true', help='Print the raw bytes')
+    parser.add_argument('--printer', help='Registry printer for --resend (default: default)')
+    parser.add_argument('--ip', metavar='HOST[:PORT]',
+                        help='Resend to this network address instead of a registry printer')
+    parser.add_argument('--realtime', action='store_true',
+                        help='Keep the original gaps between writes when resending')
+    parser.add_argument('-l', '--label', default="standard", help='Preset for rasterizing')
+    parser.add_argument('--dpi', type=int, default=203, help='Resolution for rasterizing')
+    args = parser.parse_args()
+
+    if not args.directory:
+        parser.error("no journal directory (set WIRE_JOURNAL_DIR in config.py)")
+    window = select(args.directory, args.since, args.until, args.target, args.job, args.last)
+    if not window:
+        print(f"ℹ No journal records in {args.directory}")
+        return
+
+    if args.resend:
+        sys.exit(1 if resend(window, args.printer, args.realtime, args.ip) else 0)
+    if args.diff:
+        other = select(args.diff, args.since, args.until, args.target, args.job, args.last)
+        sys.exit(1 if diff(window, other) else 0)
+    if args.show or args.pgm:
+        rasterize(window, args.label, args.dpi, args.pgm)
+        return
+    for record in window:
+        print(describe(record))
+        if args.dump:
+            print(record[3].decode('latin-1'))
+    total = sum(len(record[3]) for record in window)
+    print(f"ℹ {len(window)} writes, {total:,} bytes")
+
+
+if __name__ == "__main__":
+    main()